@@ -0,0 +1,117 @@
+"""Footer and lookup latency before and after the ledger indexes.
+
+Seeds scratch copies of expenses, income and receipts in a separate schema
+(default 1M expense rows), times the hot queries, builds the indexes from
+migrations 4 and 8 and times them again. Nothing in the public schema is
+touched.
+
+    python -m benchmarks.index_latency --rows 1000000
+"""
+from sqlalchemy import text
+from src.database.db_manager import get_engine
+from src.utils.db_migrate import LEDGER_INDEXES, RECEIPT_REFERENCE_INDEX
+import argparse
+import statistics
+import time
+
+SCHEMA = 'fritter_bench'
+
+SEED_SQL = """
+CREATE TABLE expenses (
+    id SERIAL PRIMARY KEY, amount FLOAT NOT NULL, description VARCHAR NOT NULL,
+    category VARCHAR NOT NULL, date TIMESTAMP, receipt_reference VARCHAR
+);
+CREATE TABLE income (
+    id SERIAL PRIMARY KEY, amount FLOAT NOT NULL, source VARCHAR NOT NULL,
+    client VARCHAR, status VARCHAR, date TIMESTAMP
+);
+CREATE TABLE receipts (
+    id SERIAL PRIMARY KEY, name VARCHAR NOT NULL, reference_id VARCHAR, date TIMESTAMP
+);
+INSERT INTO expenses (amount, description, category, date, receipt_reference)
+SELECT round((random() * 500)::numeric, 2), 'Expense ' || g,
+       (ARRAY['Software','Transportation','Utilities','Services','Food','Other'])[1 + g % 6],
+       timestamp '2015-01-01' + random() * interval '3650 days',
+       CASE WHEN g % 10 = 0 THEN 'R' || lpad((g / 10)::text, 8, '0') END
+FROM generate_series(1, :rows) AS g;
+INSERT INTO income (amount, source, client, status, date)
+SELECT round((random() * 5000)::numeric, 2), 'Invoice ' || g, 'Client ' || (g % 500),
+       'Received', timestamp '2015-01-01' + random() * interval '3650 days'
+FROM generate_series(1, :income_rows) AS g;
+INSERT INTO receipts (name, reference_id, date)
+SELECT 'Receipt ' || g, 'R' || lpad(g::text, 8, '0'), timestamp '2015-01-01' + random() * interval '3650 days'
+FROM generate_series(1, :receipt_rows) AS g;
+ANALYZE expenses; ANALYZE income; ANALYZE receipts;
+"""
+
+QUERIES = {
+    'footer expenses (month)':
+        "SELECT sum(amount) FROM expenses WHERE date BETWEEN :start AND :end",
+    'footer income (month)':
+        "SELECT sum(amount) FROM income WHERE date BETWEEN :start AND :end",
+    'category + month':
+        "SELECT sum(amount) FROM expenses WHERE category = 'Food' AND date BETWEEN :start AND :end",
+    'client + month':
+        "SELECT sum(amount) FROM income WHERE client = 'Client 42' AND date BETWEEN :start AND :end",
+    'receipt by reference':
+        "SELECT id, name FROM receipts WHERE reference_id = :ref",
+    'expenses for receipt':
+        "SELECT e.id FROM expenses e JOIN receipts r ON r.reference_id = e.receipt_reference "
+        "WHERE r.reference_id = :ref",
+}
+
+PARAMS = {'start': '2020-06-01', 'end': '2020-06-30 23:59:59', 'ref': 'R00004242'}
+
+def time_queries(conn, repeat):
+    timings = {}
+    for label, sql in QUERIES.items():
+        conn.execute(text(sql), PARAMS).fetchall()  # Warm the cache
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(text(sql), PARAMS).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[label] = statistics.median(samples)
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Expense rows to seed")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per query (median reported)")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch schema afterwards")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        try:
+            print(f"Seeding {args.rows} expenses...")
+            started = time.perf_counter()
+            conn.execute(text(SEED_SQL), {
+                'rows': args.rows,
+                'income_rows': max(1, args.rows // 4),
+                'receipt_rows': max(1, args.rows // 10)
+            })
+            print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+            before = time_queries(conn, args.repeat)
+
+            for name, table, columns, unique in LEDGER_INDEXES + [RECEIPT_REFERENCE_INDEX]:
+                unique_sql = "UNIQUE " if unique else ""
+                conn.execute(text(f"CREATE {unique_sql}INDEX {name} ON {table} ({columns})"))
+            conn.execute(text("ANALYZE expenses; ANALYZE income; ANALYZE receipts;"))
+
+            after = time_queries(conn, args.repeat)
+
+            print(f"\n{'query':<26}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+            for label in QUERIES:
+                speedup = before[label] / after[label] if after[label] else float('inf')
+                print(f"{label:<26}{before[label]:>12.2f}{after[label]:>12.2f}{speedup:>9.1f}x")
+        finally:
+            if not args.keep:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,166 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
 from ..models.base import Base
 import configparser
+import threading
+import time
 import os
 
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.ini')
+
+# Pool defaults used when config.ini does not override them
+POOL_DEFAULTS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 1800,  # seconds, -1 disables recycling
+    'pool_pre_ping': True,
+    'statement_timeout': 0  # milliseconds, 0 disables the timeout
+}
+
+_config = None
+_config_lock = threading.Lock()
+
+# Process-wide registry of engines keyed by DSN, shared by every DatabaseManager
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def load_config():
+    """Parse config.ini once and return the shared ConfigParser"""
+    global _config
+    with _config_lock:
+        if _config is None:
+            config = configparser.ConfigParser()
+            config.read(CONFIG_PATH)
+            _config = config
+        return _config
+
+
+def get_database_url(config=None):
+    """Build the PostgreSQL URL from the [Database] section"""
+    config = config or load_config()
+    db = config['Database']
+    return f"postgresql://{db['user']}:{db['password']}@{db['host']}:{db['port']}/{db['dbname']}"
+
+
+def get_pool_settings(config=None):
+    """Read pool settings from the [Database] section, falling back to POOL_DEFAULTS"""
+    config = config or load_config()
+    section = config['Database'] if config.has_section('Database') else {}
+    settings = {}
+    for key, default in POOL_DEFAULTS.items():
+        if key not in section:
+            settings[key] = default
+        elif isinstance(default, bool):
+            settings[key] = config.getboolean('Database', key)
+        else:
+            settings[key] = config.getint('Database', key)
+    return settings
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout counts and how long callers waited for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'checkins': 0,
+            'timeouts': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0
+        }
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self._stats['timeouts'] += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self._stats['checkouts'] += 1
+            self._stats['total_wait'] += waited
+            self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+        return connection
+
+    def _do_return_conn(self, conn):
+        with self._stats_lock:
+            self._stats['checkins'] += 1
+        super()._do_return_conn(conn)
+
+    def stats(self):
+        """Snapshot of the checkout/wait counters together with the live pool state"""
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        checkouts = snapshot['checkouts']
+        snapshot['avg_wait'] = snapshot['total_wait'] / checkouts if checkouts else 0.0
+        snapshot['size'] = self.size()
+        snapshot['checked_out'] = self.checkedout()
+        snapshot['checked_in'] = self.checkedin()
+        snapshot['overflow'] = self.overflow()
+        return snapshot
+
+
+def get_engine(db_url=None):
+    """Return the shared engine for a DSN, creating it on first use"""
+    db_url = db_url or get_database_url()
+    with _engines_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            settings = get_pool_settings()
+            connect_args = {}
+            if settings['statement_timeout'] > 0:
+                connect_args['options'] = f"-c statement_timeout={settings['statement_timeout']}"
+
+            engine = create_engine(
+                db_url,
+                poolclass=InstrumentedQueuePool,
+                pool_size=settings['pool_size'],
+                max_overflow=settings['max_overflow'],
+                pool_timeout=settings['pool_timeout'],
+                pool_recycle=settings['pool_recycle'],
+                pool_pre_ping=settings['pool_pre_ping'],
+                connect_args=connect_args
+            )
+            _engines[db_url] = engine
+        return engine
+
+
+def dispose_engines():
+    """Close every pooled connection, e.g. on application shutdown"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
 class DatabaseManager:
-    def __init__(self):
-        config = configparser.ConfigParser()
-        # Get the absolute path to config.ini
-        config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.ini')
-        config.read(config_path)
-        
-        # Create PostgreSQL URL
-        db_url = f"postgresql://{config['Database']['user']}:{config['Database']['password']}@{config['Database']['host']}:{config['Database']['port']}/{config['Database']['dbname']}"
-        
-        self.engine = create_engine(db_url)
+    def __init__(self, db_url=None):
+        # All managers for the same DSN share one engine and connection pool
+        self.engine = get_engine(db_url)
         self.session_factory = sessionmaker(bind=self.engine)
         self.Session = scoped_session(self.session_factory)
-        
+
     def init_db(self):
         Base.metadata.create_all(self.engine)
-        
+
     def get_session(self):
         return self.Session()
-    
+
+    def get_pool_stats(self):
+        """Report checkout and wait statistics for the shared pool"""
+        pool = self.engine.pool
+        if isinstance(pool, InstrumentedQueuePool):
+            return pool.stats()
+        return {'status': pool.status()}
+
     def add_record(self, record):
         session = self.get_session()
         try:
@@ -36,4 +172,4 @@ class DatabaseManager:
             print(f"Error adding record: {str(e)}")
             return False
         finally:
-            session.close()
\ No newline at end of file
+            session.close()
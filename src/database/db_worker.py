@@ -0,0 +1,250 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from .db_manager import DatabaseManager, get_pool_settings
+from .pagination import get_page_size
+import threading
+import traceback
+
+_thread_pool = None
+
+
+def get_thread_pool():
+    """Shared pool of background threads used for database work"""
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = QThreadPool()
+        # Never run more queries at once than the connection pool can serve
+        _thread_pool.setMaxThreadCount(max(1, min(4, get_pool_settings()['pool_size'])))
+    return _thread_pool
+
+
+class TaskSignals(QObject):
+    """Signals used to post task results back to the GUI thread"""
+    finished = pyqtSignal(str, int, object)  # key, generation, result
+    failed = pyqtSignal(str, int, str)  # key, generation, error message
+    progress = pyqtSignal(str, int, object)  # key, generation, progress value
+
+
+class QueryHandle:
+    """The connection a task is running its query on, so another thread can cancel it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection = None
+        self.cancelled = False
+
+    def attach(self, session):
+        """Check out the session's connection and remember its DBAPI connection.
+
+        Returns False, without remembering it, when cancel() already ran.
+        """
+        connection = session.connection().connection
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._connection = connection
+            return True
+
+    def detach(self):
+        """Forget the connection before it goes back to the pool"""
+        with self._lock:
+            self._connection = None
+
+    def cancel(self):
+        """Ask the server to cancel the statement currently running, if any"""
+        with self._lock:
+            self.cancelled = True
+            if self._connection is None:
+                return
+            try:
+                # psycopg2 sends a cancel request on a separate connection
+                # (like pg_cancel_backend); safe to call from any thread
+                self._connection.cancel()
+            except Exception as e:
+                print(f"Error cancelling query: {str(e)}")
+
+
+class DatabaseTask(QRunnable):
+    """Runs a callable with its own session on a worker thread"""
+
+    def __init__(self, session_factory, key, generation, fn, is_current, with_progress=False, handle=None):
+        super().__init__()
+        self.session_factory = session_factory
+        self.key = key
+        self.generation = generation
+        self.fn = fn
+        self.is_current = is_current
+        self.with_progress = with_progress
+        self.handle = handle
+        self.signals = TaskSignals()
+
+    def run(self):
+        # Skip work that was superseded while it sat in the queue
+        if not self.is_current(self.key, self.generation):
+            return
+
+        # A plain session per task: the scoped_session registry is thread-local
+        # and pool threads are reused, so it must never be touched from here
+        session = self.session_factory()
+        try:
+            if self.handle is not None and not self.handle.attach(session):
+                return  # Cancelled before the query started
+            if self.with_progress:
+                result = self.fn(session, self.report_progress)
+            else:
+                result = self.fn(session)
+        except Exception as e:
+            if self.handle is not None:
+                self.handle.detach()
+            session.rollback()
+            # A query cancelled because a newer request superseded it is expected
+            if self.is_current(self.key, self.generation):
+                traceback.print_exc()
+            self.signals.failed.emit(self.key, self.generation, str(e))
+        else:
+            if self.handle is not None:
+                self.handle.detach()
+            self.signals.finished.emit(self.key, self.generation, result)
+        finally:
+            session.close()
+
+    def report_progress(self, value):
+        """Post a progress value to the GUI thread"""
+        self.signals.progress.emit(self.key, self.generation, value)
+
+
+class DatabaseWorker(QObject):
+    """Runs database queries off the GUI thread and delivers results via signals.
+
+    Each request is tagged with a key (e.g. "expenses"). Submitting a new request
+    for a key supersedes the previous one: queued work is skipped and results that
+    still arrive for an older generation are dropped. Requests submitted with
+    cancel_running=True also have their in-flight query cancelled on the server.
+    """
+
+    def __init__(self, db_manager=None, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager or DatabaseManager()
+        self.thread_pool = get_thread_pool()
+        self._generations = {}  # Maps key to the latest generation number
+        self._callbacks = {}  # Maps key to (generation, on_result, on_error, on_progress)
+        self._handles = {}  # Maps key to the QueryHandle of a cancellable request
+
+    def submit(self, key, fn, on_result, on_error=None, on_progress=None, cancel_running=False):
+        """Run fn(session) in the background and call on_result(result) on the GUI thread.
+
+        fn must only touch the session it is given and return plain Python data,
+        because the session is closed as soon as fn returns. With on_progress, fn
+        is called as fn(session, report) and every report(value) reaches
+        on_progress(value) on the GUI thread. With cancel_running, the query is
+        cancelled when a newer request for the key is submitted or the key is
+        cancelled, instead of running to completion only to be dropped.
+        """
+        self._cancel_query(key)
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        self._callbacks[key] = (generation, on_result, on_error, on_progress)
+
+        handle = QueryHandle() if cancel_running else None
+        if handle is not None:
+            self._handles[key] = handle
+        task = DatabaseTask(self.db_manager.session_factory, key, generation, fn, self._is_current,
+                            with_progress=on_progress is not None, handle=handle)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        task.signals.progress.connect(self._on_progress)
+        self.thread_pool.start(task)
+        return generation
+
+    def cancel(self, key):
+        """Drop the pending request for a key so its result is never delivered"""
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._callbacks.pop(key, None)
+        self._cancel_query(key)
+
+    def _cancel_query(self, key):
+        handle = self._handles.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+
+    def is_busy(self, key):
+        """Return True while a request for the key is in flight"""
+        return key in self._callbacks
+
+    def _is_current(self, key, generation):
+        return self._generations.get(key) == generation
+
+    def _take_callbacks(self, key, generation):
+        entry = self._callbacks.get(key)
+        if entry is None or entry[0] != generation:
+            return None  # Stale result from a superseded request
+        del self._callbacks[key]
+        self._handles.pop(key, None)
+        return entry
+
+    def _on_finished(self, key, generation, result):
+        entry = self._take_callbacks(key, generation)
+        if entry is not None:
+            entry[1](result)
+
+    def _on_progress(self, key, generation, value):
+        entry = self._callbacks.get(key)
+        if entry is not None and entry[0] == generation:
+            entry[3](value)
+
+    def _on_failed(self, key, generation, message):
+        entry = self._take_callbacks(key, generation)
+        if entry is None:
+            return
+        print(f"Error loading {key}: {message}")
+        if entry[2] is not None:
+            entry[2](message)
+
+
+class PagedLoader(QObject):
+    """Loads a keyset-paginated query one page at a time through a DatabaseWorker.
+
+    fetch_page(session, cursor, page_size) runs on a worker thread and returns a
+    pagination.Page; on_page(rows, first_page) receives each page on the GUI thread.
+    on_error(message) is called when the first page fails. When a later page
+    fails the rows already shown stay, on_more_error(message) is called instead
+    and the same page is requested again on the next fetch_more.
+    """
+
+    def __init__(self, worker, key, fetch_page, on_page, on_error=None, page_size=None, parent=None,
+                 on_more_error=None):
+        super().__init__(parent or worker)
+        self.worker = worker
+        self.key = key
+        self.fetch_page = fetch_page
+        self.on_page = on_page
+        self.on_error = on_error
+        self.on_more_error = on_more_error
+        self.page_size = page_size or get_page_size()
+        self.cursor = None
+        self.has_more = False
+
+    def reset(self):
+        """Discard loaded state and request the first page"""
+        self.cursor = None
+        self.has_more = False
+        self._request(first_page=True)
+
+    def fetch_more(self):
+        """Request the next page unless one is already loading or none is left"""
+        if self.has_more and not self.worker.is_busy(self.key):
+            self._request(first_page=False)
+
+    def _request(self, first_page):
+        cursor = self.cursor
+        page_size = self.page_size
+        self.worker.submit(
+            self.key,
+            lambda session: self.fetch_page(session, cursor, page_size),
+            lambda page: self._on_page(page, first_page),
+            self.on_error if first_page else self.on_more_error
+        )
+
+    def _on_page(self, page, first_page):
+        self.cursor = page.next_cursor
+        self.has_more = page.has_more
+        self.on_page(page.rows, first_page)
@@ -0,0 +1,77 @@
+from sqlalchemy import tuple_
+from .db_manager import load_config
+
+DEFAULT_PAGE_SIZE = 200
+
+def get_page_size():
+    """Rows per page, from [Application] page_size in config.ini"""
+    return load_config().getint('Application', 'page_size', fallback=DEFAULT_PAGE_SIZE)
+
+
+def list_query(session, model):
+    """The query behind a ledger list view; deferred blob columns stay unloaded"""
+    return session.query(model)
+
+
+class Page:
+    """One page of rows plus the keyset cursor for the next page (None on the last page)"""
+    def __init__(self, rows, next_cursor):
+        self.rows = rows
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+
+def _nullable(column):
+    return getattr(column.expression, 'nullable', False)
+
+
+def fetch_page(query, order_columns, cursor=None, page_size=None, descending=True, row_factory=None):
+    """Fetch one page of a query using keyset (seek) pagination.
+
+    order_columns must end in a unique column (e.g. (Expense.date, Expense.id)) and
+    cursor is the tuple of those values from the last row of the previous page, so
+    every page costs an index range scan no matter how deep it is.
+    A nullable first column sorts NULLs last in either direction: those rows
+    follow the others, ordered by the remaining columns, and a cursor taken from
+    one of them starts with None.
+    row_factory, if given, converts each row before it is returned.
+    """
+    page_size = page_size or get_page_size()
+    lead, rest = order_columns[0], order_columns[1:]
+
+    def seek(query, columns, values):
+        key = tuple_(*columns)
+        boundary = tuple_(*values)
+        return query.filter(key < boundary if descending else key > boundary)
+
+    def ordered(query, columns, limit):
+        ordering = [column.desc() if descending else column.asc() for column in columns]
+        return query.order_by(*ordering).limit(limit).all()
+
+    # Fetch one extra row to learn whether another page exists
+    rows = []
+    if cursor is None or cursor[0] is not None:
+        valued = query.filter(lead.isnot(None)) if _nullable(lead) else query
+        if cursor is not None:
+            valued = seek(valued, order_columns, cursor)
+        rows = ordered(valued, order_columns, page_size + 1)
+
+    if len(rows) <= page_size and _nullable(lead):
+        # Past the last valued row: continue with the NULLs, each part using the index
+        nulls = query.filter(lead.is_(None))
+        if cursor is not None and cursor[0] is None:
+            nulls = seek(nulls, rest, cursor[1:])
+        rows += ordered(nulls, rest, page_size + 1 - len(rows))
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = tuple(getattr(last, column.key) for column in order_columns)
+
+    if row_factory is not None:
+        rows = [row_factory(row) for row in rows]
+    return Page(rows, next_cursor)
@@ -1,33 +1,47 @@
 import sys
-from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWidgets import QApplication, QMessageBox
 from src.ui.main_window import MainWindow
-from src.database.db_manager import DatabaseManager
-from src.utils.db_migrate import (add_reference_id_to_receipts, add_fields_to_income, 
-                                 add_clients_table, add_receipt_reference_to_expenses)
+from src.database.db_manager import DatabaseManager, dispose_engines
+from src.utils.db_migrate import run_migrations, DuplicateReceiptReferences
+from src.utils.search_index import start_search_index
 
 def main():
+    # Start Qt application (created first so migration errors can be shown)
+    app = QApplication(sys.argv)
+    
     # Initialize database
     db_manager = DatabaseManager()
-    db_manager.init_db()
     
-    # Run database migrations
+    # Bring the schema up to date (a single version check when nothing is pending)
     try:
-        add_reference_id_to_receipts()
-        add_fields_to_income()
-        add_clients_table()
-        add_receipt_reference_to_expenses()  # Added new migration
+        run_migrations(db_manager.engine)
+    except DuplicateReceiptReferences as e:
+        # Only the unique index of migration 8 is missing; the app still works
+        print(f"Error during database migration: {str(e)}")
+        QMessageBox.warning(None, "Duplicate Receipt References", str(e))
     except Exception as e:
+        # The app would query tables and columns that do not exist yet
         print(f"Error during database migration: {str(e)}")
+        QMessageBox.critical(None, "Database Upgrade Failed",
+                             f"The database could not be upgraded:\n\n{str(e)}\n\n"
+                             "Run `python -m src.utils.db_migrate upgrade` for details.")
+        dispose_engines()
+        sys.exit(1)
+    
+    # Build the optional in-memory search index in the background
+    start_search_index(db_manager.session_factory)
     
     # Create data directory for reference counters
     import os
     os.makedirs(os.path.join(os.path.dirname(__file__), '..', 'data'), exist_ok=True)
     
-    # Start Qt application
-    app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    
+    # Release the shared connection pool
+    dispose_engines()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
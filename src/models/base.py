@@ -1,5 +1,21 @@
 from datetime import datetime
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, Float, String, DateTime, Date
+from sqlalchemy import Column, Integer, Float, String, DateTime, Date, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# Text search configuration; 'simple' keeps names, IDs and emails unstemmed
+SEARCH_CONFIG = 'simple'
+
+def search_vector_expression(fields):
+    """tsvector SQL over (column, weight) pairs, weights 'A' (best) to 'D'"""
+    return " || ".join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({name}, '')), '{weight}')"
+        for name, weight in fields
+    )
+
+def search_vector_column(fields):
+    """Stored generated tsvector column for full-text search, loaded only when asked for"""
+    return deferred(Column(TSVECTOR, Computed(search_vector_expression(fields), persisted=True)))
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String
-from .base import Base
+from sqlalchemy import Column, Integer, String, Index
+from .base import Base, search_vector_column
 
 class Client(Base):
     __tablename__ = 'clients'
+    __table_args__ = (
+        Index('ix_clients_business_name_id', 'business_name', 'id'),
+        Index('ix_clients_search', 'search_vector', postgresql_using='gin'),  # Full-text search
+    )
     
     id = Column(Integer, primary_key=True)
     business_name = Column(String, nullable=False)
@@ -10,6 +14,8 @@ class Client(Base):
     email = Column(String, nullable=False)
     phone = Column(String, nullable=True)
     address = Column(String, nullable=True)
+    __search_fields__ = (('business_name', 'A'), ('poc', 'A'), ('email', 'A'), ('phone', 'B'), ('address', 'B'))  # (column, weight)
+    search_vector = search_vector_column(__search_fields__)
     
     def __repr__(self):
         return f"<Client(business_name='{self.business_name}', email='{self.email}')>"
\ No newline at end of file
@@ -1,17 +1,25 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, LargeBinary
+from sqlalchemy import Column, Integer, Float, String, DateTime, LargeBinary, Index
+from sqlalchemy.orm import deferred
 from datetime import datetime
-from .base import Base
+from .base import Base, search_vector_column
 
 class Expense(Base):
     __tablename__ = 'expenses'
+    __table_args__ = (
+        Index('ix_expenses_category_date', 'category', 'date'),
+        Index('ix_expenses_date_id', 'date', 'id'),  # Keyset pagination and date ranges
+        Index('ix_expenses_search', 'search_vector', postgresql_using='gin'),  # Full-text search
+    )
     
     id = Column(Integer, primary_key=True)
     amount = Column(Float, nullable=False)
     description = Column(String, nullable=False)
     category = Column(String, nullable=False)
     date = Column(DateTime, default=datetime.now)
-    receipt_image = Column(LargeBinary, nullable=True)
-    receipt_reference = Column(String, nullable=True)  # Added receipt reference
+    receipt_image = deferred(Column(LargeBinary, nullable=True))  # Loaded only on explicit access
+    receipt_reference = Column(String, nullable=True, index=True)  # Added receipt reference
+    __search_fields__ = (('description', 'A'), ('receipt_reference', 'A'), ('category', 'B'))  # (column, weight)
+    search_vector = search_vector_column(__search_fields__)
     
     def __repr__(self):
         return f"<Expense(amount={self.amount}, description='{self.description}')>"
\ No newline at end of file
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime
+from sqlalchemy import Column, Integer, Float, String, DateTime, Index
 from datetime import datetime
-from .base import Base
+from .base import Base, search_vector_column
 
 class Income(Base):
     __tablename__ = 'income'
+    __table_args__ = (
+        Index('ix_income_client_date', 'client', 'date'),
+        Index('ix_income_date_id', 'date', 'id'),  # Keyset pagination and date ranges
+        Index('ix_income_search', 'search_vector', postgresql_using='gin'),  # Full-text search
+    )
     
     id = Column(Integer, primary_key=True)
     amount = Column(Float, nullable=False)
@@ -13,6 +18,8 @@ class Income(Base):
     contract_id = Column(String, nullable=True)
     status = Column(String, nullable=True)  # Added status field
     date = Column(DateTime, default=datetime.now)
+    __search_fields__ = (('source', 'A'), ('client', 'A'), ('invoice_id', 'A'), ('contract_id', 'A'), ('status', 'C'))  # (column, weight)
+    search_vector = search_vector_column(__search_fields__)
     
     def __repr__(self):
         return f"<Income(amount={self.amount}, source='{self.source}', client='{self.client}', status='{self.status}')>"
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Float, String, Date
+from .base import Base
+
+class MonthlyTotal(Base):
+    """Per-month rollup of income and expenses, maintained by database triggers"""
+    __tablename__ = 'monthly_totals'
+
+    month = Column(Date, primary_key=True)  # First day of the month
+    kind = Column(String, primary_key=True)  # 'income' or 'expense'
+    category = Column(String, primary_key=True, default='')  # Expense category, '' for income
+    total = Column(Float, nullable=False, default=0.0)
+    row_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<MonthlyTotal(month={self.month}, kind='{self.kind}', category='{self.category}', total={self.total})>"
@@ -1,16 +1,28 @@
-from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Index
+from sqlalchemy.orm import deferred
 from datetime import datetime
-from .base import Base
+from .base import Base, search_vector_column
 
 class Receipt(Base):
     __tablename__ = 'receipts'
+    __table_args__ = (
+        Index('ux_receipts_reference_id', 'reference_id', unique=True),
+        Index('ix_receipts_date_id', 'date', 'id'),
+        Index('ix_receipts_search', 'search_vector', postgresql_using='gin'),  # Full-text search
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     reference_id = Column(String, nullable=True)  # Added reference ID field
     date = Column(DateTime, default=datetime.now)
     notes = Column(String, nullable=True)
-    image = Column(LargeBinary, nullable=False)
+    # Legacy inline image; new receipts live in the blob store and keep only its metadata
+    image = deferred(Column(LargeBinary, nullable=True))  # Loaded only via fetch_receipt_image
+    image_sha256 = Column(String(64), nullable=True, index=True)  # Blob store key
+    image_size = Column(Integer, nullable=True)
+    image_mime = Column(String, nullable=True)
+    __search_fields__ = (('name', 'A'), ('reference_id', 'A'), ('notes', 'B'))  # (column, weight)
+    search_vector = search_vector_column(__search_fields__)
     
     def __repr__(self):
         return f"<Receipt(name='{self.name}', reference_id='{self.reference_id}', date='{self.date}')>"
\ No newline at end of file
@@ -1,15 +1,20 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, Date
+from sqlalchemy import Column, Integer, Float, String, DateTime, Date, Index
 from datetime import datetime
-from .base import Base
+from .base import Base, search_vector_column
 
 class Subscription(Base):
     __tablename__ = 'subscriptions'
+    __table_args__ = (
+        Index('ix_subscriptions_search', 'search_vector', postgresql_using='gin'),  # Full-text search
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     amount = Column(Float, nullable=False)
     billing_cycle = Column(String, nullable=False)  # monthly, yearly, etc.
     next_billing_date = Column(Date, nullable=False)
+    __search_fields__ = (('name', 'A'), ('billing_cycle', 'C'))  # (column, weight)
+    search_vector = search_vector_column(__search_fields__)
     
     def __repr__(self):
         return f"<Subscription(name='{self.name}', amount={self.amount})>"
\ No newline at end of file
@@ -4,12 +4,24 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt6.QtCore import Qt
 from ..models.client import Client
 from ..database.db_manager import DatabaseManager
+from ..database.db_worker import DatabaseWorker
 from .components.modern_table import ModernTable
+from .components.table_loader import TableLoader
+
+# (header, attribute, placeholder for empty values)
+CLIENT_COLUMNS = [
+    ('Business Name', 'business_name', None),
+    ('Contact Person', 'poc', '-'),
+    ('Email', 'email', None),
+    ('Phone', 'phone', '-'),
+    ('Address', 'address', '-'),
+]
 
 class ClientWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = DatabaseManager()
+        self.db_worker = DatabaseWorker(self.db_manager, self)
         self.editing_id = None  # Track which record we're editing
         self.init_ui()
         self.load_clients()
@@ -78,35 +90,21 @@ class ClientWidget(QWidget):
         main_layout.addWidget(form_frame)
 
         # Add table
-        headers = ["Business Name", "Contact Person", "Email", "Phone", "Address"]
-        self.client_table = ModernTable(headers, with_actions=True)
+        headers = [header for header, _, _ in CLIENT_COLUMNS]
+        self.client_table = ModernTable(headers, with_actions=True, row_order=('Business Name', False))
         self.client_table.edit_clicked.connect(self.edit_client)
         self.client_table.delete_clicked.connect(self.delete_client)
+        self.client_loader = TableLoader(self.db_worker, 'clients', self.client_table, Client, CLIENT_COLUMNS,
+                                         order_by=(Client.business_name, Client.id), descending=False,
+                                         error_text="Could not load clients")
         main_layout.addWidget(QLabel("Client Directory"))
         main_layout.addWidget(self.client_table)
         
         self.setLayout(main_layout)
 
     def load_clients(self):
-        session = self.db_manager.get_session()
-        try:
-            # Clear existing table
-            self.client_table.clear_table()
-            
-            # Load all client records
-            clients = session.query(Client).all()
-            for client in clients:
-                client_data = {
-                    'Business Name': client.business_name,
-                    'Contact Person': client.poc or '-',
-                    'Email': client.email,
-                    'Phone': client.phone or '-',
-                    'Address': client.address or '-',
-                    'ID': client.id
-                }
-                self.client_table.add_row(client_data, client.id)
-        finally:
-            session.close()
+        """Load the first page of clients in the background and show a placeholder meanwhile"""
+        self.client_loader.reload()
 
     def add_client(self):
         # Validate required fields
@@ -140,14 +138,13 @@ class ClientWidget(QWidget):
                     client.phone = phone
                     client.address = address
                     
-                    # Update display
                     session.commit()
                     
+                    # Update just this row in the table
+                    self.client_table.update_row(self.client_loader.row(client), client.id)
+                    
                     # Reset editing state
                     self.clear_form()
-                    
-                    # Refresh the table
-                    self.load_clients()
             else:  # Create new record
                 client = Client(
                     business_name=business_name,
@@ -160,18 +157,8 @@ class ClientWidget(QWidget):
                 session.add(client)
                 session.commit()
                 
-                # Get the ID assigned by the database
-                client_data = {
-                    'Business Name': client.business_name,
-                    'Contact Person': client.poc or '-',
-                    'Email': client.email,
-                    'Phone': client.phone or '-',
-                    'Address': client.address or '-',
-                    'ID': client.id
-                }
-                
-                # Add to display
-                self.client_table.add_row(client_data, client.id)
+                # Add to display at its place in the list
+                self.client_table.insert_row_sorted(self.client_loader.row(client), client.id)
                 self.clear_form()
         finally:
             session.close()
@@ -212,8 +199,8 @@ class ClientWidget(QWidget):
                     session.delete(client)
                     session.commit()
                     
-                    # Refresh the table
-                    self.load_clients()
+                    # Remove just this row from the table
+                    self.client_table.remove_row(client_id)
                     
                     # If we were editing this record, clear the form
                     if self.editing_id == client_id:
@@ -245,16 +232,11 @@ class ClientWidget(QWidget):
     def highlight_record(self, record_id):
         """Highlight a specific record by ID when coming from search"""
         # Find the row with this ID
-        row_index = None
-        for row in range(self.client_table.rowCount()):
-            item_id = self.client_table.item_id_for_row(row)
-            if item_id == record_id:
-                row_index = row
-                break
+        row_index = self.client_table.row_for_id(record_id)
         
         if row_index is not None:
             # Scroll to the row
-            self.client_table.scrollToItem(self.client_table.item(row_index, 0))
+            self.client_table.scroll_to_row(row_index)
             
             # Select the row
             self.client_table.selectRow(row_index)
@@ -263,4 +245,7 @@ class ClientWidget(QWidget):
             self.client_table.flash_highlight_row(row_index)
             
             # Load the record in edit form
+            self.edit_client(record_id)
+        else:
+            # The row is on a page that has not been loaded yet; still open it for editing
             self.edit_client(record_id)
\ No newline at end of file
@@ -4,12 +4,9 @@ from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QPoint
 from PyQt6.QtGui import QFont
 
 from ...database.db_manager import DatabaseManager
-from ...models.expense import Expense
-from ...models.income import Income
-from ...models.subscription import Subscription
-from ...models.receipt import Receipt
-from ...models.client import Client
-from sqlalchemy import or_, func
+from ...database.db_worker import DatabaseWorker
+from ...utils.search import search_records, load_hits, search_terms
+from ...utils.search_index import get_search_index
 
 
 class SearchResult:
@@ -133,6 +130,7 @@ class GlobalSearch(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = DatabaseManager()
+        self.db_worker = DatabaseWorker(self.db_manager, self)
         self.search_timer = QTimer()
         self.search_timer.setSingleShot(True)
         self.search_timer.timeout.connect(self.perform_search)
@@ -270,8 +268,9 @@ class GlobalSearch(QWidget):
         self.search_timer.stop()
         
         if text:
-            # Start a new timer
-            self.search_timer.start(300)  # 300ms debounce
+            # Start a new timer; the in-memory index answers fast enough to search as you type
+            index = get_search_index()
+            self.search_timer.start(50 if index is not None and index.ready else 300)
         else:
             # If text is empty, hide results immediately
             self.clear_results()
@@ -284,6 +283,7 @@ class GlobalSearch(QWidget):
     
     def hideEvent(self, event):
         """Override hideEvent to ensure popup is hidden too"""
+        self.db_worker.cancel('search')
         self.results_container.hide()
         super().hideEvent(event)
     
@@ -305,13 +305,28 @@ class GlobalSearch(QWidget):
         query = self.search_input.text().strip()
         
         if not query or len(query) < 2:
+            self.db_worker.cancel('search')
             self.clear_results()
             self.results_container.hide()
             return
-            
-        # Get results from database
-        results = self.search_database(query)
         
+        # Answer from the in-memory index when it is built
+        index = get_search_index()
+        if index is not None and index.ready:
+            self.db_worker.cancel('search')
+            self.on_search_finished(self.search_index(index, query))
+            return
+        
+        # Show a placeholder while the query runs in the background
+        self.show_message("Searching...")
+        
+        # Get results from database; a newer search supersedes this one and
+        # cancels its query on the server
+        self.db_worker.submit('search', lambda session: self.search_database(query, session),
+                              self.on_search_finished, self.on_search_failed, cancel_running=True)
+    
+    def on_search_finished(self, results):
+        """Display results delivered by the background search"""
         # Display results
         self.display_results(results)
         
@@ -320,206 +335,183 @@ class GlobalSearch(QWidget):
         self.results_container.show()
         self.results_container.raise_()
     
-    def search_database(self, query):
-        """Search across all database tables for matching records"""
-        results = []
-        session = self.db_manager.get_session()
-        
-        try:
-            # Case-insensitive search
-            like_term = f"%{query}%"
-            
-            # Search expenses
-            expenses = session.query(Expense).filter(
-                or_(
-                    Expense.description.ilike(like_term),
-                    Expense.category.ilike(like_term),
-                    Expense.receipt_reference.ilike(like_term)
-                )
-            ).all()
-            
-            for expense in expenses:
-                # Create result with breadcrumb
-                if query.lower() in expense.description.lower():
-                    results.append(SearchResult(
-                        expense.description, 
-                        "expense", 
-                        expense.id, 
-                        f"Expenses: {expense.category} - ${expense.amount:.2f}"
-                    ))
-                elif expense.receipt_reference and query.lower() in expense.receipt_reference.lower():
-                    results.append(SearchResult(
-                        expense.receipt_reference, 
-                        "expense", 
-                        expense.id, 
-                        f"Expenses: Receipt Reference - {expense.description}"
-                    ))
-                else:
-                    results.append(SearchResult(
-                        expense.category, 
-                        "expense", 
-                        expense.id, 
-                        f"Expenses: {expense.description} - ${expense.amount:.2f}"
-                    ))
-            
-            # Search income
-            incomes = session.query(Income).filter(
-                or_(
-                    Income.source.ilike(like_term),
-                    Income.client.ilike(like_term),
-                    Income.invoice_id.ilike(like_term),
-                    Income.contract_id.ilike(like_term),
-                    Income.status.ilike(like_term)
-                )
-            ).all()
-            
-            for income in incomes:
-                # Figure out which field matched
-                if income.source and query.lower() in income.source.lower():
-                    results.append(SearchResult(
-                        income.source, 
-                        "income", 
-                        income.id, 
-                        f"Income: ${income.amount:.2f} - {income.client or 'No client'}"
-                    ))
-                elif income.client and query.lower() in income.client.lower():
-                    results.append(SearchResult(
-                        income.client, 
-                        "income", 
-                        income.id, 
-                        f"Income: Client - {income.source}"
-                    ))
-                elif income.invoice_id and query.lower() in income.invoice_id.lower():
-                    results.append(SearchResult(
-                        income.invoice_id, 
-                        "income", 
-                        income.id, 
-                        f"Income: Invoice ID - {income.source}"
-                    ))
-                elif income.contract_id and query.lower() in income.contract_id.lower():
-                    results.append(SearchResult(
-                        income.contract_id, 
-                        "income", 
-                        income.id, 
-                        f"Income: Contract ID - {income.source}"
-                    ))
-                elif income.status and query.lower() in income.status.lower():
-                    results.append(SearchResult(
-                        income.status, 
-                        "income", 
-                        income.id, 
-                        f"Income: Status - {income.source}"
-                    ))
-            
-            # Search subscriptions
-            subscriptions = session.query(Subscription).filter(
-                or_(
-                    Subscription.name.ilike(like_term),
-                    Subscription.billing_cycle.ilike(like_term)
-                )
-            ).all()
-            
-            for subscription in subscriptions:
-                if query.lower() in subscription.name.lower():
-                    results.append(SearchResult(
-                        subscription.name, 
-                        "subscription", 
-                        subscription.id, 
-                        f"Subscriptions: ${subscription.amount:.2f} - {subscription.billing_cycle}"
-                    ))
-                else:
-                    results.append(SearchResult(
-                        subscription.billing_cycle, 
-                        "subscription", 
-                        subscription.id, 
-                        f"Subscriptions: {subscription.name} - ${subscription.amount:.2f}"
-                    ))
-            
-            # Search receipts
-            receipts = session.query(Receipt).filter(
-                or_(
-                    Receipt.name.ilike(like_term),
-                    Receipt.reference_id.ilike(like_term),
-                    Receipt.notes.ilike(like_term)
-                )
-            ).all()
-            
-            for receipt in receipts:
-                if receipt.reference_id and query.lower() in receipt.reference_id.lower():
-                    results.append(SearchResult(
-                        receipt.reference_id, 
-                        "receipt", 
-                        receipt.id, 
-                        f"Receipts: Reference ID - {receipt.name}"
-                    ))
-                elif query.lower() in receipt.name.lower():
-                    results.append(SearchResult(
-                        receipt.name, 
-                        "receipt", 
-                        receipt.id, 
-                        f"Receipts: {receipt.date.strftime('%Y-%m-%d')}"
-                    ))
-                elif receipt.notes and query.lower() in receipt.notes.lower():
-                    results.append(SearchResult(
-                        receipt.notes[:30] + ("..." if len(receipt.notes) > 30 else ""), 
-                        "receipt", 
-                        receipt.id, 
-                        f"Receipts: Notes - {receipt.name}"
-                    ))
-            
-            # Search clients
-            clients = session.query(Client).filter(
-                or_(
-                    Client.business_name.ilike(like_term),
-                    Client.poc.ilike(like_term),
-                    Client.email.ilike(like_term),
-                    Client.phone.ilike(like_term),
-                    Client.address.ilike(like_term)
-                )
-            ).all()
-            
-            for client in clients:
-                if query.lower() in client.business_name.lower():
-                    results.append(SearchResult(
-                        client.business_name, 
-                        "client", 
-                        client.id, 
-                        f"Clients: {client.email}"
-                    ))
-                elif client.poc and query.lower() in client.poc.lower():
-                    results.append(SearchResult(
-                        client.poc, 
-                        "client", 
-                        client.id, 
-                        f"Clients: Contact Person - {client.business_name}"
-                    ))
-                elif query.lower() in client.email.lower():
-                    results.append(SearchResult(
-                        client.email, 
-                        "client", 
-                        client.id, 
-                        f"Clients: Email - {client.business_name}"
-                    ))
-                elif client.phone and query.lower() in client.phone.lower():
-                    results.append(SearchResult(
-                        client.phone, 
-                        "client", 
-                        client.id, 
-                        f"Clients: Phone - {client.business_name}"
-                    ))
-                elif client.address and query.lower() in client.address.lower():
-                    results.append(SearchResult(
-                        client.address[:30] + ("..." if len(client.address) > 30 else ""), 
-                        "client", 
-                        client.id, 
-                        f"Clients: Address - {client.business_name}"
-                    ))
-            
-            # Limit to maximum results
-            return results[:20]  # Limit to 20 results
-            
-        finally:
-            session.close()
+    def describe_records(self, query, records):
+        """Search results for (source type, record) pairs matching query"""
+        terms = search_terms(query)
+        
+        def matches(value):
+            return bool(value) and any(term in value.lower() for term in terms)
+        
+        describe = {
+            'expense': self.describe_expense,
+            'income': self.describe_income,
+            'subscription': self.describe_subscription,
+            'receipt': self.describe_receipt,
+            'client': self.describe_client
+        }
+        return [describe[source_type](record, matches) for source_type, record in records]
+    
+    def on_search_failed(self, message):
+        """Replace the placeholder when the current search fails or times out"""
+        self.show_message("Search failed, try a more specific query")
+    
+    def search_database(self, query, session):
+        """Search across all database tables for matching records, best matches first"""
+        # Ranked full-text matches, limited to 20 results
+        hits = search_records(session, query, limit=20)
+        return self.describe_records(query, [(hit.source_type, record) for hit, record in load_hits(session, hits)])
+    
+    def search_index(self, index, query):
+        """Search the in-memory index on the UI thread, best matches first"""
+        return self.describe_records(query, index.search(query, limit=20))
+    
+    @staticmethod
+    def describe_expense(expense, matches):
+        """Result text and breadcrumb for a matching expense"""
+        if matches(expense.description):
+            return SearchResult(
+                expense.description, 
+                "expense", 
+                expense.id, 
+                f"Expenses: {expense.category} - ${expense.amount:.2f}"
+            )
+        elif matches(expense.receipt_reference):
+            return SearchResult(
+                expense.receipt_reference, 
+                "expense", 
+                expense.id, 
+                f"Expenses: Receipt Reference - {expense.description}"
+            )
+        return SearchResult(
+            expense.category, 
+            "expense", 
+            expense.id, 
+            f"Expenses: {expense.description} - ${expense.amount:.2f}"
+        )
+    
+    @staticmethod
+    def describe_income(income, matches):
+        """Result text and breadcrumb for matching income, by the field that matched"""
+        if matches(income.client) and not matches(income.source):
+            return SearchResult(
+                income.client, 
+                "income", 
+                income.id, 
+                f"Income: Client - {income.source}"
+            )
+        elif matches(income.invoice_id) and not matches(income.source):
+            return SearchResult(
+                income.invoice_id, 
+                "income", 
+                income.id, 
+                f"Income: Invoice ID - {income.source}"
+            )
+        elif matches(income.contract_id) and not matches(income.source):
+            return SearchResult(
+                income.contract_id, 
+                "income", 
+                income.id, 
+                f"Income: Contract ID - {income.source}"
+            )
+        elif matches(income.status) and not matches(income.source):
+            return SearchResult(
+                income.status, 
+                "income", 
+                income.id, 
+                f"Income: Status - {income.source}"
+            )
+        return SearchResult(
+            income.source, 
+            "income", 
+            income.id, 
+            f"Income: ${income.amount:.2f} - {income.client or 'No client'}"
+        )
+    
+    @staticmethod
+    def describe_subscription(subscription, matches):
+        """Result text and breadcrumb for a matching subscription"""
+        if matches(subscription.name):
+            return SearchResult(
+                subscription.name, 
+                "subscription", 
+                subscription.id, 
+                f"Subscriptions: ${subscription.amount:.2f} - {subscription.billing_cycle}"
+            )
+        return SearchResult(
+            subscription.billing_cycle, 
+            "subscription", 
+            subscription.id, 
+            f"Subscriptions: {subscription.name} - ${subscription.amount:.2f}"
+        )
+    
+    @staticmethod
+    def describe_receipt(receipt, matches):
+        """Result text and breadcrumb for a matching receipt"""
+        if matches(receipt.reference_id):
+            return SearchResult(
+                receipt.reference_id, 
+                "receipt", 
+                receipt.id, 
+                f"Receipts: Reference ID - {receipt.name}"
+            )
+        elif receipt.notes and matches(receipt.notes) and not matches(receipt.name):
+            return SearchResult(
+                receipt.notes[:30] + ("..." if len(receipt.notes) > 30 else ""), 
+                "receipt", 
+                receipt.id, 
+                f"Receipts: Notes - {receipt.name}"
+            )
+        return SearchResult(
+            receipt.name, 
+            "receipt", 
+            receipt.id, 
+            f"Receipts: {receipt.date.strftime('%Y-%m-%d') if receipt.date else ''}"
+        )
+    
+    @staticmethod
+    def describe_client(client, matches):
+        """Result text and breadcrumb for a matching client"""
+        if matches(client.business_name):
+            return SearchResult(
+                client.business_name, 
+                "client", 
+                client.id, 
+                f"Clients: {client.email}"
+            )
+        elif matches(client.poc):
+            return SearchResult(
+                client.poc, 
+                "client", 
+                client.id, 
+                f"Clients: Contact Person - {client.business_name}"
+            )
+        elif matches(client.email):
+            return SearchResult(
+                client.email, 
+                "client", 
+                client.id, 
+                f"Clients: Email - {client.business_name}"
+            )
+        elif matches(client.phone):
+            return SearchResult(
+                client.phone, 
+                "client", 
+                client.id, 
+                f"Clients: Phone - {client.business_name}"
+            )
+        elif matches(client.address):
+            return SearchResult(
+                client.address[:30] + ("..." if len(client.address) > 30 else ""), 
+                "client", 
+                client.id, 
+                f"Clients: Address - {client.business_name}"
+            )
+        return SearchResult(
+            client.business_name, 
+            "client", 
+            client.id, 
+            f"Clients: {client.email}"
+        )
     
     def display_results(self, results):
         """Display the search results"""
@@ -527,16 +519,25 @@ class GlobalSearch(QWidget):
         
         if not results:
             # Show "No results found" message
-            no_results = QLabel("No matching records found")
-            no_results.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            no_results.setStyleSheet("color: #AAAAAA; padding: 20px;")
-            self.results_list.insertWidget(0, no_results)
+            self.show_message("No matching records found")
         else:
-            # Add each result
+            # Add each result in rank order, above the trailing stretch
             for result in results:
                 result_item = SearchResultItem(result)
                 result_item.clicked.connect(self.on_result_clicked)
-                self.results_list.insertWidget(0, result_item)
+                self.results_list.insertWidget(self.results_list.count() - 1, result_item)
+    
+    def show_message(self, text):
+        """Replace the results with a single centered message"""
+        self.clear_results()
+        message = QLabel(text)
+        message.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        message.setStyleSheet("color: #AAAAAA; padding: 20px;")
+        self.results_list.insertWidget(0, message)
+        
+        self.position_results_container()
+        self.results_container.show()
+        self.results_container.raise_()
     
     def clear_results(self):
         """Clear all search results"""
@@ -549,6 +550,7 @@ class GlobalSearch(QWidget):
     
     def clear_search(self):
         """Clear search input and results"""
+        self.db_worker.cancel('search')
         self.search_input.clear()
         self.clear_results()
         self.results_container.hide()
@@ -1,70 +1,505 @@
-from PyQt6.QtWidgets import (QTableWidget, QTableWidgetItem, QAbstractItemView,
-                           QPushButton, QHBoxLayout, QWidget, QDialog, 
-                           QVBoxLayout, QTextEdit, QLabel, QHeaderView, QToolButton)
-from PyQt6.QtCore import Qt, pyqtSignal, QSize, QTimer, QPropertyAnimation, QEasingCurve
-from PyQt6.QtGui import QColor, QFont, QIcon, QBrush
+from PyQt6.QtWidgets import (QTableView, QAbstractItemView, QPushButton, QDialog,
+                           QVBoxLayout, QTextEdit, QLabel, QHeaderView,
+                           QStyledItemDelegate, QToolTip)
+from PyQt6.QtCore import (Qt, pyqtSignal, QTimer, QAbstractTableModel, QSortFilterProxyModel,
+                          QModelIndex, QEvent, QRect)
+from PyQt6.QtGui import QColor, QBrush, QFont, QPainter
+from datetime import datetime, date
 
-class ModernTable(QTableWidget):
+# Column types: cells hold the raw value and are formatted only for display
+CURRENCY = 'currency'
+DATE = 'date'
+DATETIME = 'datetime'
+
+SORT_ROLE = Qt.ItemDataRole.UserRole  # Raw, comparable value used for sorting
+FETCH_BATCH = 100  # Rows exposed to the view per fetchMore call
+
+# Long text columns are truncated in the cell and shown in full on hover
+TRUNCATE_LENGTHS = {'description': 40, 'notes': 40, 'name': 25, 'service': 25, 'source': 25}
+
+
+def format_value(kind, value):
+    """Display text for a raw cell value"""
+    if value is None:
+        return ""
+    if kind == CURRENCY and isinstance(value, (int, float)):
+        return f"${value:.2f}"
+    if kind == DATE and isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    if kind == DATETIME and isinstance(value, date):
+        return value.strftime("%Y-%m-%d %H:%M")
+    return str(value)
+
+
+def sort_value(kind, value):
+    """Sort key Qt can compare natively: numbers for amounts and dates, text otherwise"""
+    if kind in (DATE, DATETIME):
+        # Missing dates sort below every real one, and stay comparable with them
+        if not isinstance(value, date):
+            return float('-inf')
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day)
+        return value.timestamp()
+    if kind == CURRENCY:
+        return float(value) if isinstance(value, (int, float)) else float('-inf')
+    return "" if value is None else str(value).lower()
+
+
+class LedgerTableModel(QAbstractTableModel):
+    """Rows stored as compact tuples of raw values, keyed by record id.
+
+    Rows handed to add_rows are buffered and exposed to the view in batches
+    through canFetchMore/fetchMore. Once the buffer is empty and more_available
+    is set, fetchMore emits more_requested so the next page can be queried.
+
+    row_order is (header, descending), the order the rows arrive in; it lets
+    insert_row and update_row place a changed record without a reload.
+    """
+    more_requested = pyqtSignal()
+
+    def __init__(self, headers, with_actions=False, column_types=None, row_order=None, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.with_actions = with_actions
+        column_types = {k.lower(): v for k, v in (column_types or {}).items()}
+        self.kinds = [column_types.get(header.lower()) for header in headers]
+        self._keys = [header.lower() for header in headers]
+        self.order_column = self._keys.index(row_order[0].lower()) if row_order else None
+        self.descending = bool(row_order and row_order[1])
+        self._rows = []  # Tuples of raw values, one per exposed row
+        self._ids = []  # Record id per exposed row
+        self._positions = {}  # Record id to exposed row, kept in step with _ids
+        self._pending = []  # (id, row) pairs received but not yet exposed
+        self._highlighted = set()
+        self.more_available = False
+        self.placeholder = None
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.is_placeholder():
+            return 1
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers) + (1 if self.with_actions else 0)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.headers[section] if section < len(self.headers) else "Actions"
+        return None
+
+    def flags(self, index):
+        if self.is_placeholder():
+            return Qt.ItemFlag.NoItemFlags  # Not selectable or clickable
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+
+        if self.is_placeholder():
+            if role == Qt.ItemDataRole.DisplayRole and column == 0:
+                return self.placeholder
+            if role == Qt.ItemDataRole.TextAlignmentRole:
+                return Qt.AlignmentFlag.AlignCenter
+            if role == Qt.ItemDataRole.ForegroundRole:
+                return QBrush(QColor("#aaaaaa"))
+            return None
+
+        if column >= len(self.headers):
+            return None  # Actions column
+
+        value = self._rows[row][column]
+        if role == Qt.ItemDataRole.DisplayRole:
+            text = format_value(self.kinds[column], value)
+            limit = TRUNCATE_LENGTHS.get(self._keys[column])
+            if limit and len(text) > limit:
+                return text[:limit] + "..."
+            return text
+        if role == Qt.ItemDataRole.ToolTipRole:
+            # Full text only for cells that are truncated
+            text = format_value(self.kinds[column], value)
+            limit = TRUNCATE_LENGTHS.get(self._keys[column])
+            return text if limit and len(text) > limit else None
+        if role == SORT_ROLE:
+            return sort_value(self.kinds[column], value)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+        if role == Qt.ItemDataRole.BackgroundRole and self._ids[row] in self._highlighted:
+            return QBrush(QColor(26, 35, 126, 100))  # Primary color with alpha
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and (bool(self._pending) or self.more_available)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        if not self._pending:
+            if self.more_available:
+                self.more_requested.emit()
+            return
+
+        batch = self._pending[:FETCH_BATCH]
+        del self._pending[:FETCH_BATCH]
+        self._expose(batch)
+
+    # Row management
+
+    def is_placeholder(self):
+        return self.placeholder is not None and not self._rows
+
+    def loaded_count(self):
+        """Rows currently exposed to the view"""
+        return len(self._rows)
+
+    def row_from_data(self, data):
+        """Convert a row dict (keys matched to headers case-insensitively) to a tuple"""
+        values = {key.lower(): value for key, value in data.items()}
+        return tuple(values.get(key) for key in self._keys)
+
+    def add_rows(self, rows, more_available=False):
+        """Queue (id, data) pairs for display, skipping records already shown"""
+        pending_ids = {item_id for item_id, _ in self._pending}
+        for item_id, data in rows:
+            # A record inserted or moved locally can show up again in a later page
+            if self.row_of(item_id) is None and item_id not in pending_ids:
+                self._pending.append((item_id, self.row_from_data(data)))
+        self.more_available = more_available
+
+    def _drop_placeholder(self):
+        if self.placeholder is not None:
+            # Drop the loading row before the first real rows arrive
+            self.beginResetModel()
+            self.placeholder = None
+            self.endResetModel()
+
+    def _expose(self, batch):
+        if not batch:
+            return
+        self._drop_placeholder()
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        for item_id, row in batch:
+            self._positions[item_id] = len(self._rows)
+            self._ids.append(item_id)
+            self._rows.append(row)
+        self.endInsertRows()
+
+    def _order_key(self, item_id, row):
+        return (sort_value(self.kinds[self.order_column], row[self.order_column]), item_id)
+
+    def _entry(self, position):
+        """(id, row) at a position in the loaded order: exposed rows, then the buffer"""
+        if position < len(self._rows):
+            return self._ids[position], self._rows[position]
+        return self._pending[position - len(self._rows)]
+
+    def _position_for(self, item_id, row):
+        """Binary search for where a record belongs in the loaded order"""
+        total = len(self._rows) + len(self._pending)
+        if self.order_column is None:
+            return total
+        key = self._order_key(item_id, row)
+        low, high = 0, total
+        while low < high:
+            middle = (low + high) // 2
+            middle_key = self._order_key(*self._entry(middle))
+            if (middle_key > key) if self.descending else (middle_key < key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def insert_row(self, item_id, row):
+        """Insert a record at its sorted position.
+
+        Returns False when it sorts after every loaded row while more pages remain;
+        it then belongs to a page that has not been fetched and arrives with it.
+        """
+        position = self._position_for(item_id, row)
+        if position == len(self._rows) + len(self._pending) and self.more_available:
+            return False
+
+        if position > len(self._rows) or (position == len(self._rows) and self._pending):
+            self._pending.insert(position - len(self._rows), (item_id, row))
+            return True
+
+        self._drop_placeholder()
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._ids.insert(position, item_id)
+        self._rows.insert(position, row)
+        self._shift_positions(position)
+        self.endInsertRows()
+        return True
+
+    def update_row(self, item_id, row):
+        """Replace a record's values, moving it if its sort key changed"""
+        position = self.row_of(item_id)
+        if position is None:
+            if self.remove_row(item_id):  # Still buffered
+                return self.insert_row(item_id, row)
+            return False
+
+        if self.order_column is not None and \
+                self._order_key(item_id, row) != self._order_key(item_id, self._rows[position]):
+            self.remove_row(item_id)
+            return self.insert_row(item_id, row)
+
+        self._rows[position] = row
+        self.dataChanged.emit(self.index(position, 0), self.index(position, self.columnCount() - 1))
+        return True
+
+    def remove_row(self, item_id):
+        """Remove a record; returns False if it is not loaded"""
+        position = self.row_of(item_id)
+        if position is None:
+            for index, (pending_id, _) in enumerate(self._pending):
+                if pending_id == item_id:
+                    del self._pending[index]
+                    return True
+            return False
+
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self._ids[position]
+        del self._rows[position]
+        del self._positions[item_id]
+        self._shift_positions(position)
+        self._highlighted.discard(item_id)
+        self.endRemoveRows()
+        return True
+
+    def expose_until(self, item_id):
+        """Expose buffered rows up to and including item_id; returns False if it is not loaded"""
+        if self.row_of(item_id) is not None:
+            return True
+        for position, (pending_id, _) in enumerate(self._pending):
+            if pending_id == item_id:
+                batch = self._pending[:position + 1]
+                del self._pending[:position + 1]
+                self._expose(batch)
+                return True
+        return False
+
+    def clear(self, placeholder=None):
+        self.beginResetModel()
+        self._rows = []
+        self._ids = []
+        self._positions = {}
+        self._pending = []
+        self._highlighted = set()
+        self.more_available = False
+        self.placeholder = placeholder
+        self.endResetModel()
+
+    def item_id(self, row):
+        if 0 <= row < len(self._ids):
+            return self._ids[row]
+        return None
+
+    def row_of(self, item_id):
+        return self._positions.get(item_id)
+
+    def _shift_positions(self, start):
+        """Renumber the rows from start on after an insert or removal there"""
+        self._positions.update(zip(self._ids[start:], range(start, len(self._ids))))
+
+    def full_text(self, row, column):
+        return format_value(self.kinds[column], self._rows[row][column])
+
+    def set_highlighted(self, item_id, highlighted):
+        if highlighted:
+            self._highlighted.add(item_id)
+        else:
+            self._highlighted.discard(item_id)
+        row = self.row_of(item_id)
+        if row is not None:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1),
+                                  [Qt.ItemDataRole.BackgroundRole])
+
+
+# Row action buttons: (icon text, tooltip, text color, hover background)
+ACTIONS = {
+    'view': ("👁️", "View Receipt", "#ffffff", QColor(255, 255, 255, 25)),
+    'download': ("⬇️", "Download Receipt", "#ffffff", QColor(255, 255, 255, 25)),
+    'paid': ("✓", "Mark as Paid", "#ffffff", QColor(255, 255, 255, 25)),
+    'edit': ("✏️", "Edit", "#ffffff", QColor(255, 255, 255, 25)),
+    'delete': ("✖", "Delete", "#f44336", QColor(244, 67, 54, 25)),
+}
+
+
+class ActionsDelegate(QStyledItemDelegate):
+    """Paints the row action buttons and handles their clicks, hover and tooltips.
+
+    Nothing is created per row: the buttons are drawn from the cell rectangle, so
+    building the table costs the same whatever the number of actions.
+    """
+    action_clicked = pyqtSignal(str, int)  # action name, view row
+
+    BUTTON_SIZE = 36
+    SPACING = 8
+    MARGIN = 5
+
+    def __init__(self, actions, parent=None):
+        super().__init__(parent)
+        self.actions = actions
+        self.hover = None  # (row, action) under the mouse
+        self.font = QFont()
+        self.font.setPixelSize(18)
+
+    def button_rects(self, cell_rect):
+        """Yield (action, rect) for each button, left aligned in the cell"""
+        top = cell_rect.top() + (cell_rect.height() - self.BUTTON_SIZE) // 2
+        left = cell_rect.left() + self.MARGIN
+        for action in self.actions:
+            yield action, QRect(left, top, self.BUTTON_SIZE, self.BUTTON_SIZE)
+            left += self.BUTTON_SIZE + self.SPACING
+
+    def action_at(self, cell_rect, pos):
+        for action, rect in self.button_rects(cell_rect):
+            if rect.contains(pos):
+                return action
+        return None
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)  # Selection and alternating background
+        if not index.flags() & Qt.ItemFlag.ItemIsEnabled:
+            return  # Loading placeholder row
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.font)
+        for action, rect in self.button_rects(option.rect):
+            icon_text, _, color, hover_color = ACTIONS[action]
+            if self.hover == (index.row(), action):
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(hover_color)
+                painter.drawRoundedRect(rect, 4, 4)
+            painter.setPen(QColor(color))
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, icon_text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if not index.flags() & Qt.ItemFlag.ItemIsEnabled:
+            return False
+
+        if event.type() == QEvent.Type.MouseMove:
+            action = self.action_at(option.rect, event.position().toPoint())
+            hover = (index.row(), action) if action else None
+            if hover != self.hover:
+                self.hover = hover
+                self.parent().viewport().update(option.rect)
+            return False
+
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton):
+            action = self.action_at(option.rect, event.position().toPoint())
+            if action:
+                self.action_clicked.emit(action, index.row())
+                return True
+        return False
+
+    def helpEvent(self, event, view, option, index):
+        if event.type() == QEvent.Type.ToolTip:
+            action = self.action_at(option.rect, event.pos())
+            if action:
+                QToolTip.showText(event.globalPos(), ACTIONS[action][1], view)
+                return True
+            QToolTip.hideText()
+            event.ignore()
+            return True
+        return super().helpEvent(event, view, option, index)
+
+    def clear_hover(self, viewport):
+        if self.hover is not None:
+            self.hover = None
+            viewport.update()
+
+
+class ModernTable(QTableView):
     view_clicked = pyqtSignal(int)
     download_clicked = pyqtSignal(int)
     edit_clicked = pyqtSignal(int)
     delete_clicked = pyqtSignal(int)
     paid_clicked = pyqtSignal(int)  # New signal for marking as paid
-    
-    def __init__(self, headers, with_actions=False, parent=None):
+    fetch_more_requested = pyqtSignal()  # Emitted when the view needs rows that are not loaded yet
+
+    def __init__(self, headers, with_actions=False, column_types=None, row_order=None, parent=None):
+        """column_types maps header names to CURRENCY, DATE or DATETIME; those cells
+        take raw floats and dates, formatted for display and sorted by value.
+        row_order is (header, descending), matching the query that loads the rows."""
         super().__init__(parent)
         self.headers = headers
         self.with_actions = with_actions
-        self.row_id_map = {}  # Map row index to data ID
+
+        lowered = [header.lower() for header in headers]
+        # Receipts get view/download actions, subscriptions a "Mark as Paid" action
+        self.is_receipt = 'notes' in lowered and 'date' in lowered
+        self.is_subscription = 'billing cycle' in lowered
+
+        self.source_model = LedgerTableModel(headers, with_actions, column_types, row_order, self)
+        self.source_model.more_requested.connect(self.fetch_more_requested)
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.source_model)
+        self.proxy_model.setSortRole(SORT_ROLE)
+        self.setModel(self.proxy_model)
+
         self.init_ui()
-        self.cellDoubleClicked.connect(self.on_cell_double_clicked)
-        
-    def init_ui(self):
-        # Set column count based on headers plus actions column if needed
-        column_count = len(self.headers)
-        if self.with_actions:
-            column_count += 1
-        self.setColumnCount(column_count)
-        
-        # Set headers
-        header_labels = self.headers.copy()
+        self.doubleClicked.connect(self.on_cell_double_clicked)
+
         if self.with_actions:
-            header_labels.append("Actions")
-        self.setHorizontalHeaderLabels(header_labels)
-        
+            actions = []
+            if self.is_receipt:
+                actions += ['view', 'download']
+            if self.is_subscription:
+                actions.append('paid')
+            actions += ['edit', 'delete']
+            self.actions_delegate = ActionsDelegate(actions, self)
+            self.actions_delegate.action_clicked.connect(self.on_action_clicked)
+            self.setItemDelegateForColumn(len(self.headers), self.actions_delegate)
+            self.setMouseTracking(True)  # Hover feedback for the painted buttons
+
+    def init_ui(self):
         # Set table properties
         self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.setAlternatingRowColors(True)
         self.setShowGrid(True)  # Show grid lines for better visibility
         self.verticalHeader().setVisible(False)
-        
+
         # Make all columns stretch to fill available space
         self.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        
+
         # But set the actions column to fixed size if present
         if self.with_actions:
-            last_column = self.columnCount() - 1
+            last_column = self.source_model.columnCount() - 1
             self.horizontalHeader().setSectionResizeMode(last_column, QHeaderView.ResizeMode.Fixed)
-            
+
         self.horizontalHeader().setHighlightSections(False)
-        
-        # Enable sorting
+
+        # Enable sorting, keeping the query order until a header is clicked
+        self.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
         self.setSortingEnabled(True)
-        
+
         # Set stylesheet for modern look
         self.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #3a3a3a;
                 color: #ffffff;
                 border: none;
                 gridline-color: #545454;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 10px;
                 border-bottom: 1px solid #545454;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #1a237e;
                 color: white;
             }
@@ -75,24 +510,16 @@ class ModernTable(QTableWidget):
                 border: none;
                 font-weight: bold;
             }
-            QTableWidget::item:alternate {
+            QTableView::item:alternate {
                 background-color: #333333;
             }
-            QToolButton {
-                background-color: transparent;
-                border: none;
-                padding: 4px;
-            }
-            QToolButton:hover {
-                background-color: rgba(255, 255, 255, 0.1);
-                border-radius: 4px;
-            }
         """)
-        
-        # Set minimum column widths and row height
+
+        # Set minimum column widths and a uniform row height (no per-row measuring)
         self.horizontalHeader().setMinimumSectionSize(120)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.verticalHeader().setDefaultSectionSize(50)  # Increased row height
-        
+
         # Enable context menu
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self.show_context_menu)
@@ -100,245 +527,165 @@ class ModernTable(QTableWidget):
     def show_context_menu(self, position):
         """Show context menu for the selected row"""
         row = self.rowAt(position.y())
-        if row >= 0:
-            item_id = self.row_id_map.get(row)
-            if item_id is not None:
-                from PyQt6.QtWidgets import QMenu
-                
-                context_menu = QMenu(self)
-                
-                # Check if this is a receipt
-                is_receipt = False
-                for col, header in enumerate(self.headers):
-                    if header.lower() in ['notes']:
-                        is_receipt = True
-                        break
-                
-                if is_receipt:
-                    view_action = context_menu.addAction("View Receipt")
-                    view_action.triggered.connect(lambda: self.view_clicked.emit(item_id))
-                    
-                    download_action = context_menu.addAction("Download Receipt")
-                    download_action.triggered.connect(lambda: self.download_clicked.emit(item_id))
-                    
-                    context_menu.addSeparator()
-                
-                # For any row with long text
-                for col, header in enumerate(self.headers):
-                    if header.lower() in ['description', 'notes', 'name', 'service', 'source']:
-                        item = self.item(row, col)
-                        if item and item.toolTip():
-                            view_text_action = context_menu.addAction(f"View Full {header}")
-                            view_text_action.triggered.connect(
-                                lambda checked=False, h=header, t=item.text(), ft=item.toolTip(): 
-                                self.show_text_dialog(h, t, ft)
-                            )
-                
-                context_menu.addSeparator()
-                
-                edit_action = context_menu.addAction("Edit")
-                edit_action.triggered.connect(lambda: self.edit_clicked.emit(item_id))
-                
-                delete_action = context_menu.addAction("Delete")
-                delete_action.triggered.connect(lambda: self.delete_clicked.emit(item_id))
-                
-                context_menu.exec(self.mapToGlobal(position))
-    
-    def create_icon_button(self, tooltip, icon_text, on_click, is_delete=False):
-        """Create a tool button with icon-like text character"""
-        btn = QToolButton()
-        btn.setText(icon_text)
-        btn.setToolTip(tooltip)
-        btn.clicked.connect(on_click)
-        btn.setIconSize(QSize(24, 24))
-        btn.setFixedSize(36, 36)
-        
-        if is_delete:
-            btn.setStyleSheet("""
-                QToolButton {
-                    color: #f44336;
-                    font-size: 18px;
-                    font-weight: bold;
-                }
-                QToolButton:hover {
-                    background-color: rgba(244, 67, 54, 0.1);
-                    border-radius: 4px;
-                }
-            """)
-        else:
-            btn.setStyleSheet("""
-                QToolButton {
-                    color: #ffffff;
-                    font-size: 18px;
-                }
-                QToolButton:hover {
-                    background-color: rgba(255, 255, 255, 0.1);
-                    border-radius: 4px;
-                }
-            """)
-        
-        return btn
-        
-    def add_row(self, data, item_id):
-        # Add a new row
-        row_position = self.rowCount()
-        self.insertRow(row_position)
-        
-        # Store ID mapping
-        self.row_id_map[row_position] = item_id
-        
-        # Add data to cells
+        item_id = self.item_id_for_row(row)
+        if item_id is None:
+            return
+
+        from PyQt6.QtWidgets import QMenu
+
+        context_menu = QMenu(self)
+
+        if self.is_receipt:
+            view_action = context_menu.addAction("View Receipt")
+            view_action.triggered.connect(lambda: self.view_clicked.emit(item_id))
+
+            download_action = context_menu.addAction("Download Receipt")
+            download_action.triggered.connect(lambda: self.download_clicked.emit(item_id))
+
+            context_menu.addSeparator()
+
+        # For any row with long text
         for col, header in enumerate(self.headers):
-            # Get value from data (case insensitive matching)
-            value = None
-            for key in data.keys():
-                if key.lower() == header.lower():
-                    value = data[key]
-                    break
-            
-            if value is not None:
-                item = QTableWidgetItem(str(value))
-                item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-                
-                # Truncate text for various field types
-                if header.lower() in ['description', 'notes'] and len(str(value)) > 40:
-                    item.setText(str(value)[:40] + "...")
-                    item.setToolTip(str(value))  # Show full text on hover
-                elif header.lower() in ['name', 'service', 'source'] and len(str(value)) > 25:
-                    item.setText(str(value)[:25] + "...")
-                    item.setToolTip(str(value))  # Show full text on hover
-                    
-                self.setItem(row_position, col, item)
-        
-        # Add action buttons if needed
+            if header.lower() in TRUNCATE_LENGTHS:
+                index = self.proxy_model.index(row, col)
+                if self.proxy_model.data(index, Qt.ItemDataRole.ToolTipRole):
+                    view_text_action = context_menu.addAction(f"View Full {header}")
+                    view_text_action.triggered.connect(
+                        lambda checked=False, h=header, i=index: self.show_cell_text(h, i)
+                    )
+
+        context_menu.addSeparator()
+
+        edit_action = context_menu.addAction("Edit")
+        edit_action.triggered.connect(lambda: self.edit_clicked.emit(item_id))
+
+        delete_action = context_menu.addAction("Delete")
+        delete_action.triggered.connect(lambda: self.delete_clicked.emit(item_id))
+
+        context_menu.exec(self.viewport().mapToGlobal(position))
+
+    def on_action_clicked(self, action, row):
+        """Emit the signal for a painted action button, keyed by record id"""
+        item_id = self.item_id_for_row(row)
+        if item_id is not None:
+            getattr(self, f"{action}_clicked").emit(item_id)
+
+    def mouseMoveEvent(self, event):
+        # The delegate only sees events over the actions column
+        if self.with_actions and self.columnAt(event.position().toPoint().x()) != len(self.headers):
+            self.actions_delegate.clear_hover(self.viewport())
+        super().mouseMoveEvent(event)
+
+    def leaveEvent(self, event):
         if self.with_actions:
-            action_widget = QWidget()
-            action_layout = QHBoxLayout(action_widget)
-            action_layout.setContentsMargins(5, 2, 5, 2)
-            action_layout.setSpacing(8)  # Spacing between icons
-            
-            # Check if this is a receipt (has view/download)
-            is_receipt = 'Date' in data and 'Notes' in data
-            
-            # Check if this is a subscription (has "Billing Cycle")
-            is_subscription = 'Billing Cycle' in data
-            
-            if is_receipt:
-                # Eye icon for view
-                view_btn = self.create_icon_button(
-                    "View Receipt", 
-                    "👁️", 
-                    lambda _, r=row_position: self.on_view_clicked(r)
-                )
-                
-                # Download icon 
-                download_btn = self.create_icon_button(
-                    "Download Receipt", 
-                    "⬇️", 
-                    lambda _, r=row_position: self.on_download_clicked(r)
-                )
-                
-                action_layout.addWidget(view_btn)
-                action_layout.addWidget(download_btn)
-            
-            # If this is a subscription, add a "Mark as Paid" button
-            if is_subscription:
-                paid_btn = self.create_icon_button(
-                    "Mark as Paid", 
-                    "✓", 
-                    lambda _, r=row_position: self.on_paid_clicked(r)
-                )
-                action_layout.addWidget(paid_btn)
-            
-            # Pencil icon for edit
-            edit_btn = self.create_icon_button(
-                "Edit", 
-                "✏️", 
-                lambda _, r=row_position: self.on_edit_clicked(r)
-            )
-            
-            # X icon for delete
-            delete_btn = self.create_icon_button(
-                "Delete", 
-                "✖", 
-                lambda _, r=row_position: self.on_delete_clicked(r),
-                is_delete=True
-            )
-            
-            action_layout.addWidget(edit_btn)
-            action_layout.addWidget(delete_btn)
-            action_layout.addStretch(1)  # Add stretch to align buttons to the left
-            
-            # Set a fixed minimum width for the actions cell and add the widget
-            self.setCellWidget(row_position, len(self.headers), action_widget)
-            
-            # Set fixed width for actions column - smaller with icons
-            action_width = 250 if (is_receipt or is_subscription) else 120
-            self.setColumnWidth(len(self.headers), action_width)
-        
-        # Adjust row height to accommodate buttons
-        self.setRowHeight(row_position, 50)  # Increased row height
-        
+            self.actions_delegate.clear_hover(self.viewport())
+        super().leaveEvent(event)
+
+    def add_row(self, data, item_id):
+        """Append a single row; data maps header names to raw values"""
+        self.add_rows([(item_id, data)], more_available=self.source_model.more_available)
+
+    def add_rows(self, rows, more_available=False):
+        """Append (item_id, data) pairs. The view pulls them in batches as the user
+        scrolls; more_available says whether another page can be fetched after them."""
+        if self.source_model.is_placeholder():
+            self.clearSpans()
+        self.source_model.add_rows(rows, more_available)
+        if self.source_model.loaded_count() < FETCH_BATCH:
+            self.source_model.fetchMore(QModelIndex())
+
+    def insert_row_sorted(self, data, item_id):
+        """Show a new record at its position in the load order"""
+        if self.source_model.is_placeholder():
+            self.clearSpans()
+        return self.source_model.insert_row(item_id, self.source_model.row_from_data(data))
+
+    def update_row(self, data, item_id):
+        """Refresh one record in place (moved if its sort key changed)"""
+        return self.source_model.update_row(item_id, self.source_model.row_from_data(data))
+
+    def remove_row(self, item_id):
+        """Remove one record from the table"""
+        return self.source_model.remove_row(item_id)
+
     def resizeEvent(self, event):
         """Override resize event to adjust column widths when table is resized"""
         super().resizeEvent(event)
-        
+
         # Set actions column width (if present)
         if self.with_actions:
-            last_column = self.columnCount() - 1
+            last_column = self.source_model.columnCount() - 1
             action_width = min(250, max(150, self.width() // 6))  # Scale with table width, but with limits
             self.setColumnWidth(last_column, action_width)
-    
+
     def clear_table(self):
         # Clear all rows
-        self.setRowCount(0)
-        self.row_id_map = {}
-        
-    def on_view_clicked(self, row):
-        item_id = self.row_id_map.get(row)
-        if item_id is not None:
-            self.view_clicked.emit(item_id)
-            
-    def on_download_clicked(self, row):
-        item_id = self.row_id_map.get(row)
-        if item_id is not None:
-            self.download_clicked.emit(item_id)
-            
-    def on_edit_clicked(self, row):
-        item_id = self.row_id_map.get(row)
-        if item_id is not None:
-            self.edit_clicked.emit(item_id)
-            
-    def on_delete_clicked(self, row):
-        item_id = self.row_id_map.get(row)
-        if item_id is not None:
-            self.delete_clicked.emit(item_id)
-            
-    def on_paid_clicked(self, row):
-        """Handle click on the "Mark as Paid" button"""
-        item_id = self.row_id_map.get(row)
-        if item_id is not None:
-            self.paid_clicked.emit(item_id)
-            
-    def on_cell_double_clicked(self, row, column):
+        self.clearSpans()
+        self.source_model.clear()
+
+    def show_loading(self, text="Loading..."):
+        """Replace the rows with a placeholder while a query is in flight"""
+        self.clearSpans()
+        self.source_model.clear(placeholder=text)
+        self.setSpan(0, 0, 1, self.source_model.columnCount())
+
+    def rowCount(self):
+        """Number of record rows shown (the loading placeholder does not count)"""
+        if self.source_model.is_placeholder():
+            return 0
+        return self.proxy_model.rowCount()
+
+    def item_id_for_row(self, row):
+        """Get the ID associated with a specific (view) row"""
+        if row < 0 or self.source_model.is_placeholder():
+            return None
+        source_index = self.proxy_model.mapToSource(self.proxy_model.index(row, 0))
+        if not source_index.isValid():
+            return None
+        return self.source_model.item_id(source_index.row())
+
+    def selected_ids(self):
+        """IDs of the selected rows, in view order"""
+        rows = sorted(index.row() for index in self.selectionModel().selectedRows())
+        return [item_id for item_id in map(self.item_id_for_row, rows) if item_id is not None]
+
+    def row_for_id(self, item_id):
+        """Return the view row showing item_id, or None if it has not been loaded"""
+        if not self.source_model.expose_until(item_id):
+            return None
+        source_row = self.source_model.row_of(item_id)
+        proxy_index = self.proxy_model.mapFromSource(self.source_model.index(source_row, 0))
+        return proxy_index.row() if proxy_index.isValid() else None
+
+    def scroll_to_row(self, row):
+        self.scrollTo(self.proxy_model.index(row, 0), QAbstractItemView.ScrollHint.PositionAtCenter)
+
+    def on_cell_double_clicked(self, index):
         """Handle double-click on a cell to show full description/notes"""
-        header = self.horizontalHeaderItem(column).text()
-        if header.lower() in ['description', 'notes', 'name', 'service', 'source']:
-            item = self.item(row, column)
-            if item and (item.toolTip() or item.text()):
-                self.show_text_dialog(header, item.text(), item.toolTip())
-    
+        if index.column() < len(self.headers):
+            header = self.headers[index.column()]
+            if header.lower() in TRUNCATE_LENGTHS:
+                self.show_cell_text(header, index)
+
+    def show_cell_text(self, header, index):
+        """Show the untruncated text of a cell"""
+        source_index = self.proxy_model.mapToSource(index)
+        if source_index.isValid() and not self.source_model.is_placeholder():
+            text = self.source_model.full_text(source_index.row(), source_index.column())
+            if text:
+                self.show_text_dialog(header, text)
+
     def show_text_dialog(self, header, text, full_text=None):
         """Show a dialog with the full text content"""
         dialog = QDialog(self)
         dialog.setWindowTitle(f"Full {header}")
         dialog.setMinimumSize(600, 400)  # Increased size
-        
+
         layout = QVBoxLayout(dialog)
-        
+
         # Use the full text from tooltip if provided (for truncated text)
         content = full_text if full_text else text
-        
+
         text_edit = QTextEdit()
         text_edit.setReadOnly(True)
         text_edit.setText(content)
@@ -351,50 +698,24 @@ class ModernTable(QTableWidget):
                 font-size: 14px;
             }
         """)
-        
+
         close_btn = QPushButton("Close")
         close_btn.setMinimumHeight(35)  # Increased button height
         close_btn.clicked.connect(dialog.close)
-        
+
         layout.addWidget(QLabel(f"{header}:"))
         layout.addWidget(text_edit)
         layout.addWidget(close_btn)
-        
+
         dialog.exec()
-    
-    def item_id_for_row(self, row):
-        """Get the ID associated with a specific row"""
-        return self.row_id_map.get(row)
-    
+
     def flash_highlight_row(self, row):
         """Highlight a row briefly with an animation to draw attention"""
-        # Save original background colors
-        original_colors = []
-        for col in range(self.columnCount()):
-            item = self.item(row, col)
-            if item:
-                original_colors.append(item.background())
-            else:
-                original_colors.append(QBrush(QColor(self.palette().base().color())))
-        
-        # Highlight color (light blue)
-        highlight_color = QColor(26, 35, 126, 100)  # Primary color with alpha
-        
-        # Apply highlight
-        for col in range(self.columnCount()):
-            item = self.item(row, col)
-            if item:
-                item.setBackground(QBrush(highlight_color))
-        
-        # Schedule restoration of original colors
-        def restore_colors():
-            if not self.isVisible():  # Skip if table is no longer visible
-                return
-            
-            for col in range(self.columnCount()):
-                item = self.item(row, col)
-                if item and col < len(original_colors):
-                    item.setBackground(original_colors[col])
-        
-        # Use a timer for the flash effect
-        QTimer.singleShot(1500, restore_colors)  # 1.5 seconds highlight
\ No newline at end of file
+        item_id = self.item_id_for_row(row)
+        if item_id is None:
+            return
+
+        self.source_model.set_highlighted(item_id, True)
+
+        # Keyed by id, so sorting while the highlight is shown is harmless
+        QTimer.singleShot(1500, lambda: self.source_model.set_highlighted(item_id, False))  # 1.5 seconds highlight
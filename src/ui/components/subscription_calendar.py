@@ -4,7 +4,7 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton,
                            QRadioButton, QButtonGroup)
 from PyQt6.QtCore import Qt, QDate, QSize, QRect
 from PyQt6.QtGui import QColor, QBrush, QIcon, QFont, QPainter, QPen, QTextOption
-from ...models.subscription import Subscription
+from ...utils.subscription_schedule import get_schedule
 from ...database.db_manager import DatabaseManager
 from datetime import datetime, timedelta, date
 
@@ -12,14 +12,14 @@ class SubscriptionCalendar(QCalendarWidget):
     """Custom calendar widget with dots to mark subscription dates"""
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.subscription_dates = {}  # Maps dates to number of subscriptions
+        self.month_index = {}  # Maps (year, month) to a MonthBucket
         self.setGridVisible(True)
         self.setVerticalHeaderFormat(QCalendarWidget.VerticalHeaderFormat.NoVerticalHeader)
         self.setSelectionMode(QCalendarWidget.SelectionMode.SingleSelection)
         
-    def set_subscription_dates(self, dates_dict):
-        """Set the dictionary of dates with subscriptions"""
-        self.subscription_dates = dates_dict
+    def set_month_index(self, index):
+        """Set the month buckets of billing dates to mark"""
+        self.month_index = index
         self.updateCells()
         
     def paintCell(self, painter, rect, date):
@@ -28,19 +28,19 @@ class SubscriptionCalendar(QCalendarWidget):
         super().paintCell(painter, rect, date)
         
         # Then add our indicators if there are subscriptions for this date
-        py_date = date.toPyDate()
-        if py_date in self.subscription_dates:
+        bucket = self.month_index.get((date.year(), date.month()))
+        subs = bucket.on_day(date.day()) if bucket is not None else []
+        if subs:
             # Draw a small colored dot in bottom center of the cell
             painter.save()
             
             # Get number of subscriptions for this date
-            subs = self.subscription_dates[py_date]
             count = len(subs)
             
             # Determine dot color based on subscription types
-            has_monthly = any(sub['cycle'] == 'Monthly' for sub in subs)
-            has_quarterly = any(sub['cycle'] == 'Quarterly' for sub in subs)
-            has_yearly = any(sub['cycle'] == 'Yearly' for sub in subs)
+            has_monthly = any(sub.cycle == 'Monthly' for sub in subs)
+            has_quarterly = any(sub.cycle == 'Quarterly' for sub in subs)
+            has_yearly = any(sub.cycle == 'Yearly' for sub in subs)
             
             if has_monthly:
                 dot_color = QColor("#2196F3")  # Blue
@@ -90,7 +90,7 @@ class SubscriptionCalendarDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = DatabaseManager()
-        self.subscription_dates = {}  # Map dates to subscription IDs and details
+        self.month_index = {}  # Map (year, month) to the billing dates of the visible months
         self.current_month_total = 0.0
         self.yearly_total = 0.0
         self.show_yearly_total = False  # Default to monthly total
@@ -147,6 +147,7 @@ class SubscriptionCalendarDialog(QDialog):
         # Use our custom calendar widget
         self.calendar = SubscriptionCalendar()
         self.calendar.clicked.connect(self.on_date_clicked)
+        self.calendar.currentPageChanged.connect(self.on_page_changed)
         
         # Style the calendar to match the app
         self.calendar.setStyleSheet("""
@@ -273,6 +274,8 @@ class SubscriptionCalendarDialog(QDialog):
     
     def refresh_data(self):
         """Refresh all data"""
+        # The shared schedule is cached; re-read it so changes made elsewhere show up
+        get_schedule().invalidate()
         self.load_subscriptions()
         
         # Updates will be handled in load_subscriptions which will:
@@ -287,8 +290,8 @@ class SubscriptionCalendarDialog(QDialog):
     
     def update_total_display(self):
         """Update the total label based on selected total type"""
-        selected_date = self.calendar.selectedDate().toPyDate()
-        month_name = selected_date.strftime("%B %Y")
+        shown_month = date(self.calendar.yearShown(), self.calendar.monthShown(), 1)
+        month_name = shown_month.strftime("%B %Y")
         
         if self.show_yearly_total:
             self.total_label.setText(f"Annual Total: ${self.yearly_total:.2f}")
@@ -296,172 +299,83 @@ class SubscriptionCalendarDialog(QDialog):
             self.total_label.setText(f"{month_name} Total: ${self.current_month_total:.2f}")
     
     def load_subscriptions(self):
-        """Load all subscriptions and mark their dates on the calendar"""
+        """Compute the yearly total and show the current month"""
         session = self.db_manager.get_session()
         try:
-            # Get current month and year for monthly total calculation
+            # Billed over the next twelve months
             current_date = QDate.currentDate().toPyDate()
-            
-            # Clear existing data
-            self.subscription_dates = {}
-            self.yearly_total = 0.0
-            
-            # Get all subscriptions
-            subscriptions = session.query(Subscription).all()
-            
-            # Process each subscription
-            for sub in subscriptions:
-                next_billing = sub.next_billing_date
-                
-                # Calculate dates for the next 12 months
-                all_dates = self.calculate_future_billing_dates(sub, 12)
-                
-                # Add each date to our tracking dict
-                for billing_date in all_dates:
-                    py_date = billing_date
-                    if py_date not in self.subscription_dates:
-                        self.subscription_dates[py_date] = []
-                    
-                    self.subscription_dates[py_date].append({
-                        'id': sub.id,
-                        'name': sub.name,
-                        'amount': sub.amount,
-                        'cycle': sub.billing_cycle
-                    })
-                
-                # Calculate yearly total
-                if sub.billing_cycle == "Monthly":
-                    self.yearly_total += sub.amount * 12
-                elif sub.billing_cycle == "Quarterly":
-                    self.yearly_total += sub.amount * 4
-                elif sub.billing_cycle == "Yearly":
-                    self.yearly_total += sub.amount
-            
-            # Set the subscription dates for our custom calendar
-            self.calendar.set_subscription_dates(self.subscription_dates)
-            
-            # Calculate the monthly total based on current month
-            self.recalculate_monthly_total(current_date)
-            
-            # Update the total display
-            self.update_total_display()
-            
-            # Set the current date
-            today = QDate.currentDate()
-            self.calendar.setSelectedDate(today)
-            
-            # Load the selected date's details
-            self.on_date_clicked(today)
-            
-            # Load upcoming subscriptions for the current month automatically
-            self.load_upcoming_subscriptions()
-            
+            self.yearly_total = get_schedule().total(session, current_date, current_date + timedelta(days=364))
         finally:
             session.close()
+        
+        # Set the current date; page changes are handled by on_page_changed
+        today = QDate.currentDate()
+        self.calendar.setSelectedDate(today)
+        self.load_month_window(today.year(), today.month())
+        
+        # Load the selected date's details
+        self.on_date_clicked(today)
     
-    def calculate_future_billing_dates(self, subscription, months_ahead):
-        """Calculate future billing dates based on billing cycle"""
-        dates = []
-        next_date = subscription.next_billing_date
-        
-        # Always include the next billing date
-        dates.append(next_date)
-        
-        if subscription.billing_cycle == "Monthly":
-            # Add monthly dates
-            current_date = next_date
-            for _ in range(months_ahead):
-                # Move to next month
-                month = current_date.month + 1
-                year = current_date.year
-                
-                if month > 12:
-                    month = 1
-                    year += 1
-                
-                # Make sure we don't exceed the day count for the month
-                day = min(current_date.day, self.days_in_month(year, month))
-                current_date = date(year, month, day)
-                dates.append(current_date)
-                
-        elif subscription.billing_cycle == "Quarterly":
-            # Add quarterly dates
-            current_date = next_date
-            for _ in range(months_ahead // 3):
-                # Move ahead 3 months
-                month = current_date.month + 3
-                year = current_date.year
-                
-                while month > 12:
-                    month -= 12
-                    year += 1
-                
-                # Make sure we don't exceed the day count for the month
-                day = min(current_date.day, self.days_in_month(year, month))
-                current_date = date(year, month, day)
-                dates.append(current_date)
-                
-        elif subscription.billing_cycle == "Yearly":
-            # Add yearly date if within the range
-            year = next_date.year + 1
-            if (year - datetime.now().year) <= (months_ahead // 12):
-                # Make sure we don't exceed the day count for the month
-                day = min(next_date.day, self.days_in_month(year, next_date.month))
-                dates.append(date(year, next_date.month, day))
-        
-        return dates
+    def load_month_window(self, year, month):
+        """Fetch the buckets of a month and its neighbours, which the calendar page also shows"""
+        session = self.db_manager.get_session()
+        try:
+            schedule = get_schedule()
+            self.month_index = {}
+            for offset in (-1, 0, 1):
+                shown_year, shown_month = divmod(year * 12 + month - 1 + offset, 12)
+                key = (shown_year, shown_month + 1)
+                self.month_index[key] = schedule.month(session, *key)
+        finally:
+            session.close()
+        
+        # Mark the billing dates on the calendar
+        self.calendar.set_month_index(self.month_index)
+        
+        # Monthly total and upcoming list follow the visible month
+        self.recalculate_monthly_total(date(year, month, 1))
+        self.load_upcoming_subscriptions()
     
-    def days_in_month(self, year, month):
-        """Get the number of days in a month"""
-        if month == 2:  # February
-            if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):  # Leap year
-                return 29
-            return 28
-        elif month in [4, 6, 9, 11]:  # 30-day months
-            return 30
-        else:  # 31-day months
-            return 31
+    def on_page_changed(self, year, month):
+        """Generate billing dates for the month the calendar navigated to"""
+        self.load_month_window(year, month)
     
     def on_date_clicked(self, qt_date):
         """Handle click on a calendar date"""
         py_date = qt_date.toPyDate()
         self.date_label.setText(f"Subscriptions due on {py_date.strftime('%B %d, %Y')}")
         
-        # Recalculate monthly total for the new month if needed
-        if py_date.month != self.calendar.selectedDate().toPyDate().month or py_date.year != self.calendar.selectedDate().toPyDate().year:
-            self.recalculate_monthly_total(py_date)
-            self.load_upcoming_subscriptions()  # Also reload upcoming for the new month
-            
-            # Update the upcoming label for the new month
-            self.upcoming_label.setText(f"Upcoming in {py_date.strftime('%B %Y')}")
+        # Highlight the selected date in the upcoming list
+        self.load_upcoming_subscriptions()
         
         # Clear the table
         self.sub_table.setRowCount(0)
         
         # If we have subscriptions for this date, show them
-        if py_date in self.subscription_dates:
-            subs = self.subscription_dates[py_date]
+        bucket = self.month_index.get((py_date.year, py_date.month))
+        subs = bucket.on_day(py_date.day) if bucket is not None else []
+        if subs:
             
             # Set up the table with the subscriptions
             self.sub_table.setRowCount(len(subs))
             
             for row, sub in enumerate(subs):
-                self.sub_table.setItem(row, 0, QTableWidgetItem(sub['name']))
+                self.sub_table.setItem(row, 0, QTableWidgetItem(sub.name))
                 
                 # Format amount with currency symbol
-                amount_item = QTableWidgetItem(f"${sub['amount']:.2f}")
+                amount_item = QTableWidgetItem(f"${sub.amount:.2f}")
                 amount_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
                 self.sub_table.setItem(row, 1, amount_item)
                 
-                self.sub_table.setItem(row, 2, QTableWidgetItem(sub['cycle']))
+                self.sub_table.setItem(row, 2, QTableWidgetItem(sub.cycle))
                 self.sub_table.setItem(row, 3, QTableWidgetItem(py_date.strftime("%Y-%m-%d")))
                 
                 # Color-code based on billing cycle
-                if sub['cycle'] == 'Monthly':
+                if sub.cycle == 'Monthly':
                     color = QColor("#2196F3")  # Blue
-                elif sub['cycle'] == 'Quarterly':
+                elif sub.cycle == 'Quarterly':
                     color = QColor("#4CAF50")  # Green
-                elif sub['cycle'] == 'Yearly':
+                elif sub.cycle == 'Yearly':
                     color = QColor("#F44336")  # Red
                 else:
                     color = QColor("#757575")  # Gray
@@ -474,69 +388,57 @@ class SubscriptionCalendarDialog(QDialog):
     
     def recalculate_monthly_total(self, current_date):
         """Recalculate total for a specific month"""
-        month = current_date.month
-        year = current_date.year
-        self.current_month_total = 0.0
-        
-        # Sum all subscriptions for this month
-        for py_date, subs in self.subscription_dates.items():
-            if py_date.month == month and py_date.year == year:
-                for sub in subs:
-                    self.current_month_total += sub['amount']
+        # The month's total is precomputed in its bucket
+        bucket = self.month_index.get((current_date.year, current_date.month))
+        self.current_month_total = bucket.total if bucket is not None else 0.0
         
         # Update the display if showing monthly totals
         if not self.show_yearly_total:
             self.update_total_display()
     
     def load_upcoming_subscriptions(self):
-        """Load upcoming subscriptions for the current month"""
+        """Load upcoming subscriptions for the month shown on the calendar"""
         selected_date = self.calendar.selectedDate().toPyDate()
-        year = selected_date.year
-        month = selected_date.month
+        year = self.calendar.yearShown()
+        month = self.calendar.monthShown()
         
         # Update the upcoming label for clarity
-        self.upcoming_label.setText(f"Upcoming in {selected_date.strftime('%B %Y')}")
+        self.upcoming_label.setText(f"Upcoming in {date(year, month, 1).strftime('%B %Y')}")
         
+        # The month's bucket is already in date order
         upcoming_subs = []
-        
-        # Collect all subscriptions for this month
-        for py_date, subs in self.subscription_dates.items():
-            if py_date.year == year and py_date.month == month:
-                for sub in subs:
-                    upcoming_subs.append({
-                        **sub, 
-                        'due_date': py_date
-                    })
-        
-        # Sort by date
-        upcoming_subs.sort(key=lambda x: x['due_date'])
+        bucket = self.month_index.get((year, month))
+        if bucket is not None:
+            for day, subs in bucket.items():
+                due_date = date(year, month, day)
+                upcoming_subs.extend((sub, due_date) for sub in subs)
         
         # Update the table
         self.upcoming_table.setRowCount(len(upcoming_subs))
         
-        for row, sub in enumerate(upcoming_subs):
-            self.upcoming_table.setItem(row, 0, QTableWidgetItem(sub['name']))
+        for row, (sub, due_date) in enumerate(upcoming_subs):
+            self.upcoming_table.setItem(row, 0, QTableWidgetItem(sub.name))
             
             # Format amount with currency symbol
-            amount_item = QTableWidgetItem(f"${sub['amount']:.2f}")
+            amount_item = QTableWidgetItem(f"${sub.amount:.2f}")
             amount_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
             self.upcoming_table.setItem(row, 1, amount_item)
             
-            self.upcoming_table.setItem(row, 2, QTableWidgetItem(sub['cycle']))
-            self.upcoming_table.setItem(row, 3, QTableWidgetItem(sub['due_date'].strftime("%Y-%m-%d")))
+            self.upcoming_table.setItem(row, 2, QTableWidgetItem(sub.cycle))
+            self.upcoming_table.setItem(row, 3, QTableWidgetItem(due_date.strftime("%Y-%m-%d")))
             
             # If this is the selected date, highlight the row
-            if sub['due_date'] == selected_date:
+            if due_date == selected_date:
                 for col in range(4):
                     item = self.upcoming_table.item(row, col)
                     item.setBackground(QBrush(QColor(26, 35, 126, 80)))  # Primary color with alpha
             # Otherwise, color based on billing cycle
             else:
-                if sub['cycle'] == 'Monthly':
+                if sub.cycle == 'Monthly':
                     color = QColor("#2196F3")  # Blue
-                elif sub['cycle'] == 'Quarterly':
+                elif sub.cycle == 'Quarterly':
                     color = QColor("#4CAF50")  # Green
-                elif sub['cycle'] == 'Yearly':
+                elif sub.cycle == 'Yearly':
                     color = QColor("#F44336")  # Red
                 else:
                     color = QColor("#757575")  # Gray
@@ -553,7 +455,4 @@ class SubscriptionCalendarDialog(QDialog):
         # Select today's date by default
         today = QDate.currentDate()
         self.calendar.setSelectedDate(today)
-        self.on_date_clicked(today)
-        
-        # Ensure upcoming is properly loaded
-        self.load_upcoming_subscriptions()
\ No newline at end of file
+        self.on_date_clicked(today)
\ No newline at end of file
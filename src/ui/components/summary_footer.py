@@ -2,9 +2,9 @@ from PyQt6.QtWidgets import (QFrame, QHBoxLayout, QLabel, QComboBox,
                            QPushButton, QSizePolicy)
 from PyQt6.QtCore import Qt, QDate, pyqtSignal
 from PyQt6.QtGui import QFont
-from ...utils.calculations import (calculate_total_expenses, calculate_total_income,
-                                 calculate_monthly_subscriptions, calculate_subscription_total)
+from ...utils.calculations import summary
 from ...database.db_manager import DatabaseManager
+from ...database.db_worker import DatabaseWorker
 from datetime import datetime, timedelta
 
 class SummaryFooter(QFrame):
@@ -13,6 +13,7 @@ class SummaryFooter(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = DatabaseManager()
+        self.db_worker = DatabaseWorker(self.db_manager, self)
         self.setObjectName("summary-footer")
         self.setMinimumHeight(60)
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
@@ -118,33 +119,32 @@ class SummaryFooter(QFrame):
         """Update all total values based on selected time period"""
         start_date, end_date = self.periods[self.current_period]
         
-        # Get session for database queries
-        session = self.db_manager.get_session()
-        try:
-            # Calculate totals
-            income_total = calculate_total_income(session, start_date, end_date)
-            expense_total = calculate_total_expenses(session, start_date, end_date)
-            sub_total = calculate_subscription_total(session, self.current_period)
-            
-            # Format and display totals
-            self.income_total.setText(f"${income_total:.2f}")
-            self.expenses_total.setText(f"${expense_total:.2f}")
-            self.subs_total.setText(f"${sub_total:.2f}")
-            
-            # Calculate and format net total
-            net = income_total - expense_total - sub_total
-            self.net_total.setText(f"${net:.2f}")
-            
-            # Color code net total based on value
-            if net > 0:
-                self.net_total.setStyleSheet("color: #4CAF50;")  # Green for positive
-            elif net < 0:
-                self.net_total.setStyleSheet("color: #F44336;")  # Red for negative
-            else:
-                self.net_total.setStyleSheet("color: #FFFFFF;")  # White for zero
-                
-        finally:
-            session.close()
+        # Show placeholders while the totals are computed in the background
+        for label in (self.income_total, self.expenses_total, self.subs_total, self.net_total):
+            label.setText("...")
+        
+        # One round trip for all four totals
+        self.db_worker.submit('totals', lambda session: summary(session, start_date, end_date),
+                              self.display_totals)
+    
+    def display_totals(self, totals):
+        """Show the totals computed by update_totals"""
+        # Format and display totals
+        self.income_total.setText(f"${totals['income']:.2f}")
+        self.expenses_total.setText(f"${totals['expenses']:.2f}")
+        self.subs_total.setText(f"${totals['subscriptions']:.2f}")
+        
+        # Format net total
+        net = totals['net']
+        self.net_total.setText(f"${net:.2f}")
+        
+        # Color code net total based on value
+        if net > 0:
+            self.net_total.setStyleSheet("color: #4CAF50;")  # Green for positive
+        elif net < 0:
+            self.net_total.setStyleSheet("color: #F44336;")  # Red for negative
+        else:
+            self.net_total.setStyleSheet("color: #FFFFFF;")  # White for zero
             
     def _get_month_range(self, offset=0):
         """Get date range for current month +/- offset"""
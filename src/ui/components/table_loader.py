@@ -0,0 +1,77 @@
+from PyQt6.QtCore import QObject
+from PyQt6.QtWidgets import QToolTip
+from ...database.db_worker import PagedLoader
+from ...database.pagination import fetch_page, list_query
+
+def record_row(record, columns):
+    """Table row data for one record, keyed by column header plus 'ID'.
+
+    columns lists (header, attribute, placeholder); an empty value is shown as
+    its placeholder unless the placeholder is None.
+    """
+    row = {}
+    for header, attribute, placeholder in columns:
+        value = getattr(record, attribute)
+        row[header] = value if placeholder is None else (value or placeholder)
+    row['ID'] = record.id
+    return row
+
+class TableLoader(QObject):
+    """Loads one model's records into a ModernTable on a DatabaseWorker.
+
+    With order_by (sort columns ending in the primary key) the table is filled a
+    keyset page at a time as it scrolls; without it every record is loaded at once.
+    """
+
+    def __init__(self, worker, key, table, model, columns, order_by=None, descending=True,
+                 error_text="Could not load records", parent=None):
+        super().__init__(parent or worker)
+        self.worker = worker
+        self.key = key
+        self.table = table
+        self.model = model
+        self.columns = columns
+        self.order_by = order_by
+        self.descending = descending
+        self.error_text = error_text
+        self.pages = None
+        if order_by is not None:
+            self.pages = PagedLoader(worker, key, self.fetch_page, self.populate, self.on_error, parent=self,
+                                     on_more_error=self.on_more_error)
+            table.fetch_more_requested.connect(self.pages.fetch_more)
+
+    def row(self, record):
+        """Table row data for one record"""
+        return record_row(record, self.columns)
+
+    def reload(self):
+        """Show a placeholder and load the first page (or every record) in the background"""
+        self.table.show_loading()
+        if self.pages is not None:
+            self.pages.reset()
+        else:
+            self.worker.submit(self.key, self.fetch_all, lambda rows: self.populate(rows, True), self.on_error)
+
+    # fetch_page and fetch_all run on a worker thread and return plain row data
+
+    def fetch_page(self, session, cursor, page_size):
+        return fetch_page(list_query(session, self.model), self.order_by, cursor, page_size,
+                          descending=self.descending, row_factory=self.row)
+
+    def fetch_all(self, session):
+        return [self.row(record) for record in list_query(session, self.model)]
+
+    def populate(self, rows, first_page):
+        """Show rows delivered by fetch_page or fetch_all"""
+        if first_page:
+            self.table.clear_table()
+        self.table.add_rows([(row['ID'], row) for row in rows],
+                            more_available=self.pages is not None and self.pages.has_more)
+
+    def on_error(self, message):
+        self.table.show_loading(self.error_text)
+
+    def on_more_error(self, message):
+        # Keep the rows already loaded; scrolling to the end again retries the page
+        QToolTip.showText(self.table.mapToGlobal(self.table.rect().bottomLeft()),
+                          "Could not load more rows, scroll down to retry", self.table)
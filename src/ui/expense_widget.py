@@ -1,18 +1,33 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                            QLineEdit, QPushButton, QDateEdit,
-                           QComboBox, QFrame, QMessageBox)
-from PyQt6.QtCore import Qt, QDate
+                           QComboBox, QFrame, QMessageBox, QFileDialog)
+from PyQt6.QtCore import Qt, QDate, pyqtSignal
 from datetime import datetime
 from .components.card_table import CardTable
 from ..models.expense import Expense
-from ..models.receipt import Receipt
 from ..database.db_manager import DatabaseManager
-from .components.modern_table import ModernTable
+from ..database.db_worker import DatabaseWorker
+from ..utils.statement_import import import_statement
+from ..utils.receipt_utils import receipt_reference_query
+from .components.modern_table import ModernTable, CURRENCY, DATE
+from .components.table_loader import TableLoader
+
+# (header, attribute, placeholder for empty values)
+EXPENSE_COLUMNS = [
+    ('Amount', 'amount', None),
+    ('Description', 'description', None),
+    ('Category', 'category', None),
+    ('Receipt Ref', 'receipt_reference', '-'),
+    ('Date', 'date', None),
+]
 
 class ExpenseWidget(QWidget):
+    statement_imported = pyqtSignal()  # Emitted after an import may have added income too
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = DatabaseManager()
+        self.db_worker = DatabaseWorker(self.db_manager, self)
         self.editing_id = None  # Track which record we're editing
         self.init_ui()
         self.load_expenses()
@@ -98,13 +113,28 @@ class ExpenseWidget(QWidget):
         main_layout.addWidget(form_frame)
         
         # Add table
-        headers = ["Amount", "Description", "Category", "Receipt Ref", "Date"]
-        self.expense_table = ModernTable(headers, with_actions=True)
+        headers = [header for header, _, _ in EXPENSE_COLUMNS]
+        self.expense_table = ModernTable(headers, with_actions=True,
+                                         column_types={'Amount': CURRENCY, 'Date': DATE},
+                                         row_order=('Date', True))
         self.expense_table.edit_clicked.connect(self.edit_expense)
         self.expense_table.delete_clicked.connect(self.delete_expense)
+        self.expense_loader = TableLoader(self.db_worker, 'expenses', self.expense_table, Expense, EXPENSE_COLUMNS,
+                                          order_by=(Expense.date, Expense.id),
+                                          error_text="Could not load expenses")
         table_label = QLabel("Recent Expenses")
         table_label.setProperty("class", "section-title")
-        main_layout.addWidget(table_label)
+        
+        # Bank statement import
+        self.import_button = QPushButton("Import Statement...")
+        self.import_button.setToolTip("Import transactions from a bank CSV export")
+        self.import_button.clicked.connect(self.import_statement)
+        
+        table_header = QHBoxLayout()
+        table_header.addWidget(table_label)
+        table_header.addStretch()
+        table_header.addWidget(self.import_button)
+        main_layout.addLayout(table_header)
         main_layout.addWidget(self.expense_table)
         
         self.setLayout(main_layout)
@@ -125,8 +155,8 @@ class ExpenseWidget(QWidget):
         
         session = self.db_manager.get_session()
         try:
-            # Get all receipts ordered by most recent first
-            receipts = session.query(Receipt).order_by(Receipt.date.desc()).all()
+            # Get all receipt references ordered by most recent first (no image blobs)
+            receipts = receipt_reference_query(session).all()
             
             for receipt in receipts:
                 if receipt.reference_id:
@@ -142,26 +172,46 @@ class ExpenseWidget(QWidget):
         finally:
             session.close()
 
+    def import_statement(self):
+        """Import a bank CSV export in the background"""
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Import Bank Statement", "", "CSV Files (*.csv);;All Files (*)")
+        if not filename:
+            return
+        
+        self.import_button.setEnabled(False)
+        self.import_button.setText("Importing...")
+        self.db_worker.submit(
+            'statement_import',
+            lambda session, report: import_statement(session, filename, progress=report),
+            self.on_statement_imported,
+            self.on_statement_import_failed,
+            lambda rows: self.import_button.setText(f"Importing... {rows:,} rows")
+        )
+
+    def on_statement_imported(self, result):
+        """Show the import summary and reload the table"""
+        self.reset_import_button()
+        summary = (f"Read {result.rows:,} transactions in {result.seconds:.1f}s.\n"
+                   f"Added {result.expenses:,} expenses and {result.income:,} income records; "
+                   f"skipped {result.duplicates:,} already in the ledger.")
+        if result.dropped:
+            summary += f"\nIgnored {result.dropped:,} rows without a date or amount."
+        QMessageBox.information(self, "Import Complete", summary)
+        self.load_expenses()
+        self.statement_imported.emit()
+
+    def on_statement_import_failed(self, message):
+        self.reset_import_button()
+        QMessageBox.warning(self, "Import Failed", f"Could not import the statement:\n{message}")
+
+    def reset_import_button(self):
+        self.import_button.setEnabled(True)
+        self.import_button.setText("Import Statement...")
+
     def load_expenses(self):
-        session = self.db_manager.get_session()
-        try:
-            # Clear existing table
-            self.expense_table.clear_table()
-            
-            # Load all expenses
-            expenses = session.query(Expense).all()
-            for expense in expenses:
-                expense_data = {
-                    'Amount': f"${expense.amount:.2f}",
-                    'Description': expense.description,
-                    'Category': expense.category,
-                    'Receipt Ref': expense.receipt_reference or '-',  # Display receipt reference
-                    'Date': expense.date.strftime("%Y-%m-%d"),
-                    'ID': expense.id
-                }
-                self.expense_table.add_row(expense_data, expense.id)
-        finally:
-            session.close()
+        """Load the first page of expenses in the background and show a placeholder meanwhile"""
+        self.expense_loader.reload()
 
     def add_expense(self):
         try:
@@ -191,11 +241,10 @@ class ExpenseWidget(QWidget):
                         expense.date = date
                         expense.receipt_reference = receipt_ref  # Update receipt reference
                         
-                        # Update display
                         session.commit()
                         
-                        # Refresh the table
-                        self.load_expenses()
+                        # Update just this row in the table
+                        self.expense_table.update_row(self.expense_loader.row(expense), expense.id)
                         
                         # Reset editing state
                         self.clear_form()
@@ -211,16 +260,8 @@ class ExpenseWidget(QWidget):
                     session.add(expense)
                     session.commit()
                     
-                    # Add to display
-                    expense_data = {
-                        'Amount': f"${expense.amount:.2f}",
-                        'Description': expense.description,
-                        'Category': expense.category,
-                        'Receipt Ref': expense.receipt_reference or '-',
-                        'Date': expense.date.strftime("%Y-%m-%d"),
-                        'ID': expense.id
-                    }
-                    self.expense_table.add_row(expense_data, expense.id)
+                    # Add to display at its place in the list
+                    self.expense_table.insert_row_sorted(self.expense_loader.row(expense), expense.id)
                     
                     self.clear_form()
             finally:
@@ -285,8 +326,8 @@ class ExpenseWidget(QWidget):
                     session.delete(expense)
                     session.commit()
                     
-                    # Refresh the table
-                    self.load_expenses()
+                    # Remove just this row from the table
+                    self.expense_table.remove_row(expense_id)
                     
                     # If we were editing this record, clear the form
                     if self.editing_id == expense_id:
@@ -309,16 +350,11 @@ class ExpenseWidget(QWidget):
     def highlight_record(self, record_id):
         """Highlight a specific record by ID when coming from search"""
         # Find the row with this ID
-        row_index = None
-        for row in range(self.expense_table.rowCount()):
-            item_id = self.expense_table.item_id_for_row(row)
-            if item_id == record_id:
-                row_index = row
-                break
+        row_index = self.expense_table.row_for_id(record_id)
         
         if row_index is not None:
             # Scroll to the row
-            self.expense_table.scrollToItem(self.expense_table.item(row_index, 0))
+            self.expense_table.scroll_to_row(row_index)
             
             # Select the row
             self.expense_table.selectRow(row_index)
@@ -327,4 +363,7 @@ class ExpenseWidget(QWidget):
             self.expense_table.flash_highlight_row(row_index)
             
             # Load the record in edit form
+            self.edit_expense(record_id)
+        else:
+            # The row is on a page that has not been loaded yet; still open it for editing
             self.edit_expense(record_id)
\ No newline at end of file
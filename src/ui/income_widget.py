@@ -5,13 +5,27 @@ from PyQt6.QtCore import Qt, QDate
 from ..models.income import Income
 from ..models.client import Client
 from ..database.db_manager import DatabaseManager
-from .components.modern_table import ModernTable
+from ..database.db_worker import DatabaseWorker
+from .components.modern_table import ModernTable, CURRENCY, DATE
+from .components.table_loader import TableLoader
 from datetime import datetime
 
+# (header, attribute, placeholder for empty values)
+INCOME_COLUMNS = [
+    ('Amount', 'amount', None),
+    ('Source', 'source', None),
+    ('Client', 'client', '-'),
+    ('Invoice ID', 'invoice_id', '-'),
+    ('Contract ID', 'contract_id', '-'),
+    ('Status', 'status', 'Pending'),
+    ('Date', 'date', None),
+]
+
 class IncomeWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = DatabaseManager()
+        self.db_worker = DatabaseWorker(self.db_manager, self)
         self.editing_id = None  # Track which record we're editing
         self.init_ui()
         self.load_income()
@@ -110,10 +124,15 @@ class IncomeWidget(QWidget):
         main_layout.addWidget(form_frame)
 
         # Add table with status column
-        headers = ["Amount", "Source", "Client", "Invoice ID", "Contract ID", "Status", "Date"]
-        self.income_table = ModernTable(headers, with_actions=True)
+        headers = [header for header, _, _ in INCOME_COLUMNS]
+        self.income_table = ModernTable(headers, with_actions=True,
+                                        column_types={'Amount': CURRENCY, 'Date': DATE},
+                                        row_order=('Date', True))
         self.income_table.edit_clicked.connect(self.edit_income)
         self.income_table.delete_clicked.connect(self.delete_income)
+        self.income_loader = TableLoader(self.db_worker, 'income', self.income_table, Income, INCOME_COLUMNS,
+                                         order_by=(Income.date, Income.id),
+                                         error_text="Could not load income")
         main_layout.addWidget(QLabel("Income History"))
         main_layout.addWidget(self.income_table)
         
@@ -145,27 +164,8 @@ class IncomeWidget(QWidget):
             session.close()
 
     def load_income(self):
-        session = self.db_manager.get_session()
-        try:
-            # Clear existing table
-            self.income_table.clear_table()
-            
-            # Load all income records
-            incomes = session.query(Income).all()
-            for income in incomes:
-                income_data = {
-                    'Amount': f"${income.amount:.2f}",
-                    'Source': income.source,
-                    'Client': income.client or '-',
-                    'Invoice ID': income.invoice_id or '-',
-                    'Contract ID': income.contract_id or '-',
-                    'Status': income.status or 'Pending',
-                    'Date': income.date.strftime("%Y-%m-%d"),
-                    'ID': income.id
-                }
-                self.income_table.add_row(income_data, income.id)
-        finally:
-            session.close()
+        """Load the first page of income in the background and show a placeholder meanwhile"""
+        self.income_loader.reload()
 
     def add_income(self):
         try:
@@ -194,14 +194,13 @@ class IncomeWidget(QWidget):
                         income.status = status
                         income.date = date
                         
-                        # Update display
                         session.commit()
                         
+                        # Update just this row in the table
+                        self.income_table.update_row(self.income_loader.row(income), income.id)
+                        
                         # Reset editing state
                         self.clear_form()
-                        
-                        # Refresh the table
-                        self.load_income()
                 else:  # Create new record
                     income = Income(
                         amount=amount,
@@ -216,20 +215,8 @@ class IncomeWidget(QWidget):
                     session.add(income)
                     session.commit()
                     
-                    # Get the ID assigned by the database
-                    income_data = {
-                        'Amount': f"${income.amount:.2f}",
-                        'Source': income.source,
-                        'Client': income.client or '-',
-                        'Invoice ID': income.invoice_id or '-',
-                        'Contract ID': income.contract_id or '-',
-                        'Status': income.status,
-                        'Date': income.date.strftime("%Y-%m-%d"),
-                        'ID': income.id
-                    }
-                    
-                    # Add to display
-                    self.income_table.add_row(income_data, income.id)
+                    # Add to display at its place in the list
+                    self.income_table.insert_row_sorted(self.income_loader.row(income), income.id)
                     self.clear_form()
             finally:
                 session.close()
@@ -299,8 +286,8 @@ class IncomeWidget(QWidget):
                     session.delete(income)
                     session.commit()
                     
-                    # Refresh the table
-                    self.load_income()
+                    # Remove just this row from the table
+                    self.income_table.remove_row(income_id)
                     
                     # If we were editing this record, clear the form
                     if self.editing_id == income_id:
@@ -324,16 +311,11 @@ class IncomeWidget(QWidget):
     def highlight_record(self, record_id):
         """Highlight a specific record by ID when coming from search"""
         # Find the row with this ID
-        row_index = None
-        for row in range(self.income_table.rowCount()):
-            item_id = self.income_table.item_id_for_row(row)
-            if item_id == record_id:
-                row_index = row
-                break
+        row_index = self.income_table.row_for_id(record_id)
         
         if row_index is not None:
             # Scroll to the row
-            self.income_table.scrollToItem(self.income_table.item(row_index, 0))
+            self.income_table.scroll_to_row(row_index)
             
             # Select the row
             self.income_table.selectRow(row_index)
@@ -342,4 +324,7 @@ class IncomeWidget(QWidget):
             self.income_table.flash_highlight_row(row_index)
             
             # Load the record in edit form
+            self.edit_income(record_id)
+        else:
+            # The row is on a page that has not been loaded yet; still open it for editing
             self.edit_income(record_id)
\ No newline at end of file
@@ -111,6 +111,10 @@ class MainWindow(QMainWindow):
         self.footer.period_changed.connect(self.on_period_changed)
         self.main_layout.addWidget(self.footer)
         
+        # A statement import adds income as well as expenses
+        self.expense_page.statement_imported.connect(self.income_page.load_income)
+        self.expense_page.statement_imported.connect(self.footer.update_totals)
+        
         # Initially collapse sidebar
         QApplication.processEvents()  # Process events to ensure UI is built
         self.sidebar.collapse()
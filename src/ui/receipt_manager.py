@@ -8,15 +8,27 @@ import io
 from datetime import datetime
 import os
 import fitz  # PyMuPDF for PDF handling
-from .components.modern_table import ModernTable
+from .components.modern_table import ModernTable, DATETIME
 from ..models.receipt import Receipt
 from ..database.db_manager import DatabaseManager
+from ..database.db_worker import DatabaseWorker
 from ..utils.reference_manager import ReferenceManager  # Import our new reference manager
+from ..utils.receipt_utils import fetch_receipt_image, store_receipt_image, release_receipt_image
+from .components.table_loader import TableLoader
+
+# (header, attribute, placeholder for empty values)
+RECEIPT_COLUMNS = [
+    ('Name', 'name', None),
+    ('Reference ID', 'reference_id', '-'),
+    ('Date', 'date', None),
+    ('Notes', 'notes', '-'),
+]
 
 class ReceiptManager(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = DatabaseManager()
+        self.db_worker = DatabaseWorker(self.db_manager, self)
         self.reference_manager = ReferenceManager()  # Add reference manager
         self.editing_id = None
         self.init_ui()
@@ -58,12 +70,17 @@ class ReceiptManager(QWidget):
         upload_layout.addWidget(self.upload_button)
         
         # Receipt display section
-        headers = ["Name", "Reference ID", "Date", "Notes"]
-        self.receipt_table = ModernTable(headers, with_actions=True)
+        headers = [header for header, _, _ in RECEIPT_COLUMNS]
+        self.receipt_table = ModernTable(headers, with_actions=True,
+                                         column_types={'Date': DATETIME},
+                                         row_order=('Date', True))
         self.receipt_table.view_clicked.connect(self.view_receipt)
         self.receipt_table.download_clicked.connect(self.download_receipt)
         self.receipt_table.edit_clicked.connect(self.edit_receipt)
         self.receipt_table.delete_clicked.connect(self.delete_receipt)
+        self.receipt_loader = TableLoader(self.db_worker, 'receipts', self.receipt_table, Receipt, RECEIPT_COLUMNS,
+                                          order_by=(Receipt.date, Receipt.id),
+                                          error_text="Could not load receipts")
         
         layout.addWidget(upload_section)
         layout.addWidget(QLabel("Stored Receipts"))
@@ -79,23 +96,8 @@ class ReceiptManager(QWidget):
             self.reference_input.setText(new_reference)
 
     def load_receipts(self):
-        # Clear existing table
-        self.receipt_table.clear_table()
-        
-        session = self.db_manager.get_session()
-        try:
-            receipts = session.query(Receipt).all()
-            for receipt in receipts:
-                receipt_data = {
-                    'Name': receipt.name,
-                    'Reference ID': receipt.reference_id or '-',
-                    'Date': receipt.date.strftime("%Y-%m-%d %H:%M"),
-                    'Notes': receipt.notes or '-',
-                    'ID': receipt.id
-                }
-                self.receipt_table.add_row(receipt_data, receipt.id)
-        finally:
-            session.close()
+        """Load the first page of receipts in the background and show a placeholder meanwhile"""
+        self.receipt_loader.reload()
 
     def upload_receipt(self):
         # If we're editing, just update the name, reference ID, and notes
@@ -110,9 +112,9 @@ class ReceiptManager(QWidget):
                     
                     session.commit()
                     
-                    # Reset form and refresh data
+                    # Update just this row, then reset the form
+                    self.receipt_table.update_row(self.receipt_loader.row(receipt), receipt.id)
                     self.clear_form()
-                    self.load_receipts()  # This will clear and reload all cards
                 else:
                     QMessageBox.warning(self, "Error", "Receipt not found")
             finally:
@@ -154,24 +156,18 @@ class ReceiptManager(QWidget):
                             name=self.name_input.text() or os.path.basename(file_name),
                             reference_id=reference_id,  # Use the auto-generated ID
                             notes=self.notes_input.toPlainText(),
-                            image=image_data
+                            **store_receipt_image(session, image_data)  # File in the blob store, metadata in the row
                         )
                         
                         session.add(receipt)
                         session.commit()
                         
                         # Get receipt data for display
-                        receipt_data = {
-                            'Name': receipt.name,
-                            'Reference ID': receipt.reference_id,
-                            'Date': receipt.date.strftime("%Y-%m-%d %H:%M"),
-                            'Notes': receipt.notes or '-',
-                            'ID': receipt.id
-                        }
+                        receipt_data = self.receipt_loader.row(receipt)
                         
                         self.clear_form()  
                         # Add to table after clearing form to prevent duplicate UI updates
-                        self.receipt_table.add_row(receipt_data, receipt.id)
+                        self.receipt_table.insert_row_sorted(receipt_data, receipt.id)
                         
                     finally:
                         session.close()
@@ -228,35 +224,48 @@ class ReceiptManager(QWidget):
     def view_receipt(self, receipt_id):
         session = self.db_manager.get_session()
         try:
-            receipt = session.query(Receipt).get(receipt_id)
-            if receipt and receipt.image:
-                image_dialog = ImageViewerDialog(receipt.name, receipt.image, self)
-                image_dialog.exec()
-            else:
-                QMessageBox.warning(self, "Error", "Receipt image not found")
+            # Only the viewer and download paths load the image blob
+            receipt = fetch_receipt_image(session, receipt_id)
         finally:
             session.close()
+        
+        if receipt and receipt[1]:
+            name, image = receipt
+            try:
+                image_dialog = ImageViewerDialog(name, image, self)
+                image_dialog.exec()
+            finally:
+                if hasattr(image, 'close'):
+                    image.close()  # Release the memory map
+        else:
+            QMessageBox.warning(self, "Error", "Receipt image not found")
 
     def download_receipt(self, receipt_id):
         session = self.db_manager.get_session()
         try:
-            receipt = session.query(Receipt).get(receipt_id)
-            if receipt and receipt.image:
-                save_path, _ = QFileDialog.getSaveFileName(
-                    self,
-                    "Save Receipt Image",
-                    os.path.join(os.path.expanduser("~"), f"{receipt.name}.png"),
-                    "Images (*.png *.jpg);;All Files (*)"
-                )
-                
+            receipt = fetch_receipt_image(session, receipt_id)
+        finally:
+            session.close()
+        
+        if receipt and receipt[1]:
+            name, image = receipt
+            save_path, _ = QFileDialog.getSaveFileName(
+                self,
+                "Save Receipt Image",
+                os.path.join(os.path.expanduser("~"), f"{name}.png"),
+                "Images (*.png *.jpg);;All Files (*)"
+            )
+            
+            try:
                 if save_path:
                     with open(save_path, 'wb') as f:
-                        f.write(receipt.image)
+                        f.write(image)
                     QMessageBox.information(self, "Success", "Receipt downloaded successfully")
-            else:
-                QMessageBox.warning(self, "Error", "Receipt image not found")
-        finally:
-            session.close()
+            finally:
+                if hasattr(image, 'close'):
+                    image.close()  # Release the memory map
+        else:
+            QMessageBox.warning(self, "Error", "Receipt image not found")
 
     def edit_receipt(self, receipt_id):
         session = self.db_manager.get_session()
@@ -289,11 +298,15 @@ class ReceiptManager(QWidget):
             try:
                 receipt = session.query(Receipt).get(receipt_id)
                 if receipt:
+                    digest = receipt.image_sha256
                     session.delete(receipt)
                     session.commit()
                     
-                    # Refresh the table
-                    self.load_receipts()
+                    # Remove the stored file if no other receipt shares it
+                    release_receipt_image(session, digest)
+                    
+                    # Remove just this row from the table
+                    self.receipt_table.remove_row(receipt_id)
                     
                     # If we were editing this record, clear the form
                     if self.editing_id == receipt_id:
@@ -304,16 +317,11 @@ class ReceiptManager(QWidget):
     def highlight_record(self, record_id):
         """Highlight a specific record by ID when coming from search"""
         # Find the row with this ID
-        row_index = None
-        for row in range(self.receipt_table.rowCount()):
-            item_id = self.receipt_table.item_id_for_row(row)
-            if item_id == record_id:
-                row_index = row
-                break
+        row_index = self.receipt_table.row_for_id(record_id)
         
         if row_index is not None:
             # Scroll to the row
-            self.receipt_table.scrollToItem(self.receipt_table.item(row_index, 0))
+            self.receipt_table.scroll_to_row(row_index)
             
             # Select the row
             self.receipt_table.selectRow(row_index)
@@ -326,9 +334,14 @@ class ReceiptManager(QWidget):
             
             # Also view the receipt
             self.view_receipt(record_id)
+        else:
+            # The row is on a page that has not been loaded yet; still open it
+            self.edit_receipt(record_id)
+            self.view_receipt(record_id)
 
 
 class ImageViewerDialog(QDialog):
+    """Shows a receipt image or PDF; image_data may be bytes or a read-only mmap from the blob store"""
     def __init__(self, title, image_data, parent=None):
         super().__init__(parent)
         self.setWindowTitle(f"Receipt: {title}")
@@ -339,9 +352,9 @@ class ImageViewerDialog(QDialog):
         self.current_page = 0
         self.pages = []
         
-        # Try to detect if it's a PDF
+        # Try to detect if it's a PDF (slicing an mmap only touches the first page)
         self.is_pdf = False
-        if image_data[:4] == b'%PDF':
+        if bytes(image_data[:4]) == b'%PDF':
             self.is_pdf = True
             self.load_pdf_pages()
         
@@ -442,7 +455,9 @@ class ImageViewerDialog(QDialog):
             self.show_image(self.image_data)
     
     def show_image(self, image_data, apply_zoom=True):
-        # Convert image data to QPixmap
+        # Convert image data to QPixmap (Qt needs bytes, so a mapped file is copied once here)
+        if not isinstance(image_data, bytes):
+            image_data = bytes(image_data)
         image = QImage.fromData(image_data)
         self.pixmap = QPixmap.fromImage(image)
         
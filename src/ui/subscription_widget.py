@@ -1,18 +1,31 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                            QLineEdit, QPushButton, QComboBox, QDateEdit,
-                           QFrame, QMessageBox, QToolButton)
+                           QFrame, QMessageBox, QToolButton, QAbstractItemView)
 from PyQt6.QtCore import Qt, QDate, QSize
 from PyQt6.QtGui import QIcon, QFont
 from ..models.subscription import Subscription
 from ..database.db_manager import DatabaseManager
-from .components.modern_table import ModernTable
+from ..database.db_worker import DatabaseWorker
+from .components.modern_table import ModernTable, CURRENCY, DATE
+from .components.table_loader import TableLoader
 from .components.subscription_calendar import SubscriptionCalendarDialog  # Import our new component
-from datetime import datetime
+from ..utils.subscription_schedule import get_schedule
+from ..utils.subscription_utils import mark_subscription_as_paid, advance_subscriptions
+from datetime import datetime, date
+
+# (header, attribute, placeholder for empty values)
+SUBSCRIPTION_COLUMNS = [
+    ('Service', 'name', None),
+    ('Amount', 'amount', None),
+    ('Billing Cycle', 'billing_cycle', None),
+    ('Next Billing', 'next_billing_date', None),
+]
 
 class SubscriptionWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = DatabaseManager()
+        self.db_worker = DatabaseWorker(self.db_manager, self)
         self.editing_id = None  # Track which record we're editing
         self.init_ui()
         self.load_subscriptions()
@@ -78,6 +91,17 @@ class SubscriptionWidget(QWidget):
         
         table_header.addStretch()
         
+        # Bulk payment buttons
+        self.mark_selected_button = QPushButton("Mark Selected Paid")
+        self.mark_selected_button.setToolTip("Advance the selected subscriptions past today")
+        self.mark_selected_button.clicked.connect(self.mark_selected_as_paid)
+        table_header.addWidget(self.mark_selected_button)
+        
+        self.catch_up_button = QPushButton("Catch Up Overdue")
+        self.catch_up_button.setToolTip("Mark every subscription due today or earlier as paid")
+        self.catch_up_button.clicked.connect(self.catch_up_overdue)
+        table_header.addWidget(self.catch_up_button)
+        
         # Add calendar button
         self.calendar_button = QPushButton("📅 View Calendar")
         self.calendar_button.setToolTip("View subscriptions in calendar view")
@@ -87,10 +111,16 @@ class SubscriptionWidget(QWidget):
         main_layout.addLayout(table_header)
 
         # Add table
-        headers = ["Service", "Amount", "Billing Cycle", "Next Billing"]
-        self.subscription_table = ModernTable(headers, with_actions=True)
+        headers = [header for header, _, _ in SUBSCRIPTION_COLUMNS]
+        self.subscription_table = ModernTable(headers, with_actions=True,
+                                              column_types={'Amount': CURRENCY, 'Next Billing': DATE})
         self.subscription_table.edit_clicked.connect(self.edit_subscription)
         self.subscription_table.delete_clicked.connect(self.delete_subscription)
+        self.subscription_loader = TableLoader(self.db_worker, 'subscriptions', self.subscription_table,
+                                               Subscription, SUBSCRIPTION_COLUMNS,
+                                               error_text="Could not load subscriptions")
+        self.subscription_table.paid_clicked.connect(self.mark_as_paid)
+        self.subscription_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         main_layout.addWidget(self.subscription_table)
 
         self.setLayout(main_layout)
@@ -101,24 +131,8 @@ class SubscriptionWidget(QWidget):
         calendar_dialog.exec()
 
     def load_subscriptions(self):
-        session = self.db_manager.get_session()
-        try:
-            # Clear existing table
-            self.subscription_table.clear_table()
-            
-            # Load all subscriptions
-            subscriptions = session.query(Subscription).all()
-            for subscription in subscriptions:
-                subscription_data = {
-                    'Service': subscription.name,
-                    'Amount': f"${subscription.amount:.2f}",
-                    'Billing Cycle': subscription.billing_cycle,
-                    'Next Billing': subscription.next_billing_date.strftime("%Y-%m-%d"),
-                    'ID': subscription.id
-                }
-                self.subscription_table.add_row(subscription_data, subscription.id)
-        finally:
-            session.close()
+        """Load subscriptions in the background and show a placeholder meanwhile"""
+        self.subscription_loader.reload()
 
     def add_subscription(self):
         try:
@@ -138,14 +152,14 @@ class SubscriptionWidget(QWidget):
                         subscription.billing_cycle = billing_cycle
                         subscription.next_billing_date = next_billing_date
                         
-                        # Update display
                         session.commit()
+                        get_schedule().invalidate(subscription.id)
+                        
+                        # Update just this row in the table
+                        self.subscription_table.update_row(self.subscription_loader.row(subscription), subscription.id)
                         
                         # Reset editing state
                         self.clear_form()
-                        
-                        # Refresh the table
-                        self.load_subscriptions()
                 else:  # Create new record
                     subscription = Subscription(
                         name=name,
@@ -156,18 +170,10 @@ class SubscriptionWidget(QWidget):
                     
                     session.add(subscription)
                     session.commit()
-                    
-                    # Get the ID assigned by the database
-                    subscription_data = {
-                        'Service': subscription.name,
-                        'Amount': f"${subscription.amount:.2f}",
-                        'Billing Cycle': subscription.billing_cycle,
-                        'Next Billing': subscription.next_billing_date.strftime("%Y-%m-%d"),
-                        'ID': subscription.id
-                    }
+                    get_schedule().invalidate(subscription.id)
                     
                     # Add to display
-                    self.subscription_table.add_row(subscription_data, subscription.id)
+                    self.subscription_table.insert_row_sorted(self.subscription_loader.row(subscription), subscription.id)
                     self.clear_form()
             finally:
                 session.close()
@@ -220,9 +226,10 @@ class SubscriptionWidget(QWidget):
                 if subscription:
                     session.delete(subscription)
                     session.commit()
+                    get_schedule().invalidate(subscription_id)
                     
-                    # Refresh the table
-                    self.load_subscriptions()
+                    # Remove just this row from the table
+                    self.subscription_table.remove_row(subscription_id)
                     
                     # If we were editing this record, clear the form
                     if self.editing_id == subscription_id:
@@ -230,6 +237,54 @@ class SubscriptionWidget(QWidget):
             finally:
                 session.close()
 
+    def mark_as_paid(self, subscription_id):
+        """Advance a subscription to its next billing date"""
+        session = self.db_manager.get_session()
+        try:
+            if mark_subscription_as_paid(session, subscription_id):
+                subscription = session.query(Subscription).get(subscription_id)
+                self.subscription_table.update_row(self.subscription_loader.row(subscription), subscription_id)
+        finally:
+            session.close()
+
+    def mark_selected_as_paid(self):
+        """Advance every selected subscription past today in one update"""
+        subscription_ids = self.subscription_table.selected_ids()
+        if not subscription_ids:
+            QMessageBox.information(self, "Mark as Paid", "Select one or more subscriptions first.")
+            return
+        self.advance_subscriptions(subscription_ids)
+
+    def catch_up_overdue(self):
+        """Mark every subscription billed today or earlier as paid, however many cycles behind"""
+        self.advance_subscriptions(None)
+
+    def advance_subscriptions(self, subscription_ids):
+        """Run the bulk update and refresh the affected rows"""
+        session = self.db_manager.get_session()
+        try:
+            rows = advance_subscriptions(session, date.today(), subscription_ids)
+        except Exception as e:
+            session.rollback()
+            print(f"Error marking subscriptions as paid: {e}")
+            QMessageBox.warning(self, "Mark as Paid Failed", f"Could not mark subscriptions as paid:\n{e}")
+            return
+        finally:
+            session.close()
+        
+        for subscription_id, name, amount, billing_cycle, next_billing_date in rows:
+            self.subscription_table.update_row({
+                'Service': name,
+                'Amount': amount,
+                'Billing Cycle': billing_cycle,
+                'Next Billing': next_billing_date,
+                'ID': subscription_id
+            }, subscription_id)
+        
+        if subscription_ids is None:
+            QMessageBox.information(self, "Catch Up Overdue",
+                                    f"Marked {len(rows)} overdue subscription(s) as paid.")
+
     def clear_form(self):
         """Clear form fields and reset editing state"""
         self.name_input.clear()
@@ -243,16 +298,11 @@ class SubscriptionWidget(QWidget):
     def highlight_record(self, record_id):
         """Highlight a specific record by ID when coming from search"""
         # Find the row with this ID
-        row_index = None
-        for row in range(self.subscription_table.rowCount()):
-            item_id = self.subscription_table.item_id_for_row(row)
-            if item_id == record_id:
-                row_index = row
-                break
+        row_index = self.subscription_table.row_for_id(record_id)
         
         if row_index is not None:
             # Scroll to the row
-            self.subscription_table.scrollToItem(self.subscription_table.item(row_index, 0))
+            self.subscription_table.scroll_to_row(row_index)
             
             # Select the row
             self.subscription_table.selectRow(row_index)
@@ -0,0 +1,121 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from ..database.db_manager import load_config
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+class BlobStore(ABC):
+    """Interface for content-addressed receipt image storage"""
+
+    @abstractmethod
+    def put(self, data):
+        """Store data and return its SHA-256 hex digest"""
+
+    @abstractmethod
+    def open(self, digest):
+        """Return a read-only bytes-like view of a stored blob"""
+
+    @abstractmethod
+    def exists(self, digest):
+        """Whether a blob with this digest is stored"""
+
+    @abstractmethod
+    def delete(self, digest):
+        """Remove a stored blob if present"""
+
+
+class LocalBlobStore(BlobStore):
+    """Stores blobs as files named by their SHA-256 under a local directory.
+
+    Files are sharded as <root>/ab/cd/<digest> and written atomically, so
+    identical uploads are stored once.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            return digest  # Already stored, deduplicated
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temp file in the same directory, then rename into place
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest
+
+    def open(self, digest):
+        """Memory-map a blob read-only; the caller should close() the result"""
+        with open(self.path_for(digest), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            # The mapping stays valid after the file object is closed
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def exists(self, digest):
+        return os.path.exists(self.path_for(digest))
+
+    def delete(self, digest):
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Available backends, selected with [Receipts] blob_store in config.ini
+BLOB_STORES = {
+    'local': LocalBlobStore
+}
+
+_blob_store = None
+
+def register_blob_store(name, store_class):
+    """Register an additional blob store backend"""
+    BLOB_STORES[name] = store_class
+
+def get_blob_store():
+    """Return the configured blob store (created once per process)"""
+    global _blob_store
+    if _blob_store is None:
+        config = load_config()
+        backend = config.get('Receipts', 'blob_store', fallback='local')
+        directory = config.get('Receipts', 'blob_directory', fallback='data/receipt_blobs')
+        if not os.path.isabs(directory):
+            directory = os.path.join(PROJECT_ROOT, directory)
+        _blob_store = BLOB_STORES[backend](directory)
+    return _blob_store
+
+def detect_mime_type(data):
+    """Guess the MIME type of an image or PDF from its leading bytes"""
+    header = bytes(data[:12])
+    if header.startswith(b'%PDF'):
+        return 'application/pdf'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if header.startswith(b'RIFF') and header[8:12] == b'WEBP':
+        return 'image/webp'
+    if header.startswith(b'BM'):
+        return 'image/bmp'
+    return 'application/octet-stream'
@@ -1,24 +1,58 @@
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, text
 from ..models.subscription import Subscription
+from ..models.monthly_total import MonthlyTotal
+from .subscription_schedule import get_schedule
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1)
+
+def _next_month(value):
+    if value.month == 12:
+        return datetime(value.year + 1, 1, 1)
+    return datetime(value.year, value.month + 1, 1)
+
+def split_months(start_date, end_date):
+    """Split [start_date, end_date] into (head, full months, tail).
+
+    Full months is a (first, stop) pair of month starts covered entirely by the
+    range, or None. Head and tail are (start, end) ranges of partial months
+    (end exclusive for the head, inclusive for the tail), or None.
+    """
+    first_full = start_date if start_date == _month_start(start_date) else _next_month(start_date)
+    stop_full = _month_start(end_date + timedelta(seconds=1))
+    if first_full >= stop_full:
+        return None, None, (start_date, end_date)
+
+    head = (start_date, first_full) if start_date < first_full else None
+    tail = (stop_full, end_date) if stop_full <= end_date else None
+    return head, (first_full, stop_full), tail
+
+def _period_total(session, model, kind, start_date=None, end_date=None):
+    """Sum amounts for a period: whole months from monthly_totals, partial months from the ledger"""
+    rollup = session.query(func.sum(MonthlyTotal.total)).filter(MonthlyTotal.kind == kind)
+    if not (start_date and end_date):
+        return rollup.scalar() or 0.0
+
+    head, full, tail = split_months(start_date, end_date)
+    total = 0.0
+    if full:
+        total += rollup.filter(MonthlyTotal.month >= full[0], MonthlyTotal.month < full[1]).scalar() or 0.0
+    if head:
+        total += session.query(func.sum(model.amount))\
+            .filter(model.date >= head[0], model.date < head[1]).scalar() or 0.0
+    if tail:
+        total += session.query(func.sum(model.amount))\
+            .filter(model.date.between(*tail)).scalar() or 0.0
+    return total
 
 def calculate_total_expenses(session, start_date=None, end_date=None):
     from ..models.expense import Expense
-    query = session.query(func.sum(Expense.amount))
-    
-    if start_date and end_date:
-        query = query.filter(Expense.date.between(start_date, end_date))
-    
-    return query.scalar() or 0.0
+    return _period_total(session, Expense, 'expense', start_date, end_date)
 
 def calculate_total_income(session, start_date=None, end_date=None):
     from ..models.income import Income
-    query = session.query(func.sum(Income.amount))
-    
-    if start_date and end_date:
-        query = query.filter(Income.date.between(start_date, end_date))
-    
-    return query.scalar() or 0.0
+    return _period_total(session, Income, 'income', start_date, end_date)
 
 def calculate_monthly_subscriptions(session):
     from ..models.subscription import Subscription
@@ -26,61 +60,80 @@ def calculate_monthly_subscriptions(session):
         .filter(Subscription.billing_cycle == 'Monthly')
     return query.scalar() or 0.0
 
-def calculate_subscription_total(session, period):
-    """Calculate total subscription costs for the given period"""
-    from ..models.subscription import Subscription
-    
-    # Get all subscriptions
-    subscriptions = session.query(Subscription).all()
-    
-    # Calculate total subscription cost for the period
-    total = 0.0
-    
-    for sub in subscriptions:
-        # Calculate cost based on billing cycle and period
-        amount = sub.amount
-        
-        if sub.billing_cycle == "Monthly":
-            # Monthly subscriptions
-            if period in ["This Month", "Last Month"]:
-                total += amount
-            elif period in ["This Quarter", "Last Quarter"]:
-                total += amount * 3  # 3 months in a quarter
-            elif period in ["This Year", "Last Year"]:
-                total += amount * 12  # 12 months in a year
-            elif period == "Last 6 Months":
-                total += amount * 6
-            elif period == "All Time":
-                # Calculate months since creation
-                # For simplicity, just use 24 months as an estimate
-                total += amount * 24
-                
-        elif sub.billing_cycle == "Quarterly":
-            # Quarterly subscriptions
-            if period in ["This Month", "Last Month"]:
-                total += amount / 3  # Prorated for one month
-            elif period in ["This Quarter", "Last Quarter"]:
-                total += amount
-            elif period in ["This Year", "Last Year"]:
-                total += amount * 4  # 4 quarters in a year
-            elif period == "Last 6 Months":
-                total += amount * 2  # 2 quarters in 6 months
-            elif period == "All Time":
-                # Calculate quarters since creation (estimate)
-                total += amount * 8  # 8 quarters = 2 years
-                
-        elif sub.billing_cycle == "Yearly":
-            # Yearly subscriptions
-            if period in ["This Month", "Last Month"]:
-                total += amount / 12  # Prorated for one month
-            elif period in ["This Quarter", "Last Quarter"]:
-                total += amount / 4  # Prorated for one quarter
-            elif period in ["This Year", "Last Year"]:
-                total += amount
-            elif period == "Last 6 Months":
-                total += amount / 2  # Prorated for 6 months
-            elif period == "All Time":
-                # Calculate years since creation (estimate)
-                total += amount * 2  # 2 years
-    
-    return total
\ No newline at end of file
+def _subscription_window(start_date, end_date, ledger_start):
+    """Clamp a cost window to the ledger's first month.
+
+    Subscriptions carry no start date, so billing is not counted before the
+    first month that has any income or expenses recorded.
+    """
+    if start_date is None or (ledger_start and start_date < ledger_start):
+        start_date = ledger_start
+    if end_date is None:
+        end_date = datetime.now()
+    return start_date, end_date
+
+def calculate_subscription_total(session, start_date=None, end_date=None):
+    """Total of every subscription billing date that falls within [start_date, end_date]"""
+    ledger_start = session.query(func.min(MonthlyTotal.month)).scalar()
+    if ledger_start is not None:
+        ledger_start = datetime(ledger_start.year, ledger_start.month, 1)
+    start_date, end_date = _subscription_window(start_date, end_date, ledger_start)
+    if start_date is None:
+        return 0.0
+
+    return get_schedule().total(session, start_date, end_date)
+
+SUMMARY_SQL = text("""
+    WITH rollup AS (
+        SELECT coalesce(sum(total) FILTER (WHERE kind = 'income'), 0) AS income,
+               coalesce(sum(total) FILTER (WHERE kind = 'expense'), 0) AS expenses
+        FROM monthly_totals
+        WHERE :all_months OR (month >= :full_start AND month < :full_stop)
+    ),
+    edge_income AS (
+        SELECT coalesce(sum(amount), 0) AS income FROM income
+        WHERE (date >= :head_start AND date < :head_stop) OR (date >= :tail_start AND date <= :tail_end)
+    ),
+    edge_expenses AS (
+        SELECT coalesce(sum(amount), 0) AS expenses FROM expenses
+        WHERE (date >= :head_start AND date < :head_stop) OR (date >= :tail_start AND date <= :tail_end)
+    )
+    SELECT r.income + ei.income, r.expenses + ee.expenses, (SELECT min(month) FROM monthly_totals)
+    FROM rollup r, edge_income ei, edge_expenses ee
+""")
+
+def summary(session, start_date=None, end_date=None):
+    """Income, expenses, subscriptions and net for a period in a single round trip.
+
+    Whole months come from monthly_totals and partial months from the ledger,
+    as in calculate_total_income/calculate_total_expenses. Subscription costs
+    come from the shared occurrence schedule, which only queries when cold.
+    """
+    params = {'all_months': False, 'full_start': None, 'full_stop': None,
+              'head_start': None, 'head_stop': None, 'tail_start': None, 'tail_end': None}
+    if start_date and end_date:
+        head, full, tail = split_months(start_date, end_date)
+        if full:
+            params['full_start'], params['full_stop'] = full
+        if head:
+            params['head_start'], params['head_stop'] = head
+        if tail:
+            params['tail_start'], params['tail_end'] = tail
+    else:
+        params['all_months'] = True
+
+    income, expenses, ledger_start = session.execute(SUMMARY_SQL, params).one()
+
+    subscriptions = 0.0
+    if ledger_start is not None:
+        ledger_start = datetime(ledger_start.year, ledger_start.month, 1)
+    window_start, window_end = _subscription_window(start_date, end_date, ledger_start)
+    if window_start is not None:
+        subscriptions = get_schedule().total(session, window_start, window_end)
+
+    return {
+        'income': income,
+        'expenses': expenses,
+        'subscriptions': subscriptions,
+        'net': income - expenses - subscriptions,
+    }
@@ -1,145 +1,412 @@
-from sqlalchemy import create_engine, MetaData, Table, Column, String, text
-import configparser
-import os
-
-def add_reference_id_to_receipts():
-    # Load config
-    config = configparser.ConfigParser()
-    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.ini')
-    config.read(config_path)
-    
-    # Create database connection
-    db_url = f"postgresql://{config['Database']['user']}:{config['Database']['password']}@{config['Database']['host']}:{config['Database']['port']}/{config['Database']['dbname']}"
-    engine = create_engine(db_url)
-    
-    # Create metadata and reflect existing table
-    metadata = MetaData()
-    metadata.reflect(bind=engine)
-    
-    # Check if the receipts table exists
-    if 'receipts' in metadata.tables:
-        receipts = metadata.tables['receipts']
-        
-        # Check if the reference_id column exists
-        if 'reference_id' not in receipts.columns:
-            print("Adding reference_id column to receipts table...")
-            
-            # Execute ALTER TABLE command using a transaction
-            with engine.begin() as conn:
-                conn.execute(text("ALTER TABLE receipts ADD COLUMN reference_id VARCHAR;"))
-                
-            print("Column added successfully!")
-        else:
-            print("reference_id column already exists.")
-    else:
-        print("receipts table does not exist.")
-
-def add_fields_to_income():
-    # Load config
-    config = configparser.ConfigParser()
-    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.ini')
-    config.read(config_path)
-    
-    # Create database connection
-    db_url = f"postgresql://{config['Database']['user']}:{config['Database']['password']}@{config['Database']['host']}:{config['Database']['port']}/{config['Database']['dbname']}"
-    engine = create_engine(db_url)
-    
-    # Create metadata and reflect existing table
-    metadata = MetaData()
-    metadata.reflect(bind=engine)
-    
-    # Check if the income table exists
-    if 'income' in metadata.tables:
-        income = metadata.tables['income']
-        
-        # Check for each column and add if it doesn't exist
-        new_columns = {
-            'client': 'VARCHAR',
-            'invoice_id': 'VARCHAR',
-            'contract_id': 'VARCHAR',
-            'status': 'VARCHAR'  # Added status column
-        }
-        
-        for col_name, col_type in new_columns.items():
-            if (col_name not in income.columns):
-                print(f"Adding {col_name} column to income table...")
-                
-                # Execute ALTER TABLE command using a transaction
-                with engine.begin() as conn:
-                    conn.execute(text(f"ALTER TABLE income ADD COLUMN {col_name} {col_type};"))
-                    
-                print(f"Column {col_name} added successfully!")
-            else:
-                print(f"{col_name} column already exists.")
+from sqlalchemy import text
+from ..database.db_manager import get_engine
+from ..models.base import search_vector_expression
+from ..models import expense, income, subscription, receipt, client
+from .rollup import ROLLUP_SOURCES, trigger_sql, rebuild_monthly_totals, check_monthly_totals
+import argparse
+import hashlib
+import time
+
+# Arbitrary key for the advisory lock that serializes concurrent upgrades
+MIGRATION_LOCK_KEY = 804_271_113
+
+class Migration:
+    """A single schema upgrade step.
+
+    Transactional steps receive a connection inside a transaction that also
+    records the new version. Non-transactional steps (online index builds,
+    batched data moves) receive the engine and manage their own connections;
+    they must be safe to re-run if interrupted.
+    """
+    def __init__(self, version, description, upgrade, transactional=True):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+        self.transactional = transactional
+
+MIGRATIONS = []  # Registered steps, kept sorted by version
+
+def migration(version, description, transactional=True):
+    """Decorator registering an upgrade step under a schema version"""
+    def register(upgrade):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, description, upgrade, transactional))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return upgrade
+    return register
+
+def create_index_concurrently(engine, name, table, columns, unique=False, using=None):
+    """Build an index without blocking writes (CREATE INDEX CONCURRENTLY)"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # An interrupted concurrent build leaves an INVALID index; drop it so the build can be retried
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {'name': name}).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+        unique_sql = "UNIQUE " if unique else ""
+        using_sql = f" USING {using}" if using else ""
+        conn.execute(text(
+            f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}{using_sql} ({columns})"
+        ))
+
+# ---------------------------------------------------------------------------
+# Migration steps
+# ---------------------------------------------------------------------------
+
+# The schema as it stood before versioned migrations, spelled out so it never
+# changes with the models; every later object belongs to a later migration
+BASELINE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS expenses (
+        id SERIAL PRIMARY KEY,
+        amount FLOAT NOT NULL,
+        description VARCHAR NOT NULL,
+        category VARCHAR NOT NULL,
+        date TIMESTAMP WITHOUT TIME ZONE,
+        receipt_image BYTEA,
+        receipt_reference VARCHAR
+    )""",
+    """CREATE TABLE IF NOT EXISTS income (
+        id SERIAL PRIMARY KEY,
+        amount FLOAT NOT NULL,
+        source VARCHAR NOT NULL,
+        client VARCHAR,
+        invoice_id VARCHAR,
+        contract_id VARCHAR,
+        status VARCHAR,
+        date TIMESTAMP WITHOUT TIME ZONE
+    )""",
+    """CREATE TABLE IF NOT EXISTS subscriptions (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        amount FLOAT NOT NULL,
+        billing_cycle VARCHAR NOT NULL,
+        next_billing_date DATE NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS receipts (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        reference_id VARCHAR,
+        date TIMESTAMP WITHOUT TIME ZONE,
+        notes VARCHAR,
+        image BYTEA NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS clients (
+        id SERIAL PRIMARY KEY,
+        business_name VARCHAR NOT NULL,
+        poc VARCHAR,
+        email VARCHAR NOT NULL,
+        phone VARCHAR,
+        address VARCHAR
+    )""",
+]
+
+@migration(1, "Baseline schema")
+def baseline_schema(conn):
+    # Fresh databases get every table; existing ones get the columns the old
+    # ad-hoc startup migrations used to add
+    for ddl in BASELINE_TABLES:
+        conn.execute(text(ddl))
+    conn.execute(text("ALTER TABLE receipts ADD COLUMN IF NOT EXISTS reference_id VARCHAR;"))
+    for col_name in ('client', 'invoice_id', 'contract_id', 'status'):
+        conn.execute(text(f"ALTER TABLE income ADD COLUMN IF NOT EXISTS {col_name} VARCHAR;"))
+    conn.execute(text("ALTER TABLE expenses ADD COLUMN IF NOT EXISTS receipt_reference VARCHAR;"))
+
+@migration(2, "Receipt blob store columns")
+def add_blob_columns_to_receipts(conn):
+    # Blob store metadata columns; the inline image becomes optional
+    conn.execute(text("ALTER TABLE receipts ADD COLUMN IF NOT EXISTS image_sha256 VARCHAR(64);"))
+    conn.execute(text("ALTER TABLE receipts ADD COLUMN IF NOT EXISTS image_size INTEGER;"))
+    conn.execute(text("ALTER TABLE receipts ADD COLUMN IF NOT EXISTS image_mime VARCHAR;"))
+    conn.execute(text("ALTER TABLE receipts ALTER COLUMN image DROP NOT NULL;"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_receipts_image_sha256 ON receipts (image_sha256);"))
+
+@migration(3, "Move inline receipt images to the blob store", transactional=False)
+def move_receipt_blobs_to_store(engine, batch_size=50):
+    """Move inline receipt images into the blob store, one committed batch at a time"""
+    from .blob_store import get_blob_store, detect_mime_type
+    from .receipt_utils import lock_blob
+
+    store = get_blob_store()
+    moved = 0
+
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, image FROM receipts WHERE image IS NOT NULL ORDER BY id LIMIT :limit"
+            ), {'limit': batch_size}).fetchall()
+
+            if not rows:
+                break
+
+            for receipt_id, image in rows:
+                data = bytes(image)
+                # Write the file before clearing the column; a rolled back batch
+                # only leaves a harmless unreferenced file behind
+                digest = hashlib.sha256(data).hexdigest()
+                lock_blob(conn, digest)  # Keeps a concurrent receipt delete from removing it
+                store.put(data)
+                conn.execute(text(
+                    "UPDATE receipts SET image = NULL, image_sha256 = :digest, "
+                    "image_size = :size, image_mime = :mime WHERE id = :id"
+                ), {'digest': digest, 'size': len(data), 'mime': detect_mime_type(data), 'id': receipt_id})
+
+        moved += len(rows)
+        print(f"Moved {moved} receipt images to the blob store...")
+
+# Indexes for the footer date-range sums and the receipt reference lookups
+LEDGER_INDEXES = [
+    # (name, table, columns, unique)
+    ('ix_expenses_date', 'expenses', 'date', False),
+    ('ix_income_date', 'income', 'date', False),
+    ('ix_expenses_category_date', 'expenses', 'category, date', False),
+    ('ix_income_client_date', 'income', 'client, date', False),
+    ('ix_expenses_receipt_reference', 'expenses', 'receipt_reference', False),
+]
+
+# Built by its own, last migration so duplicate data never holds back schema changes
+RECEIPT_REFERENCE_INDEX = ('ux_receipts_reference_id', 'receipts', 'reference_id', True)
+
+class DuplicateReceiptReferences(RuntimeError):
+    """Receipt reference IDs must be deduplicated before the unique index is built"""
+
+@migration(4, "Ledger date-range and lookup indexes", transactional=False)
+def add_ledger_indexes(engine):
+    for name, table, columns, unique in LEDGER_INDEXES:
+        print(f"Building index {name}...")
+        create_index_concurrently(engine, name, table, columns, unique=unique)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in ('expenses', 'income', 'receipts'):
+            conn.execute(text(f"ANALYZE {table}"))
+
+# (sort key, id) indexes behind the keyset-paginated ledger tables
+KEYSET_INDEXES = [
+    # (name, table, columns)
+    ('ix_expenses_date_id', 'expenses', 'date, id'),
+    ('ix_income_date_id', 'income', 'date, id'),
+    ('ix_receipts_date_id', 'receipts', 'date, id'),
+    ('ix_clients_business_name_id', 'clients', 'business_name, id'),
+]
+
+@migration(5, "Keyset pagination indexes", transactional=False)
+def add_keyset_indexes(engine):
+    for name, table, columns in KEYSET_INDEXES:
+        print(f"Building index {name}...")
+        create_index_concurrently(engine, name, table, columns)
+
+    # The (date, id) indexes also serve the footer date-range sums
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name in ('ix_expenses_date', 'ix_income_date'):
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+@migration(6, "Monthly totals rollup and triggers")
+def add_monthly_totals(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS monthly_totals (
+            month DATE NOT NULL,
+            kind VARCHAR NOT NULL,
+            category VARCHAR NOT NULL,
+            total FLOAT NOT NULL,
+            row_count INTEGER NOT NULL,
+            PRIMARY KEY (month, kind, category)
+        )
+    """))
+    for kind in ROLLUP_SOURCES:
+        conn.execute(text(trigger_sql(kind)))
+    rebuild_monthly_totals(conn)
+
+# Tables with a generated search_vector column and GIN index, from the models
+SEARCH_MODELS = [expense.Expense, income.Income, subscription.Subscription, receipt.Receipt, client.Client]
+
+@migration(7, "Full-text search vectors and GIN indexes", transactional=False)
+def add_search_vectors(engine):
+    for model in SEARCH_MODELS:
+        table = model.__tablename__
+        print(f"Adding search vector to {table}...")
+        # Adding a stored generated column rewrites the table once
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS ({search_vector_expression(model.__search_fields__)}) STORED"
+            ))
+        print(f"Building index ix_{table}_search...")
+        create_index_concurrently(engine, f"ix_{table}_search", table, 'search_vector', using='gin')
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for model in SEARCH_MODELS:
+            conn.execute(text(f"ANALYZE {model.__tablename__}"))
+
+@migration(8, "Unique receipt reference IDs", transactional=False)
+def add_receipt_reference_index(engine):
+    # A unique index cannot be built over duplicates; report them instead of guessing a fix.
+    # `python -m src.utils.db_migrate dedupe-receipts` renames them, after which startup
+    # (or `upgrade`) resumes from here
+    with engine.connect() as conn:
+        duplicates = conn.execute(text(
+            "SELECT reference_id FROM receipts WHERE reference_id IS NOT NULL "
+            "GROUP BY reference_id HAVING count(*) > 1 LIMIT 10"
+        )).scalars().all()
+    if duplicates:
+        raise DuplicateReceiptReferences(
+            "Duplicate receipt reference IDs must be resolved before indexing: " + ", ".join(duplicates)
+            + ". Run `python -m src.utils.db_migrate dedupe-receipts` to rename them."
+        )
+
+    name, table, columns, unique = RECEIPT_REFERENCE_INDEX
+    print(f"Building index {name}...")
+    create_index_concurrently(engine, name, table, columns, unique=unique)
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def get_current_version(conn):
+    """Return the applied schema version, creating the schema_version table if needed"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """))
+    return conn.execute(text("SELECT coalesce(max(version), 0) FROM schema_version")).scalar()
+
+def get_latest_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+def _pending(current, target):
+    return [m for m in MIGRATIONS
+            if m.version > current and (target is None or m.version <= target)]
+
+def _apply(engine, step):
+    print(f"Applying migration {step.version}: {step.description}...")
+    started = time.perf_counter()
+    record = text("INSERT INTO schema_version (version, description) VALUES (:version, :description)")
+    params = {'version': step.version, 'description': step.description}
+
+    if step.transactional:
+        with engine.begin() as conn:
+            step.upgrade(conn)
+            conn.execute(record, params)
     else:
-        print("income table does not exist.")
-
-def add_clients_table():
-    # Load config
-    config = configparser.ConfigParser()
-    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.ini')
-    config.read(config_path)
-    
-    # Create database connection
-    db_url = f"postgresql://{config['Database']['user']}:{config['Database']['password']}@{config['Database']['host']}:{config['Database']['port']}/{config['Database']['dbname']}"
-    engine = create_engine(db_url)
-    
-    # Create the clients table if it doesn't exist
+        step.upgrade(engine)
+        with engine.begin() as conn:
+            conn.execute(record, params)
+
+    print(f"Migration {step.version} applied in {time.perf_counter() - started:.2f}s")
+
+def run_migrations(engine=None, target=None):
+    """Apply pending migrations in order and return how many were applied.
+
+    The common case (schema already current) costs a single version check.
+    """
+    engine = engine or get_engine()
+
     with engine.begin() as conn:
-        # Check if the clients table exists
-        result = conn.execute(text("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'clients')"))
-        exists = result.scalar()
-        
-        if not exists:
-            print("Creating clients table...")
-            conn.execute(text("""
-                CREATE TABLE clients (
-                    id SERIAL PRIMARY KEY,
-                    business_name VARCHAR NOT NULL,
-                    poc VARCHAR,
-                    email VARCHAR NOT NULL,
-                    phone VARCHAR,
-                    address VARCHAR
-                )
-            """))
-            print("Clients table created successfully!")
-        else:
-            print("Clients table already exists.")
-
-def add_receipt_reference_to_expenses():
-    # Load config
-    config = configparser.ConfigParser()
-    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.ini')
-    config.read(config_path)
-    
-    # Create database connection
-    db_url = f"postgresql://{config['Database']['user']}:{config['Database']['password']}@{config['Database']['host']}:{config['Database']['port']}/{config['Database']['dbname']}"
-    engine = create_engine(db_url)
-    
-    # Create metadata and reflect existing table
-    metadata = MetaData()
-    metadata.reflect(bind=engine)
-    
-    # Check if the expenses table exists
-    if 'expenses' in metadata.tables:
-        expenses = metadata.tables['expenses']
-        
-        # Check if the receipt_reference column exists
-        if 'receipt_reference' not in expenses.columns:
-            print("Adding receipt_reference column to expenses table...")
-            
-            # Execute ALTER TABLE command using a transaction
+        current = get_current_version(conn)
+    if not _pending(current, target):
+        return 0
+
+    # Serialize upgrades across processes, then re-check under the lock. The lock
+    # connection autocommits so it never holds a transaction open while
+    # concurrent index builds wait for older transactions to finish
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {'key': MIGRATION_LOCK_KEY})
+        try:
             with engine.begin() as conn:
-                conn.execute(text("ALTER TABLE expenses ADD COLUMN receipt_reference VARCHAR;"))
-                
-            print("Column added successfully!")
-        else:
-            print("receipt_reference column already exists.")
+                current = get_current_version(conn)
+            pending = _pending(current, target)
+            for step in pending:
+                _apply(engine, step)
+            return len(pending)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': MIGRATION_LOCK_KEY})
+
+def print_status(engine=None):
+    engine = engine or get_engine()
+    with engine.begin() as conn:
+        current = get_current_version(conn)
+
+    print(f"Schema version: {current} (latest {get_latest_version()})")
+    for step in MIGRATIONS:
+        state = "applied" if step.version <= current else "pending"
+        print(f"  {step.version:>4}  {state:<8} {step.description}")
+
+def dedupe_receipt_references(engine=None):
+    """Rename duplicate receipt reference IDs so the unique index can be built.
+
+    The oldest receipt keeps each reference ID; later ones get '-2', '-3', ...
+    appended. Expenses keep pointing at the original ID, i.e. the oldest receipt.
+    Returns a list of (receipt id, old reference, new reference).
+    """
+    engine = engine or get_engine()
+    renamed = []
+    with engine.begin() as conn:
+        while True:
+            # Repeat in case a new name collides with an existing reference ID; the
+            # receipt that already had that name keeps it
+            rows = conn.execute(text("""
+                WITH ranked AS (
+                    SELECT id, reference_id,
+                           row_number() OVER (PARTITION BY reference_id
+                                              ORDER BY id = ANY(:renamed), id) AS n
+                    FROM receipts WHERE reference_id IS NOT NULL
+                )
+                UPDATE receipts r SET reference_id = ranked.reference_id || '-' || ranked.n
+                FROM ranked
+                WHERE r.id = ranked.id AND ranked.n > 1
+                RETURNING r.id, ranked.reference_id, r.reference_id
+            """), {'renamed': [row[0] for row in renamed]}).fetchall()
+            if not rows:
+                break
+            renamed.extend(rows)
+
+    for receipt_id, old, new in renamed:
+        print(f"  receipt {receipt_id}: {old} -> {new}")
+    print(f"{len(renamed)} duplicate receipt reference(s) renamed.")
+    return renamed
+
+def check_rollup(engine=None, rebuild=False):
+    """Report monthly_totals rows that disagree with the ledger, optionally rebuilding it"""
+    engine = engine or get_engine()
+    with engine.begin() as conn:
+        mismatches = check_monthly_totals(conn)
+        for month, kind, category, rollup_total, actual_total in mismatches:
+            print(f"  {month} {kind:<8} {category or '-':<16} rollup={rollup_total} actual={actual_total}")
+        print(f"{len(mismatches)} monthly total(s) out of date.")
+
+        if mismatches and rebuild:
+            rebuild_monthly_totals(conn)
+            print("Monthly totals rebuilt.")
+    return mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fritter Ledger database migrations")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('status', help="Show applied and pending migrations")
+    upgrade_parser = subparsers.add_parser('upgrade', help="Apply pending migrations")
+    upgrade_parser.add_argument('--target', type=int, default=None,
+                                help="Stop after this schema version")
+    rollup_parser = subparsers.add_parser('check-rollup', help="Verify the monthly totals rollup")
+    rollup_parser.add_argument('--rebuild', action='store_true',
+                               help="Rebuild the rollup if it is out of date")
+    subparsers.add_parser('dedupe-receipts',
+                          help="Rename duplicate receipt reference IDs blocking migration 8")
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        print_status()
+    elif args.command == 'check-rollup':
+        check_rollup(rebuild=args.rebuild)
+    elif args.command == 'dedupe-receipts':
+        dedupe_receipt_references()
     else:
-        print("expenses table does not exist.")
+        applied = run_migrations(target=getattr(args, 'target', None))
+        print(f"{applied} migration(s) applied.")
 
 if __name__ == "__main__":
-    add_reference_id_to_receipts()
-    add_fields_to_income()
-    add_clients_table()
-    add_receipt_reference_to_expenses()
\ No newline at end of file
+    main()
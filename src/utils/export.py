@@ -1,6 +1,55 @@
 import csv
+import gzip
+import io
 import json
-from datetime import datetime
+import struct
+import sys
+import time
+from array import array
+from datetime import datetime, date, timedelta
+from itertools import islice
+from sqlalchemy import LargeBinary, Boolean, Integer, Float, Numeric, DateTime, Date
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional: columnar exports fall back to the stdlib format
+    pyarrow = None
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH = 1000
+
+# Bytes per write when piping COPY output to a file
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Rows per column batch in columnar exports
+COLUMNAR_BATCH = 65536
+
+# Stdlib columnar format: magic, length-prefixed JSON schema, then batches, each a
+# length-prefixed JSON list of buffer sizes followed by the buffers; length 0 ends
+COLUMNAR_MAGIC = b'FCOL1\n'
+COLUMNAR_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow', 'fcol': '.fcol'}
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# array typecodes of the fixed-width column kinds
+ARRAY_TYPECODES = {'bool': 'b', 'int64': 'q', 'float64': 'd', 'timestamp_us': 'q', 'date32': 'i'}
+
+class ExportResult:
+    """Where an export was written, how many rows it holds and how long it took"""
+    def __init__(self, filename, rows, seconds):
+        self.filename = filename
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __repr__(self):
+        return f"<ExportResult(filename='{self.filename}', rows={self.rows}, rows_per_second={self.rows_per_second:.0f})>"
 
 def export_to_csv(data, filename):
     if not filename.endswith('.csv'):
@@ -18,6 +67,384 @@ def export_to_json(data, filename):
     with open(filename, 'w') as jsonfile:
         json.dump(data, jsonfile, default=str, indent=4)
 
+def export_columns(model, names=None):
+    """Scalar columns of a model's table; binary blobs such as receipt images and
+    generated columns (search vectors) are left out.
+
+    names, if given, selects and orders the columns by name.
+    """
+    columns = [column for column in model.__table__.columns
+               if not isinstance(column.type, LargeBinary) and column.computed is None]
+    if names is None:
+        return columns
+    by_name = {column.name: column for column in columns}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Cannot export columns {unknown} of {model.__tablename__}")
+    return [by_name[name] for name in names]
+
+def _date_filters(model, start_date, end_date):
+    """Conditions limiting a table's date column to [start_date, end_date]"""
+    if start_date is None and end_date is None:
+        return []
+    date_column = model.__table__.columns.get('date')
+    if date_column is None:
+        raise ValueError(f"{model.__tablename__} has no date column to filter on")
+    conditions = []
+    if start_date is not None:
+        conditions.append(date_column >= start_date)
+    if end_date is not None:
+        conditions.append(date_column <= end_date)
+    return conditions
+
+def stream_rows(session, model, columns=None, batch_size=EXPORT_BATCH, start_date=None, end_date=None):
+    """Yield a table's rows as plain tuples in primary key order.
+
+    Rows come from a server-side cursor batch_size at a time (yield_per turns on
+    stream_results), so no more than one batch is held in memory. start_date and
+    end_date optionally limit the rows by the table's date column.
+    """
+    columns = columns or export_columns(model)
+    query = session.query(*columns)\
+        .filter(*_date_filters(model, start_date, end_date))\
+        .order_by(*model.__table__.primary_key.columns)\
+        .yield_per(batch_size)
+    for row in query:
+        yield tuple(row)
+
 def format_data_for_export(session, model):
-    records = session.query(model).all()
-    return [record.__dict__ for record in records]
\ No newline at end of file
+    columns = export_columns(model)
+    names = [column.name for column in columns]
+    return [dict(zip(names, row)) for row in stream_rows(session, model, columns)]
+
+def _is_file(target):
+    """Whether an export target is an open binary file object rather than a filename"""
+    return hasattr(target, 'write')
+
+def _open_output(filename, extension, compress):
+    """Open a text file for writing, gzip-compressed if asked; returns (filename, file).
+
+    filename may also be an open binary file object, which is written through
+    (its name is returned as None).
+    """
+    if _is_file(filename):
+        raw = gzip.GzipFile(fileobj=filename, mode='wb') if compress else filename
+        return None, io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    if not filename.endswith(extension) and not filename.endswith(extension + '.gz'):
+        filename += extension
+    if compress:
+        if not filename.endswith('.gz'):
+            filename += '.gz'
+        return filename, gzip.open(filename, 'wt', newline='', encoding='utf-8')
+    return filename, open(filename, 'w', newline='', encoding='utf-8')
+
+def _report(progress, rows, started):
+    if progress is not None:
+        elapsed = time.perf_counter() - started
+        progress(rows, rows / elapsed if elapsed > 0 else float(rows))
+
+def stream_to_csv(session, model, filename, columns=None, compress=False,
+                  batch_size=EXPORT_BATCH, progress=None, start_date=None, end_date=None):
+    """Write a table to CSV row by row; memory use does not grow with the table.
+
+    filename may be an open binary file object instead. columns is an optional
+    list of column names and start_date/end_date an optional date range.
+    progress(rows, rows_per_second) is called after every batch. Returns an
+    ExportResult.
+    """
+    columns = export_columns(model, columns)
+    filename, output = _open_output(filename, '.csv', compress)
+    started = time.perf_counter()
+    rows = 0
+    with output:
+        writer = csv.writer(output)
+        writer.writerow([column.name for column in columns])
+        for row in stream_rows(session, model, columns, batch_size, start_date, end_date):
+            writer.writerow(row)
+            rows += 1
+            if rows % batch_size == 0:
+                _report(progress, rows, started)
+    _report(progress, rows, started)
+    return ExportResult(filename, rows, time.perf_counter() - started)
+
+def stream_to_json(session, model, filename, columns=None, compress=False,
+                   batch_size=EXPORT_BATCH, progress=None, start_date=None, end_date=None):
+    """Write a table as a JSON array of objects, one item at a time.
+
+    Takes the same options as stream_to_csv and returns an ExportResult.
+    """
+    columns = export_columns(model, columns)
+    names = [column.name for column in columns]
+    filename, output = _open_output(filename, '.json', compress)
+    started = time.perf_counter()
+    rows = 0
+    with output:
+        output.write('[')
+        for row in stream_rows(session, model, columns, batch_size, start_date, end_date):
+            output.write(',\n    ' if rows else '\n    ')
+            output.write(json.dumps(dict(zip(names, row)), default=str))
+            rows += 1
+            if rows % batch_size == 0:
+                _report(progress, rows, started)
+        output.write('\n]\n' if rows else ']\n')
+    _report(progress, rows, started)
+    return ExportResult(filename, rows, time.perf_counter() - started)
+
+def copy_to_csv(session, model, filename, columns=None, compress=False, start_date=None,
+                end_date=None, chunk_size=COPY_CHUNK_SIZE, progress=None, **options):
+    """Write a table to CSV with Postgres COPY, skipping per-row Python work.
+
+    The server formats the rows and psycopg2's copy_expert pipes them to the
+    file in chunk_size writes. Takes the same column and date range options as
+    stream_to_csv, which it falls back to on other databases. Returns an
+    ExportResult.
+    """
+    if session.get_bind().dialect.name != 'postgresql':
+        return stream_to_csv(session, model, filename, columns, compress, progress=progress,
+                             start_date=start_date, end_date=end_date, **options)
+
+    columns = export_columns(model, columns)
+    query = session.query(*columns)\
+        .filter(*_date_filters(model, start_date, end_date))\
+        .order_by(*model.__table__.primary_key.columns)
+    compiled = query.statement.compile(dialect=session.get_bind().dialect)
+
+    if _is_file(filename):
+        raw = gzip.GzipFile(fileobj=filename, mode='wb') if compress else filename
+        filename = None
+    else:
+        if not filename.endswith('.csv') and not filename.endswith('.csv.gz'):
+            filename += '.csv'
+        if compress and not filename.endswith('.gz'):
+            filename += '.gz'
+        raw = gzip.open(filename, 'wb') if compress else io.FileIO(filename, 'w')
+
+    started = time.perf_counter()
+    cursor = session.connection().connection.cursor()
+    try:
+        # psycopg2 binds the parameters client-side, so the SELECT can be inlined
+        select_sql = cursor.mogrify(str(compiled), compiled.params).decode('utf-8')
+        with io.BufferedWriter(raw, buffer_size=chunk_size) as output:
+            cursor.copy_expert(f"COPY ({select_sql}) TO STDOUT WITH CSV HEADER", output)
+        rows = cursor.rowcount
+    finally:
+        cursor.close()
+    _report(progress, rows, started)
+    return ExportResult(filename, rows, time.perf_counter() - started)
+
+def default_columnar_format():
+    """Parquet when pyarrow is installed, else the stdlib fcol format"""
+    return 'parquet' if pyarrow is not None else 'fcol'
+
+def _column_kind(column):
+    """Columnar storage kind for a SQLAlchemy column"""
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return 'bool'
+    if isinstance(column_type, Integer):
+        return 'int64'
+    if isinstance(column_type, (Float, Numeric)):
+        return 'float64'
+    if isinstance(column_type, DateTime):
+        return 'timestamp_us'
+    if isinstance(column_type, Date):
+        return 'date32'
+    return 'string'
+
+def _arrow_type(kind):
+    return {
+        'bool': pyarrow.bool_(),
+        'int64': pyarrow.int64(),
+        'float64': pyarrow.float64(),
+        'timestamp_us': pyarrow.timestamp('us'),
+        'date32': pyarrow.date32(),
+        'string': pyarrow.string(),
+    }[kind]
+
+def _row_batches(session, model, columns, batch_size):
+    """Lists of up to batch_size rows read from the server-side cursor"""
+    rows = stream_rows(session, model, columns, min(batch_size, EXPORT_BATCH * 10))
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def _encode_column(kind, values):
+    """Buffers for one column of a batch: validity bytes, values and, for strings, offsets"""
+    validity = bytes(value is not None for value in values)
+    if kind == 'string':
+        offsets = array('q', [0])
+        chunks = []
+        position = 0
+        for value in values:
+            if value is not None:
+                encoded = str(value).encode('utf-8')
+                chunks.append(encoded)
+                position += len(encoded)
+            offsets.append(position)
+        return [validity, b''.join(chunks), offsets.tobytes()]
+
+    if kind == 'timestamp_us':
+        values = [(value - EPOCH) // timedelta(microseconds=1) if value is not None else 0
+                  for value in values]
+    elif kind == 'date32':
+        values = [value.toordinal() - EPOCH_ORDINAL if value is not None else 0 for value in values]
+    else:
+        values = [value if value is not None else 0 for value in values]
+    return [validity, array(ARRAY_TYPECODES[kind], values).tobytes()]
+
+def _write_block(output, payload):
+    data = json.dumps(payload).encode('utf-8')
+    output.write(struct.pack('<I', len(data)))
+    output.write(data)
+
+def _write_fcol(batches, filename, table, columns, kinds, progress, started):
+    rows = 0
+    with (filename if _is_file(filename) else open(filename, 'wb')) as output:
+        output.write(COLUMNAR_MAGIC)
+        _write_block(output, {
+            'table': table,
+            'byteorder': sys.byteorder,
+            'columns': [{'name': column.name, 'kind': kind} for column, kind in zip(columns, kinds)],
+        })
+        for batch in batches:
+            buffers = []
+            for kind, values in zip(kinds, zip(*batch)):
+                buffers.extend(_encode_column(kind, values))
+            _write_block(output, {'rows': len(batch), 'buffers': [len(buffer) for buffer in buffers]})
+            for buffer in buffers:
+                output.write(buffer)
+            rows += len(batch)
+            _report(progress, rows, started)
+        output.write(struct.pack('<I', 0))
+    return rows
+
+def _write_arrow(batches, filename, format, columns, kinds, progress, started):
+    schema = pyarrow.schema([(column.name, _arrow_type(kind)) for column, kind in zip(columns, kinds)])
+    if format == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(filename, schema)
+    else:
+        writer = pyarrow.ipc.new_file(filename, schema)
+    rows = 0
+    try:
+        for batch in batches:
+            arrays = [pyarrow.array(values, type=field.type)
+                      for field, values in zip(schema, zip(*batch))]
+            record_batch = pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+            if format == 'parquet':
+                writer.write_table(pyarrow.Table.from_batches([record_batch]))
+            else:
+                writer.write_batch(record_batch)
+            rows += len(batch)
+            _report(progress, rows, started)
+    finally:
+        writer.close()
+    return rows
+
+def export_columnar(session, model, filename, columns=None, format=None,
+                    batch_size=COLUMNAR_BATCH, progress=None):
+    """Write a table column-wise, batch_size rows at a time, for analytics tools.
+
+    format is 'parquet' or 'arrow' (both need pyarrow) or 'fcol', the stdlib
+    fallback read back by read_columnar; by default Parquet when pyarrow is
+    installed and fcol otherwise. filename may be an open binary file object.
+    Returns an ExportResult.
+    """
+    if format is None:
+        format = default_columnar_format()
+    if format not in COLUMNAR_EXTENSIONS:
+        raise ValueError(f"Unknown columnar format: {format}")
+    if format != 'fcol' and pyarrow is None:
+        raise ValueError(f"Exporting {format} requires pyarrow")
+
+    columns = export_columns(model, columns)
+    kinds = [_column_kind(column) for column in columns]
+    if not _is_file(filename) and not filename.endswith(COLUMNAR_EXTENSIONS[format]):
+        filename += COLUMNAR_EXTENSIONS[format]
+
+    started = time.perf_counter()
+    batches = _row_batches(session, model, columns, batch_size)
+    if format == 'fcol':
+        rows = _write_fcol(batches, filename, model.__tablename__, columns, kinds, progress, started)
+    else:
+        rows = _write_arrow(batches, filename, format, columns, kinds, progress, started)
+    return ExportResult(None if _is_file(filename) else filename, rows, time.perf_counter() - started)
+
+def _read_block(source):
+    (length,) = struct.unpack('<I', source.read(4))
+    return json.loads(source.read(length)) if length else None
+
+def _decode_column(kind, buffers, rows, swap):
+    validity = buffers[0]
+    if kind == 'string':
+        data = buffers[1]
+        offsets = array('q')
+        offsets.frombytes(buffers[2])
+        if swap:
+            offsets.byteswap()
+        return [data[offsets[i]:offsets[i + 1]].decode('utf-8') if validity[i] else None
+                for i in range(rows)]
+
+    values = array(ARRAY_TYPECODES[kind])
+    values.frombytes(buffers[1])
+    if swap:
+        values.byteswap()
+    values = values.tolist()
+    if kind == 'bool':
+        values = [bool(value) for value in values]
+    elif kind == 'timestamp_us':
+        values = [EPOCH + timedelta(microseconds=value) for value in values]
+    elif kind == 'date32':
+        values = [date.fromordinal(value + EPOCH_ORDINAL) for value in values]
+    if 0 in validity:
+        values = [value if valid else None for value, valid in zip(values, validity)]
+    return values
+
+def read_columnar(filename):
+    """Load a columnar export.
+
+    Parquet and Arrow files come back as a pyarrow.Table (call to_pandas() for a
+    DataFrame); fcol files as a dict of column name to list of values.
+    """
+    if not filename.endswith('.fcol'):
+        if pyarrow is None:
+            raise ValueError(f"Reading {filename} requires pyarrow")
+        if filename.endswith('.parquet'):
+            return pyarrow.parquet.read_table(filename)
+        with pyarrow.memory_map(filename) as source:
+            return pyarrow.ipc.open_file(source).read_all()
+
+    with open(filename, 'rb') as source:
+        if source.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{filename} is not a columnar export")
+        schema = _read_block(source)
+        swap = schema['byteorder'] != sys.byteorder
+        kinds = [column['kind'] for column in schema['columns']]
+        data = {column['name']: [] for column in schema['columns']}
+        while True:
+            batch = _read_block(source)
+            if batch is None:
+                break
+            sizes = iter(batch['buffers'])
+            for column, kind in zip(schema['columns'], kinds):
+                count = 3 if kind == 'string' else 2
+                buffers = [source.read(next(sizes)) for _ in range(count)]
+                data[column['name']].extend(_decode_column(kind, buffers, batch['rows'], swap))
+    return data
+
+# Streaming writers by format name
+STREAM_EXPORTERS = {
+    'csv': stream_to_csv,
+    'csv_copy': copy_to_csv,
+    'json': stream_to_json,
+    'columnar': export_columnar,
+}
+
+def export_table(session, model, filename, format='csv', **options):
+    """Stream a table to a file in the given format; options go to the writer"""
+    try:
+        exporter = STREAM_EXPORTERS[format]
+    except KeyError:
+        raise ValueError(f"Unknown export format: {format}")
+    return exporter(session, model, filename, **options)
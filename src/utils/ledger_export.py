@@ -0,0 +1,279 @@
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import queue
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from ..database.db_manager import DatabaseManager, get_pool_settings
+from ..models.expense import Expense
+from ..models.income import Income
+from ..models.subscription import Subscription
+from ..models.client import Client
+from ..models.receipt import Receipt
+from .blob_store import get_blob_store, detect_mime_type
+from .export import export_table, default_columnar_format, COLUMNAR_EXTENSIONS, STREAM_EXPORTERS, EXPORT_BATCH
+
+# Tables in a full ledger export
+LEDGER_MODELS = [Expense, Income, Subscription, Client, Receipt]
+
+ARCHIVE_TYPES = ('zip', 'tar')
+
+# A table export hands its output to the archive writer in chunks of this size,
+# and buffers at most STREAM_QUEUE_CHUNKS of them while another table is written
+STREAM_CHUNK = 256 * 1024
+STREAM_QUEUE_CHUNKS = 16
+
+# Tar headers carry the entry size, so a table is spooled before it is added
+# to a tar archive; it stays in memory up to this size
+TAR_SPOOL_SIZE = 64 * 1024 * 1024
+
+class _ExportCancelled(Exception):
+    pass
+
+class _ChunkStream(io.RawIOBase):
+    """Write-only binary file that passes its data to the archive writer through a queue"""
+
+    def __init__(self, name, ready, cancelled):
+        super().__init__()
+        self.name = name
+        self.chunks = queue.Queue(STREAM_QUEUE_CHUNKS)
+        self._ready = ready
+        self._cancelled = cancelled
+        self._buffer = bytearray()
+        self._position = 0
+        self._announced = False
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= STREAM_CHUNK:
+            self._put(bytes(self._buffer[:STREAM_CHUNK]))
+            del self._buffer[:STREAM_CHUNK]
+        self._position += len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed and self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        super().close()
+
+    def finish(self):
+        """Mark the end of the data, even when the export failed"""
+        self._buffer.clear()
+        try:
+            self._put(None)
+        except _ExportCancelled:
+            pass
+        super().close()
+
+    def _put(self, chunk):
+        if not self._announced:
+            # The writer takes tables in the order they start producing data
+            self._announced = True
+            self._ready.put(self)
+        while True:
+            try:
+                self.chunks.put(chunk, timeout=0.5)
+                return
+            except queue.Full:
+                if self._cancelled.is_set():
+                    raise _ExportCancelled()
+
+def _entry_name(model, format):
+    if format == 'columnar':
+        return model.__tablename__ + COLUMNAR_EXTENSIONS[default_columnar_format()]
+    return model.__tablename__ + ('.json' if format == 'json' else '.csv')
+
+def _export_model(session_factory, model, format, stream):
+    """Export one table into stream using its own session; returns the row count"""
+    session = session_factory()
+    try:
+        result = export_table(session, model, stream, format)
+        stream.close()
+        return result.rows
+    finally:
+        session.close()
+        stream.finish()
+
+def _receipt_filename(receipt_id, name, mime):
+    safe_name = re.sub(r'[^A-Za-z0-9._-]+', '_', name or '').strip('_') or 'receipt'
+    extension = mimetypes.guess_extension(mime or '') or '.bin'
+    return f"receipts/{receipt_id}-{safe_name}{extension}"
+
+def _export_receipt_images(session_factory, output):
+    """Copy every receipt image into its own archive entry; returns manifest entries"""
+    store = get_blob_store()
+    session = session_factory()
+    entries = []
+    try:
+        # Store-backed images: copy the blob, its digest is already the checksum
+        rows = session.query(Receipt.id, Receipt.name, Receipt.image_sha256, Receipt.image_mime)\
+            .filter(Receipt.image_sha256.isnot(None))\
+            .order_by(Receipt.id)\
+            .yield_per(EXPORT_BATCH)
+        for receipt_id, name, digest, mime in rows:
+            if not store.exists(digest):
+                print(f"Receipt {receipt_id} image {digest} is missing from the blob store")
+                continue
+            filename = _receipt_filename(receipt_id, name, mime)
+            blob = store.open(digest)
+            try:
+                size = len(blob)
+                output.add_file(filename, blob if hasattr(blob, 'read') else io.BytesIO(blob), size,
+                                compress=False)
+            finally:
+                if hasattr(blob, 'close'):
+                    blob.close()
+            entries.append({'receipt_id': receipt_id, 'file': filename, 'size': size, 'sha256': digest})
+
+        # Legacy images still stored inline, a few at a time since each can be large
+        rows = session.query(Receipt.id, Receipt.name, Receipt.image)\
+            .filter(Receipt.image_sha256.is_(None), Receipt.image.isnot(None))\
+            .order_by(Receipt.id)\
+            .yield_per(16)
+        for receipt_id, name, image in rows:
+            filename = _receipt_filename(receipt_id, name, detect_mime_type(image))
+            output.add_file(filename, io.BytesIO(image), len(image), compress=False)
+            entries.append({'receipt_id': receipt_id, 'file': filename, 'size': len(image),
+                            'sha256': hashlib.sha256(image).hexdigest()})
+    finally:
+        session.close()
+    return entries
+
+class _Archive:
+    """Writes entries to a zip or tar archive one at a time, from one thread"""
+
+    def __init__(self, filename, archive):
+        if archive == 'zip':
+            self.handle = zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+        else:
+            self.handle = tarfile.open(filename, 'w:gz')
+        self.archive = archive
+
+    def add_stream(self, name, chunks):
+        """Write an entry from an iterable of bytes; returns its (size, sha256)"""
+        digest = hashlib.sha256()
+        size = 0
+        if self.archive == 'zip':
+            with self.handle.open(self._zip_info(name, True), 'w', force_zip64=True) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        else:
+            with tempfile.SpooledTemporaryFile(TAR_SPOOL_SIZE) as spool:
+                for chunk in chunks:
+                    spool.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                spool.seek(0)
+                self.handle.addfile(self._tar_info(name, size), spool)
+        return size, digest.hexdigest()
+
+    def add_file(self, name, source, size, compress=True):
+        """Copy size bytes from a readable file object into an entry"""
+        if self.archive == 'zip':
+            # Images are already compressed
+            with self.handle.open(self._zip_info(name, compress), 'w',
+                                  force_zip64=size > zipfile.ZIP64_LIMIT) as entry:
+                shutil.copyfileobj(source, entry, STREAM_CHUNK)
+        else:
+            self.handle.addfile(self._tar_info(name, size), source)
+
+    def _zip_info(self, name, compress):
+        info = zipfile.ZipInfo(name, datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        return info
+
+    def _tar_info(self, name, size):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(datetime.now().timestamp())
+        return info
+
+    def close(self):
+        self.handle.close()
+
+def export_ledger(filename, format='csv', archive='zip', db_manager=None, max_workers=None, progress=None):
+    """Export every ledger table and the receipt images into one archive.
+
+    Tables are exported concurrently, each on a pool thread with its own session,
+    and streamed straight into their archive entries, one entry at a time in the
+    order they start producing rows; the others wait with a small buffer. Receipt
+    images are copied from the blob store into entries under receipts/. Zip
+    entries never touch a temporary file; tar entries need their size up front,
+    so each table is spooled (in memory up to TAR_SPOOL_SIZE) before it is added.
+    A manifest.json records each entry's row count or size and SHA-256.
+    progress(name, rows) is called on the calling thread as each part lands.
+    Returns the archive filename.
+    """
+    if archive not in ARCHIVE_TYPES:
+        raise ValueError(f"Unknown archive type: {archive}")
+    if format not in STREAM_EXPORTERS:
+        raise ValueError(f"Unknown export format: {format}")
+    extension = '.zip' if archive == 'zip' else '.tar.gz'
+    if not filename.endswith(extension):
+        filename += extension
+
+    session_factory = (db_manager or DatabaseManager()).session_factory
+    # Never run more exports at once than the connection pool can serve
+    max_workers = max_workers or max(1, min(len(LEDGER_MODELS), get_pool_settings()['pool_size']))
+
+    manifest = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'format': format,
+        'tables': {},
+        'receipt_images': [],
+    }
+    ready = queue.Queue()
+    cancelled = threading.Event()
+    output = _Archive(filename, archive)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            try:
+                futures = {}
+                for model in LEDGER_MODELS:
+                    stream = _ChunkStream(_entry_name(model, format), ready, cancelled)
+                    futures[stream] = model, pool.submit(_export_model, session_factory, model, format, stream)
+
+                for _ in LEDGER_MODELS:
+                    stream = ready.get()
+                    size, sha256 = output.add_stream(stream.name, iter(stream.chunks.get, None))
+                    model, future = futures[stream]
+                    rows = future.result()
+                    table = model.__tablename__
+                    manifest['tables'][table] = {'file': stream.name, 'rows': rows, 'size': size, 'sha256': sha256}
+                    if progress is not None:
+                        progress(table, rows)
+            except BaseException:
+                # Unblock exports still waiting for the writer and drop those not started
+                cancelled.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        manifest['receipt_images'] = _export_receipt_images(session_factory, output)
+        if progress is not None:
+            progress('receipt_images', len(manifest['receipt_images']))
+
+        data = json.dumps(manifest, indent=4).encode('utf-8')
+        output.add_file('manifest.json', io.BytesIO(data), len(data))
+    except Exception:
+        output.close()
+        os.remove(filename)
+        raise
+    output.close()
+    return filename
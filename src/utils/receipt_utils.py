@@ -0,0 +1,72 @@
+import hashlib
+from sqlalchemy import text
+from ..models.receipt import Receipt
+from .blob_store import get_blob_store, detect_mime_type
+
+# Advisory lock class for blob digests (the second key is a hash of the digest)
+BLOB_LOCK_CLASS = 51_733
+
+def lock_blob(conn, digest):
+    """Lock a blob digest until the current transaction ends.
+
+    Uploads and deletes of the same content take this lock, so a delete that
+    finds no receipt using a blob cannot race an upload that just reused it.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:lock_class, hashtext(:digest))"),
+                 {'lock_class': BLOB_LOCK_CLASS, 'digest': digest})
+
+def store_receipt_image(session, data):
+    """Write image bytes to the blob store and return the column values for a Receipt.
+
+    The digest stays locked until session commits, so add the receipt in the
+    same transaction.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    lock_blob(session, digest)
+    get_blob_store().put(data)
+    return {
+        'image_sha256': digest,
+        'image_size': len(data),
+        'image_mime': detect_mime_type(data)
+    }
+
+def receipt_reference_query(session):
+    """Receipt reference IDs and names for the expense form dropdown, newest first (no image blobs)"""
+    return session.query(Receipt.reference_id, Receipt.name)\
+        .order_by(Receipt.date.desc())
+
+def fetch_receipt_image(session, receipt_id):
+    """Load a receipt's name and image data.
+
+    Store-backed images are returned as a read-only mmap (call close() when done);
+    receipts not yet moved out of the table return their inline bytes.
+    Returns (name, image) or None if the receipt does not exist; image is None
+    when its blob is missing from the store.
+    """
+    row = session.query(Receipt.name, Receipt.image_sha256, Receipt.image)\
+        .filter(Receipt.id == receipt_id)\
+        .first()
+    if row is None:
+        return None
+    if row.image_sha256:
+        try:
+            return row.name, get_blob_store().open(row.image_sha256)
+        except FileNotFoundError:
+            print(f"Receipt {receipt_id} image {row.image_sha256} is missing from the blob store")
+            return row.name, None
+    return row.name, row.image
+
+def release_receipt_image(session, digest):
+    """Delete a stored blob once no receipt references it any more.
+
+    Commits session to release the digest lock.
+    """
+    if not digest:
+        return
+    lock_blob(session, digest)
+    still_used = session.query(Receipt.id)\
+        .filter(Receipt.image_sha256 == digest)\
+        .first()
+    if still_used is None:
+        get_blob_store().delete(digest)
+    session.commit()
@@ -0,0 +1,99 @@
+from sqlalchemy import text
+
+# Kinds in monthly_totals and where their rows come from: (table, category expression)
+ROLLUP_SOURCES = {
+    'expense': ('expenses', 'category'),
+    'income': ('income', "''"),
+}
+
+# Allowed difference between a rollup total and a fresh SUM (float accumulation)
+TOLERANCE = 0.005
+
+def _delta_sql(kind, rows, sign):
+    """Fold the rows of a transition table into monthly_totals"""
+    table, category = ROLLUP_SOURCES[kind]
+    return f"""
+        INSERT INTO monthly_totals (month, kind, category, total, row_count)
+        SELECT date_trunc('month', date)::date, '{kind}', {category}, {sign} sum(amount), {sign} count(*)
+        FROM {rows} WHERE date IS NOT NULL
+        GROUP BY 1, 3
+        ON CONFLICT (month, kind, category) DO UPDATE
+        SET total = monthly_totals.total + EXCLUDED.total,
+            row_count = monthly_totals.row_count + EXCLUDED.row_count;"""
+
+def trigger_sql(kind):
+    """Statement-level triggers that keep monthly_totals current for one source table.
+
+    Transition tables make a bulk insert, update or delete cost one grouped
+    upsert per statement instead of one per row.
+    """
+    table, _ = ROLLUP_SOURCES[kind]
+    function = f"monthly_totals_{table}"
+    return f"""
+    CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            {_delta_sql(kind, 'old_rows', '-')}
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            {_delta_sql(kind, 'new_rows', '')}
+        END IF;
+        DELETE FROM monthly_totals WHERE kind = '{kind}' AND row_count = 0;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS {function}_insert ON {table};
+    CREATE TRIGGER {function}_insert AFTER INSERT ON {table}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+
+    DROP TRIGGER IF EXISTS {function}_update ON {table};
+    CREATE TRIGGER {function}_update AFTER UPDATE ON {table}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+
+    DROP TRIGGER IF EXISTS {function}_delete ON {table};
+    CREATE TRIGGER {function}_delete AFTER DELETE ON {table}
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+    """
+
+def _grouped_sql(kind):
+    table, category = ROLLUP_SOURCES[kind]
+    return f"""
+        SELECT date_trunc('month', date)::date AS month, '{kind}' AS kind, {category} AS category,
+               sum(amount) AS total, count(*) AS row_count
+        FROM {table} WHERE date IS NOT NULL
+        GROUP BY 1, 3"""
+
+def rebuild_monthly_totals(conn):
+    """Recompute monthly_totals from the base tables; conn may be a connection or session.
+
+    Source tables are locked against writes meanwhile so no trigger delta is lost.
+    """
+    tables = ", ".join(table for table, _ in ROLLUP_SOURCES.values())
+    conn.execute(text(f"LOCK TABLE {tables} IN SHARE MODE"))
+    conn.execute(text("DELETE FROM monthly_totals"))
+    for kind in ROLLUP_SOURCES:
+        conn.execute(text(
+            f"INSERT INTO monthly_totals (month, kind, category, total, row_count) {_grouped_sql(kind)}"
+        ))
+
+def check_monthly_totals(conn):
+    """Compare monthly_totals with the base tables and return the rows that disagree.
+
+    Each mismatch is (month, kind, category, rollup total, actual total).
+    """
+    actual = " UNION ALL ".join(_grouped_sql(kind) for kind in ROLLUP_SOURCES)
+    rows = conn.execute(text(f"""
+        SELECT coalesce(r.month, a.month), coalesce(r.kind, a.kind), coalesce(r.category, a.category),
+               r.total, a.total
+        FROM monthly_totals r
+        FULL OUTER JOIN ({actual}) a
+            ON a.month = r.month AND a.kind = r.kind AND a.category = r.category
+        WHERE r.month IS NULL OR a.month IS NULL
+           OR r.row_count <> a.row_count OR abs(r.total - a.total) > :tolerance
+        ORDER BY 1, 2, 3
+    """), {'tolerance': TOLERANCE}).fetchall()
+    return [tuple(row) for row in rows]
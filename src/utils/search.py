@@ -0,0 +1,85 @@
+from collections import namedtuple
+from sqlalchemy import text
+from ..models.base import SEARCH_CONFIG
+from ..models.expense import Expense
+from ..models.income import Income
+from ..models.subscription import Subscription
+from ..models.receipt import Receipt
+from ..models.client import Client
+
+# Searchable models by result type
+SEARCH_SOURCES = {
+    'expense': Expense,
+    'income': Income,
+    'subscription': Subscription,
+    'receipt': Receipt,
+    'client': Client,
+}
+
+# Best-ranked matches kept per table before the tables are merged; bounds the
+# rows sorted and returned for very common prefixes
+SEARCH_CANDIDATES = 200
+
+# Milliseconds a search may run before the server cancels it
+SEARCH_TIMEOUT = 3000
+
+SearchHit = namedtuple('SearchHit', 'source_type id rank')
+
+# Every word of the input as a prefix ('acme:* & soft:*'), tokenized exactly like the
+# indexed text; NULL when the input has no words
+PREFIX_QUERY_SQL = f"""
+    SELECT to_tsquery('{SEARCH_CONFIG}', string_agg(quote_literal(lexeme) || ':*', ' & '))
+    FROM unnest(to_tsvector('{SEARCH_CONFIG}', :query))
+"""
+
+def search_terms(query):
+    """Lowercase words of a search input, for deciding which field matched"""
+    return [term for term in query.lower().split() if term]
+
+def search_records(session, query, limit=20, sources=None, timeout=SEARCH_TIMEOUT):
+    """Records whose search_vector matches every word of query as a prefix.
+
+    Uses the GIN index on each table; every match is ranked with ts_rank, each
+    table keeps its best SEARCH_CANDIDATES and the best limit hits across all
+    tables are returned as SearchHits, best first.
+    The query is cancelled by the server after timeout milliseconds.
+    """
+    sources = sources or list(SEARCH_SOURCES)
+    if timeout:
+        # Transaction-local, so the pooled connection keeps its own setting
+        session.execute(text("SELECT set_config('statement_timeout', :timeout, true)"),
+                        {'timeout': str(int(timeout))})
+    # As an uncorrelated subquery the tsquery is computed once per branch, before
+    # the GIN index scan that uses it
+    prefix_query = f"({PREFIX_QUERY_SQL.strip()})"
+    branches = [
+        f"""(SELECT '{source_type}' AS source_type, id, ts_rank(search_vector, {prefix_query}) AS rank
+             FROM {SEARCH_SOURCES[source_type].__tablename__}
+             WHERE search_vector @@ {prefix_query}
+             ORDER BY rank DESC, id
+             LIMIT :candidates)"""
+        for source_type in sources
+    ]
+    rows = session.execute(text(f"""
+        SELECT source_type, id, rank FROM (
+            {" UNION ALL ".join(branches)}
+        ) hits
+        ORDER BY rank DESC, source_type, id
+        LIMIT :limit
+    """), {'query': query, 'candidates': SEARCH_CANDIDATES, 'limit': limit}).fetchall()
+    return [SearchHit(*row) for row in rows]
+
+def load_hits(session, hits):
+    """ORM records for search hits, in hit order (records deleted meanwhile are skipped)"""
+    ids = {}
+    for hit in hits:
+        ids.setdefault(hit.source_type, []).append(hit.id)
+
+    records = {}
+    for source_type, source_ids in ids.items():
+        model = SEARCH_SOURCES[source_type]
+        for record in session.query(model).filter(model.id.in_(source_ids)):
+            records[(source_type, record.id)] = record
+
+    return [(hit, records[(hit.source_type, hit.id)])
+            for hit in hits if (hit.source_type, hit.id) in records]
@@ -0,0 +1,277 @@
+import heapq
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..database.db_manager import load_config
+from .search import SEARCH_SOURCES, search_terms
+
+# Extra fields kept per record for result breadcrumbs, besides id and the search fields
+DISPLAY_FIELDS = {
+    'expense': ('amount',),
+    'income': ('amount',),
+    'subscription': ('amount',),
+    'receipt': ('date',),
+    'client': (),
+}
+
+WORD = re.compile(r'\w+')
+
+def _record_fields(source_type):
+    model = SEARCH_SOURCES[source_type]
+    return ('id',) + tuple(name for name, _ in model.__search_fields__) + DISPLAY_FIELDS[source_type]
+
+# Lightweight read-only copies of indexed records, one type per source
+RECORD_TYPES = {source_type: namedtuple(f"{source_type.title()}Record", _record_fields(source_type))
+                for source_type in SEARCH_SOURCES}
+
+def search_index_enabled():
+    """Whether [Search] in_memory_index is switched on in config.ini"""
+    return load_config().getboolean('Search', 'in_memory_index', fallback=False)
+
+class SearchIndex:
+    """In-memory inverted index over the searchable fields of every ledger record.
+
+    Each record is a document number. Postings are sorted array('I') lists of
+    document numbers, keyed by trigram (for terms of three or more characters,
+    matched anywhere) and by the first two characters of each word (for shorter
+    terms, matched at word starts). Updates add a new document and tombstone the
+    old one; postings are compacted once tombstones pile up. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+        self.ready = False
+        self._building = False
+        self._queued = []  # Changes committed while the initial build runs
+
+    def _clear(self):
+        self._records = []  # doc -> record namedtuple, None once removed
+        self._sources = []  # doc -> source type
+        self._texts = []  # doc -> lowercase search text, fields separated by newlines
+        self._docs = {}  # (source type, id) -> doc
+        self._trigrams = {}
+        self._prefixes = {}
+        self._removed = 0
+
+    # Building and maintenance
+
+    def build(self, session_factory):
+        """Load every searchable record; changes committed meanwhile are applied afterwards"""
+        started = time.perf_counter()
+        with self._lock:
+            self._building = True
+        session = session_factory()
+        try:
+            for source_type, model in SEARCH_SOURCES.items():
+                columns = [getattr(model, name) for name in RECORD_TYPES[source_type]._fields]
+                for row in session.query(*columns).order_by(model.id).yield_per(10000):
+                    with self._lock:
+                        self._add(source_type, RECORD_TYPES[source_type](*row))
+        finally:
+            session.close()
+
+        with self._lock:
+            self._building = False
+            for change in self._queued:
+                self._apply(change)
+            self._queued = []
+            self.ready = True
+            stats = self.stats()
+        print(f"Search index: {stats['records']} records, {stats['bytes'] / 1048576:.1f} MB, "
+              f"built in {time.perf_counter() - started:.1f}s")
+
+    def apply_changes(self, changes):
+        """Apply committed changes: ('upsert', source type, record) or ('delete', source type, id)"""
+        with self._lock:
+            if self._building:
+                self._queued.extend(changes)
+                return
+            for change in changes:
+                self._apply(change)
+
+    def _apply(self, change):
+        action, source_type, value = change
+        if action == 'delete':
+            self._remove(source_type, value)
+        else:
+            self._remove(source_type, value.id)
+            self._add(source_type, value)
+        if self._removed > 1000 and self._removed * 4 > len(self._records):
+            self._compact()
+
+    def _add(self, source_type, record):
+        doc = len(self._records)
+        values = [str(getattr(record, name) or '').lower()
+                  for name, _ in SEARCH_SOURCES[source_type].__search_fields__]
+        self._records.append(record)
+        self._sources.append(source_type)
+        self._texts.append('\n'.join(values))
+        self._docs[(source_type, record.id)] = doc
+
+        trigrams = {value[i:i + 3] for value in values for i in range(len(value) - 2)}
+        prefixes = {word[:2] for value in values for word in WORD.findall(value)}
+        for key in trigrams:
+            self._posting(self._trigrams, key).append(doc)
+        for key in prefixes:
+            self._posting(self._prefixes, key).append(doc)
+
+    @staticmethod
+    def _posting(postings, key):
+        posting = postings.get(key)
+        if posting is None:
+            posting = postings[key] = array('I')
+        return posting
+
+    def _remove(self, source_type, record_id):
+        doc = self._docs.pop((source_type, record_id), None)
+        if doc is not None:
+            self._records[doc] = None
+            self._texts[doc] = ''
+            self._removed += 1
+
+    def _compact(self):
+        """Renumber the live documents and rebuild the postings without tombstones"""
+        live = [(source_type, record) for source_type, record in zip(self._sources, self._records)
+                if record is not None]
+        self._clear()
+        for source_type, record in live:
+            self._add(source_type, record)
+
+    # Queries
+
+    def search(self, query, limit=20):
+        """(source type, record) pairs matching every word of query, best first.
+
+        Words of three or more characters match anywhere in a field, shorter ones
+        at the start of a word. Records where the words start a word rank first,
+        then newer records. Every document in the most selective posting list is
+        checked, so the best matches are found however common the words are.
+        """
+        terms = [term for term in search_terms(query) if len(term) >= 2]
+        if not terms:
+            return []
+        patterns = [re.compile(r'\b' + re.escape(term)) for term in terms]
+
+        with self._lock:
+            # Scan the most selective posting list
+            postings = []
+            for term in terms:
+                if len(term) >= 3:
+                    keys = [term[i:i + 3] for i in range(len(term) - 2)]
+                    postings.extend(self._trigrams.get(key, array('I')) for key in keys)
+                else:
+                    postings.append(self._prefixes.get(term, array('I')))
+            candidates = min(postings, key=len)
+
+            matches = []
+            for doc in candidates:
+                text = self._texts[doc]
+                if not text:
+                    continue  # Removed
+                # Plain substring tests first, word-start tests only for short terms
+                if not all(term in text for term in terms):
+                    continue
+                starts = [bool(pattern.search(text)) for pattern in patterns]
+                if all(started for term, started in zip(terms, starts) if len(term) < 3):
+                    matches.append((sum(starts), doc))
+
+            # Later documents are newer, so ties on the score go to the newest
+            best = heapq.nlargest(limit, matches)
+            return [(self._sources[doc], self._records[doc]) for _, doc in best]
+
+    def stats(self):
+        """Record count and approximate memory use in bytes"""
+        with self._lock:
+            size = sys.getsizeof(self._records) + sys.getsizeof(self._sources) + sys.getsizeof(self._texts)
+            size += sys.getsizeof(self._docs) + sys.getsizeof(self._trigrams) + sys.getsizeof(self._prefixes)
+            for postings in (self._trigrams, self._prefixes):
+                size += sum(sys.getsizeof(key) + sys.getsizeof(posting) for key, posting in postings.items())
+            for record, text in zip(self._records, self._texts):
+                if record is not None:
+                    size += sys.getsizeof(record) + sys.getsizeof(text)
+                    size += sum(sys.getsizeof(value) for value in record)
+            return {
+                'records': len(self._docs),
+                'trigrams': len(self._trigrams),
+                'prefixes': len(self._prefixes),
+                'bytes': size,
+            }
+
+_index = None
+_index_enabled = None  # Read from config.ini once, on first use
+_index_lock = threading.Lock()
+
+def get_search_index():
+    """The application-wide in-memory index, or None when it is switched off.
+
+    The setting is read the first time this is called; changing it takes a restart.
+    """
+    global _index, _index_enabled
+    if _index_enabled is None:
+        with _index_lock:
+            if _index_enabled is None:
+                if search_index_enabled():
+                    _index = SearchIndex()
+                    _install_session_events()
+                _index_enabled = _index is not None
+    return _index
+
+def start_search_index(session_factory):
+    """Build the in-memory index on a background thread, if it is switched on"""
+    index = get_search_index()
+    if index is None:
+        return None
+    thread = threading.Thread(target=index.build, args=(session_factory,),
+                              name='search-index', daemon=True)
+    thread.start()
+    return index
+
+# Keeping the index current: changes are captured at flush time, while the
+# objects' attributes are still loaded, and applied once the transaction commits
+
+SOURCE_TYPES = {model: source_type for source_type, model in SEARCH_SOURCES.items()}
+
+def _snapshot(source_type, instance):
+    return RECORD_TYPES[source_type](*(getattr(instance, name) for name in RECORD_TYPES[source_type]._fields))
+
+def _after_flush(session, flush_context):
+    changes = session.info.setdefault('search_index_changes', [])
+    for instance in list(session.new) + list(session.dirty):
+        source_type = SOURCE_TYPES.get(type(instance))
+        if source_type is not None and instance not in session.deleted:
+            changes.append(('upsert', source_type, _snapshot(source_type, instance)))
+    for instance in session.deleted:
+        source_type = SOURCE_TYPES.get(type(instance))
+        if source_type is not None:
+            changes.append(('delete', source_type, instance.id))
+
+def _after_commit(session):
+    changes = session.info.pop('search_index_changes', None)
+    if changes and _index is not None:
+        _index.apply_changes(changes)
+
+def _after_rollback(session):
+    session.info.pop('search_index_changes', None)
+
+def _install_session_events():
+    event.listen(Session, 'after_flush', _after_flush)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_soft_rollback', lambda session, previous_transaction: _after_rollback(session))
+
+def index_inserted(session, source_type, ids):
+    """Add rows inserted with plain SQL (e.g. a statement import) to the index"""
+    if _index is None or not ids:
+        return
+    model = SEARCH_SOURCES[source_type]
+    columns = [getattr(model, name) for name in RECORD_TYPES[source_type]._fields]
+    changes = []
+    for start in range(0, len(ids), 10000):
+        rows = session.query(*columns).filter(model.id.in_(ids[start:start + 10000])).all()
+        changes.extend(('upsert', source_type, RECORD_TYPES[source_type](*row)) for row in rows)
+    _index.apply_changes(changes)
@@ -0,0 +1,213 @@
+import csv
+import io
+import time
+from sqlalchemy import text
+from .search_index import get_search_index, index_inserted
+
+# Rows parsed and sent to the staging table per COPY
+IMPORT_CHUNK = 50000
+
+# Header names banks commonly use for each field, matched case-insensitively
+HEADER_CANDIDATES = {
+    'date': ['date', 'transaction date', 'posting date', 'posted date', 'trans. date', 'value date'],
+    'description': ['description', 'memo', 'payee', 'details', 'name', 'narrative', 'transaction'],
+    'amount': ['amount', 'transaction amount', 'amount (usd)', 'value'],
+    'debit': ['debit', 'withdrawal', 'withdrawals', 'money out', 'paid out'],
+    'credit': ['credit', 'deposit', 'deposits', 'money in', 'paid in'],
+}
+
+STAGING_COLUMNS = ['line', 'date_text', 'amount_text', 'debit_text', 'credit_text', 'description']
+
+class StatementImportResult:
+    """Counts from one statement import"""
+    def __init__(self, rows, parsed, expenses, income, seconds):
+        self.rows = rows  # Transactions read from the file
+        self.parsed = parsed  # Rows with a date and a non-zero amount
+        self.expenses = expenses  # New expense records
+        self.income = income  # New income records
+        self.seconds = seconds
+
+    @property
+    def duplicates(self):
+        """Parsed rows already in the ledger"""
+        return self.parsed - self.expenses - self.income
+
+    @property
+    def dropped(self):
+        """Rows ignored for a blank date or a missing or zero amount"""
+        return self.rows - self.parsed
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __repr__(self):
+        return (f"<StatementImportResult(rows={self.rows}, expenses={self.expenses}, "
+                f"income={self.income}, duplicates={self.duplicates}, dropped={self.dropped})>")
+
+def detect_mapping(header):
+    """Map each field to its column index in a CSV header, guessing from common names.
+
+    Raises ValueError when there is no date column or no way to get the amount.
+    """
+    lowered = [name.strip().lower() for name in header]
+    mapping = {}
+    for field, candidates in HEADER_CANDIDATES.items():
+        for candidate in candidates:
+            if candidate in lowered:
+                mapping[field] = lowered.index(candidate)
+                break
+    if 'date' not in mapping:
+        raise ValueError("No date column found in the statement")
+    if 'amount' not in mapping and 'debit' not in mapping and 'credit' not in mapping:
+        raise ValueError("No amount, debit or credit column found in the statement")
+    return mapping
+
+def _resolve_mapping(header, mapping):
+    """Column indexes for a mapping of field to header name (or index), else detected"""
+    if mapping is None:
+        return detect_mapping(header)
+    lowered = [name.strip().lower() for name in header]
+    resolved = {}
+    for field, column in mapping.items():
+        if isinstance(column, int):
+            resolved[field] = column
+        elif column.strip().lower() in lowered:
+            resolved[field] = lowered.index(column.strip().lower())
+        else:
+            raise ValueError(f"Column '{column}' for {field} is not in the statement")
+    return resolved
+
+def _staged_chunks(reader, columns, chunk_size):
+    """CSV for the staging table, chunk_size statement rows at a time.
+
+    Only the mapped columns are picked out; all parsing happens in SQL.
+    Yields (text, row_count).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for line, row in enumerate(reader, start=2):  # Line 1 is the header
+        if not any(row):
+            continue
+        writer.writerow([line] + [row[index] if index is not None and index < len(row) else ''
+                                  for index in columns])
+        count += 1
+        if count == chunk_size:
+            yield buffer.getvalue(), count
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    if count:
+        yield buffer.getvalue(), count
+
+def _amount_sql(column):
+    """Parse a bank amount such as '$1,234.50' or '(12.00)' into a float"""
+    return (f"(CASE WHEN {column} ~ '^\\s*\\(.*\\)\\s*$' THEN -1 ELSE 1 END"
+            f" * nullif(regexp_replace({column}, '[^0-9.-]', '', 'g'), '')::float8)")
+
+def import_statement(session, filename, mapping=None, category='Other', income_status='Received',
+                     negative_is_expense=True, day_first=False, encoding='utf-8-sig',
+                     chunk_size=IMPORT_CHUNK, progress=None):
+    """Import a CSV bank statement as expenses and income in one transaction.
+
+    Rows are streamed into a temporary staging table with COPY, parsed and
+    split by sign in SQL (money out becomes an expense in category, money in
+    income with income_status), and merged after a hash anti-join drops
+    transactions already in the ledger. A statement row is only treated as a
+    duplicate as many times as it already exists, so repeated same-day
+    purchases survive. mapping maps 'date', 'description' and 'amount' (or
+    'debit'/'credit') to header names and is detected when omitted.
+    progress(rows_read) is called after each chunk. Returns a
+    StatementImportResult.
+    """
+    started = time.perf_counter()
+    with open(filename, newline='', encoding=encoding) as source:
+        reader = csv.reader(source)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("The statement is empty")
+        fields = _resolve_mapping(header, mapping)
+        columns = [fields.get(field) for field in ('date', 'amount', 'debit', 'credit', 'description')]
+
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.execute(
+                "SET LOCAL datestyle = %s;"
+                "CREATE TEMP TABLE statement_staging ("
+                "line bigint, date_text text, amount_text text, debit_text text,"
+                " credit_text text, description text) ON COMMIT DROP",
+                ['ISO, DMY' if day_first else 'ISO, MDY'])
+            rows = 0
+            for chunk, count in _staged_chunks(reader, columns, chunk_size):
+                cursor.copy_expert(
+                    f"COPY statement_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH CSV",
+                    io.StringIO(chunk))
+                rows += count
+                if progress is not None:
+                    progress(rows)
+        finally:
+            cursor.close()
+
+    if fields.get('amount') is not None:
+        sign = '-1' if negative_is_expense else '1'
+        amount = f"{sign} * {_amount_sql('amount_text')}"
+    else:
+        # Money out is positive in the debit column
+        amount = f"coalesce({_amount_sql('debit_text')}, 0) - coalesce({_amount_sql('credit_text')}, 0)"
+
+    session.execute(text(f"""
+        CREATE TEMP TABLE statement_rows ON COMMIT DROP AS
+        SELECT line, date_text::timestamp AS date,
+               CASE WHEN amount > 0 THEN 'expense' ELSE 'income' END AS kind,
+               abs(amount) AS amount, coalesce(description, '') AS description
+        FROM (SELECT line, date_text, description, {amount} AS amount FROM statement_staging) parsed
+        WHERE amount IS NOT NULL AND amount <> 0 AND nullif(trim(date_text), '') IS NOT NULL
+    """))
+
+    # The in-memory search index needs the new ids, otherwise counts will do
+    index = get_search_index()
+    collect = "coalesce(array_agg(id), '{}')" if index is not None else "count(*)"
+    inserted = session.execute(text(f"""
+        WITH bounds AS (
+            SELECT min(date) AS low, max(date) AS high FROM statement_rows
+        ), incoming AS (
+            SELECT r.*, row_number() OVER (PARTITION BY kind, date, amount, description ORDER BY line) AS n
+            FROM statement_rows r
+        ), existing AS (
+            SELECT 'expense' AS kind, e.date, e.amount, e.description,
+                   row_number() OVER (PARTITION BY e.date, e.amount, e.description) AS n
+            FROM expenses e, bounds WHERE e.date BETWEEN bounds.low AND bounds.high
+            UNION ALL
+            SELECT 'income', i.date, i.amount, i.source,
+                   row_number() OVER (PARTITION BY i.date, i.amount, i.source)
+            FROM income i, bounds WHERE i.date BETWEEN bounds.low AND bounds.high
+        ), fresh AS (
+            SELECT incoming.* FROM incoming
+            LEFT JOIN existing USING (kind, date, amount, description, n)
+            WHERE existing.kind IS NULL
+        ), new_expenses AS (
+            INSERT INTO expenses (amount, description, category, date)
+            SELECT amount, description, :category, date FROM fresh WHERE kind = 'expense' ORDER BY line
+            RETURNING id
+        ), new_income AS (
+            INSERT INTO income (amount, source, status, date)
+            SELECT amount, description, :status, date FROM fresh WHERE kind = 'income' ORDER BY line
+            RETURNING id
+        )
+        SELECT (SELECT {collect} FROM new_expenses), (SELECT {collect} FROM new_income),
+               (SELECT count(*) FROM statement_rows)
+    """), {'category': category, 'status': income_status}).fetchone()
+    session.commit()
+
+    expenses, income, parsed = inserted
+    if index is not None:
+        expense_ids, income_ids = expenses, income
+        index_inserted(session, 'expense', expense_ids)
+        index_inserted(session, 'income', income_ids)
+        expenses, income = len(expense_ids), len(income_ids)
+    if expenses or income:
+        # Refresh planner statistics after a large load
+        session.execute(text("ANALYZE expenses, income"))
+        session.commit()
+    return StatementImportResult(rows, parsed, expenses, income, time.perf_counter() - started)
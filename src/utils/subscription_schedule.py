@@ -0,0 +1,239 @@
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime, timedelta
+import threading
+import numpy as np
+from ..models.subscription import Subscription
+from .subscription_utils import billing_dates, subscription_cost
+
+SubscriptionInfo = namedtuple('SubscriptionInfo', 'id name amount cycle anchor')
+
+# One row per billing date, kept sorted by date
+OCCURRENCE_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('subscription_id', np.int64),
+    ('amount', np.float64),
+])
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+class MonthBucket:
+    """Billing dates of one calendar month, grouped by day.
+
+    days is the sorted array of days of the month that have a billing, with
+    day_totals and entries (lists of SubscriptionInfo) aligned to it.
+    """
+
+    def __init__(self, occurrences, subscriptions):
+        dates = occurrences['date']
+        days = (dates - dates.astype('datetime64[M]')).astype(np.int64) + 1
+        self.days, starts = np.unique(days, return_index=True)
+        amounts = occurrences['amount']
+        self.day_totals = np.add.reduceat(amounts, starts) if len(starts) else np.empty(0)
+        self.total = float(amounts.sum())
+        bounds = list(starts[1:]) + [len(occurrences)]
+        ids = occurrences['subscription_id'].tolist()
+        self.entries = [[subscriptions[subscription_id] for subscription_id in ids[low:high]]
+                        for low, high in zip(starts, bounds)]
+
+    def _position(self, day):
+        position = int(np.searchsorted(self.days, day))
+        if position < len(self.days) and self.days[position] == day:
+            return position
+        return None
+
+    def on_day(self, day):
+        """Subscriptions billed on a day of the month"""
+        position = self._position(day)
+        return [] if position is None else self.entries[position]
+
+    def day_total(self, day):
+        """Amount billed on a day of the month"""
+        position = self._position(day)
+        return 0.0 if position is None else float(self.day_totals[position])
+
+    def items(self):
+        """(day, subscriptions) pairs in date order"""
+        return zip(self.days.tolist(), self.entries)
+
+class OccurrenceSchedule:
+    """Shared cache of subscription billing dates over a rolling horizon.
+
+    Holds every subscription's details plus a sorted array of (date,
+    subscription_id, amount) from months_behind before today to months_ahead
+    after it. Writers call invalidate(subscription_id) after committing; only
+    that subscription is reloaded and re-expanded on the next read. Calendar
+    months, inside the horizon or not, are bucketed on demand and the most
+    recently used months_cached of them kept. Safe to use from the GUI thread
+    and database worker threads at once.
+    """
+
+    def __init__(self, months_behind=12, months_ahead=24, months_cached=36):
+        self.months_behind = months_behind
+        self.months_ahead = months_ahead
+        self.months_cached = months_cached
+        self._lock = threading.Lock()
+        self._subscriptions = None  # id -> SubscriptionInfo, None until first load
+        self._dates = {}  # id -> datetime64[D] billing dates inside the horizon
+        self._dirty = set()  # ids to reload from the database
+        self._occurrences = None  # Merged sorted array, None when stale
+        self._horizon = None  # (start, end) dates the cached dates cover
+        self._months = OrderedDict()  # (year, month) -> MonthBucket, least recently used first
+        self._version = 0  # Bumped on every invalidation so in-flight months are not cached
+
+    def invalidate(self, subscription_id=None):
+        """Forget one subscription (after an edit, delete or payment) or everything"""
+        with self._lock:
+            if subscription_id is None:
+                self._subscriptions = None
+            else:
+                self._dirty.add(subscription_id)
+            self._occurrences = None
+            self._months.clear()
+            self._version += 1
+
+    def _current_horizon(self):
+        today = date.today()
+        start = today - timedelta(days=31 * self.months_behind)
+        end = today + timedelta(days=31 * self.months_ahead)
+        return date(start.year, start.month, 1), end
+
+    def _expand(self, info):
+        self._dates[info.id] = billing_dates(info.anchor, info.cycle, *self._horizon)
+
+    def _refresh(self, session):
+        """Bring the cache up to date; called with the lock held"""
+        horizon = self._current_horizon()
+        if self._subscriptions is None:
+            rows = session.query(Subscription.id, Subscription.name, Subscription.amount,
+                                 Subscription.billing_cycle, Subscription.next_billing_date).all()
+            self._subscriptions = {row[0]: SubscriptionInfo(*row) for row in rows}
+            self._dirty.clear()
+            self._horizon = None
+
+        if self._dirty:
+            rows = session.query(Subscription.id, Subscription.name, Subscription.amount,
+                                 Subscription.billing_cycle, Subscription.next_billing_date)\
+                .filter(Subscription.id.in_(self._dirty)).all()
+            for subscription_id in self._dirty:
+                self._subscriptions.pop(subscription_id, None)  # Deleted unless reloaded below
+                self._dates.pop(subscription_id, None)
+            for row in rows:
+                info = SubscriptionInfo(*row)
+                self._subscriptions[info.id] = info
+                if self._horizon == horizon:
+                    self._expand(info)
+            self._dirty.clear()
+            self._occurrences = None
+
+        if self._horizon != horizon:
+            # First load or the day rolled over: expand everything for the new horizon
+            self._horizon = horizon
+            self._dates = {}
+            for info in self._subscriptions.values():
+                self._expand(info)
+            self._occurrences = None
+
+        if self._occurrences is None:
+            total = sum(len(dates) for dates in self._dates.values())
+            occurrences = np.empty(total, dtype=OCCURRENCE_DTYPE)
+            position = 0
+            for subscription_id, dates in self._dates.items():
+                chunk = occurrences[position:position + len(dates)]
+                chunk['date'] = dates
+                chunk['subscription_id'] = subscription_id
+                chunk['amount'] = self._subscriptions[subscription_id].amount
+                position += len(dates)
+            self._occurrences = np.sort(occurrences, order=('date', 'subscription_id'))
+
+    def _cached(self, start, end):
+        """Slice of the cached occurrences for a window, or None outside the horizon"""
+        horizon_start, horizon_end = self._horizon
+        if not (horizon_start <= start and end <= horizon_end):
+            return None
+        dates = self._occurrences['date']
+        low = np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+        high = np.searchsorted(dates, np.datetime64(end, 'D'), side='right')
+        return self._occurrences[low:high]
+
+    def subscriptions(self, session):
+        """Details of every subscription, keyed by id"""
+        with self._lock:
+            self._refresh(session)
+            return dict(self._subscriptions)
+
+    def occurrences(self, session, start_date, end_date):
+        """Sorted (date, subscription_id, amount) rows within [start_date, end_date].
+
+        Windows outside the cached horizon are expanded on the fly.
+        """
+        start, end = _as_date(start_date), _as_date(end_date)
+        with self._lock:
+            self._refresh(session)
+            cached = self._cached(start, end)
+            if cached is not None:
+                return cached.copy()
+            subscriptions = list(self._subscriptions.values())
+
+        chunks = []
+        for info in subscriptions:
+            dates = billing_dates(info.anchor, info.cycle, start, end)
+            chunk = np.empty(len(dates), dtype=OCCURRENCE_DTYPE)
+            chunk['date'] = dates
+            chunk['subscription_id'] = info.id
+            chunk['amount'] = info.amount
+            chunks.append(chunk)
+        if not chunks:
+            return np.empty(0, dtype=OCCURRENCE_DTYPE)
+        return np.sort(np.concatenate(chunks), order=('date', 'subscription_id'))
+
+    def month(self, session, year, month):
+        """MonthBucket of the billing dates in one calendar month"""
+        key = (year, month)
+        with self._lock:
+            self._refresh(session)
+            bucket = self._months.get(key)
+            if bucket is not None:
+                self._months.move_to_end(key)
+                return bucket
+            subscriptions = dict(self._subscriptions)
+            version = self._version
+
+        first = date(year, month, 1)
+        last = (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        bucket = MonthBucket(self.occurrences(session, first, last), subscriptions)
+
+        with self._lock:
+            if version == self._version:
+                self._months[key] = bucket
+                while len(self._months) > self.months_cached:
+                    self._months.popitem(last=False)
+        return bucket
+
+    def total(self, session, start_date, end_date):
+        """Amount billed within [start_date, end_date]"""
+        start, end = _as_date(start_date), _as_date(end_date)
+        with self._lock:
+            self._refresh(session)
+            cached = self._cached(start, end)
+            if cached is not None:
+                return float(cached['amount'].sum())
+            subscriptions = list(self._subscriptions.values())
+
+        if not subscriptions:
+            return 0.0
+        # Long windows (e.g. "All Time") are counted, not expanded
+        return subscription_cost([info.amount for info in subscriptions],
+                                 [info.cycle for info in subscriptions],
+                                 [info.anchor for info in subscriptions], start, end)
+
+_schedule = None
+_schedule_lock = threading.Lock()
+
+def get_schedule():
+    """The application-wide occurrence schedule"""
+    global _schedule
+    with _schedule_lock:
+        if _schedule is None:
+            _schedule = OccurrenceSchedule()
+        return _schedule
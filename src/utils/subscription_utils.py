@@ -1,8 +1,18 @@
 from datetime import datetime, date, timedelta
+import numpy as np
+from sqlalchemy import text
 from ..models.subscription import Subscription
 
+# Months between billing dates per cycle; anything else bills monthly
+CYCLE_MONTHS = {"Monthly": 1, "Quarterly": 3, "Yearly": 12}
+
 def calculate_next_billing_date(subscription):
-    """Calculate the next billing date based on the current one"""
+    """Calculate the next billing date based on the current one.
+
+    The day is clamped to the length of the new month and is not restored
+    afterwards (Jan 31 -> Feb 28 -> Mar 28); advance_subscriptions and the
+    billing_dates projection match this.
+    """
     current_date = subscription.next_billing_date
     
     if subscription.billing_cycle == "Monthly":
@@ -77,5 +87,158 @@ def mark_subscription_as_paid(session, subscription_id):
         # Commit the changes
         session.commit()
         
+        # Its cached billing dates are now out of date
+        from .subscription_schedule import get_schedule
+        get_schedule().invalidate(subscription_id)
+        
         return True
-    return False
\ No newline at end of file
+    return False
+
+def _cycle_months_sql(column):
+    """SQL CASE giving the months per billing cycle, from CYCLE_MONTHS"""
+    cases = " ".join(f"WHEN '{cycle}' THEN {months}" for cycle, months in CYCLE_MONTHS.items())
+    return f"CASE {column} {cases} ELSE 1 END"
+
+def advance_subscriptions(session, target_date, subscription_ids=None):
+    """Mark subscriptions as paid through target_date in a single UPDATE.
+
+    Each selected subscription (or, without ids, each one billed on or before
+    target_date) moves forward by whole cycles to its first billing date after
+    target_date, and by at least one cycle. The result is the date repeated
+    calculate_next_billing_date calls would reach: the day is clamped to each
+    billing month on the way and never grows back, so Jan 31 advanced two
+    months is Mar 28. Returns the updated rows as
+    (id, name, amount, billing_cycle, next_billing_date) tuples.
+    """
+    if subscription_ids is not None:
+        if not subscription_ids:
+            return []
+        condition = "id = ANY(:ids)"
+    else:
+        condition = "next_billing_date <= :target"
+
+    rows = session.execute(text(f"""
+        WITH due AS (
+            SELECT id, date_trunc('month', next_billing_date)::date AS anchor_month,
+                   extract(day FROM next_billing_date)::int AS anchor_day,
+                   {_cycle_months_sql('billing_cycle')} AS step,
+                   ((extract(year FROM CAST(:target AS date)) - extract(year FROM next_billing_date)) * 12
+                    + extract(month FROM CAST(:target AS date)) - extract(month FROM next_billing_date))::int AS months
+            FROM subscriptions
+            WHERE {condition}
+        ), candidates AS (
+            -- k is the last cycle billed in or before the target month; cycle k + 1 is
+            -- always after it, cycle k only if its day falls after the target day
+            SELECT d.id, c.n,
+                   (d.anchor_month + make_interval(months => d.step * c.n))::date - 1 + least(d.anchor_day, (
+                       -- Shortest billing month on the way: the day is clamped at every step
+                       SELECT min(extract(day FROM d.anchor_month + make_interval(months => d.step * i + 1)
+                                                   - interval '1 day'))::int
+                       FROM generate_series(1, c.n) AS i
+                   )) AS billed
+            FROM due d
+            CROSS JOIN LATERAL (
+                SELECT DISTINCT greatest(1, floor(d.months::numeric / d.step)::int + extra)
+                FROM (VALUES (0), (1)) AS offsets(extra)
+            ) AS c(n)
+        ), chosen AS (
+            SELECT DISTINCT ON (id) id, billed
+            FROM candidates
+            WHERE billed > CAST(:target AS date)
+            ORDER BY id, n
+        )
+        UPDATE subscriptions s
+        SET next_billing_date = c.billed
+        FROM chosen c
+        WHERE s.id = c.id
+        RETURNING s.id, s.name, s.amount, s.billing_cycle, s.next_billing_date
+    """), {'target': target_date, 'ids': list(subscription_ids or [])}).fetchall()
+    session.commit()
+
+    # Their cached billing dates are now out of date
+    from .subscription_schedule import get_schedule
+    schedule = get_schedule()
+    for row in rows:
+        schedule.invalidate(row[0])
+
+    return [tuple(row) for row in rows]
+
+# Cycles after which the carried billing day has met every month length it ever
+# will: four years at the shortest cycle, so a non-leap February is always seen
+CLAMP_CYCLES = 48
+
+def _month_lengths(months):
+    return ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+
+def _carried_days(anchor_months, anchor_days, steps):
+    """Billing day after 1..CLAMP_CYCLES cycles, one row per anchor.
+
+    As with calculate_next_billing_date the day is clamped to each billing month
+    on the way and never restored, so Jan 31 monthly bills Feb 28, Mar 28, ...
+    """
+    cycles = np.arange(1, CLAMP_CYCLES + 1, dtype=np.int64)
+    lengths = _month_lengths(anchor_months[:, None] + cycles * steps[:, None])
+    return np.minimum(anchor_days[:, None], np.minimum.accumulate(lengths, axis=1))
+
+def _occurrence_dates(anchor_months, anchor_days, carried, steps, k):
+    """Billing date k cycles from the anchor.
+
+    Later cycles use the carried day; the anchor and earlier cycles use the
+    anchor day clamped to their own month.
+    """
+    months = anchor_months + k * steps
+    earlier = np.minimum(anchor_days, _month_lengths(months))
+    later = carried[np.arange(len(k)), np.clip(k, 1, CLAMP_CYCLES) - 1]
+    days = np.where(k > 0, later, earlier)
+    return months.astype('datetime64[D]') + (days - 1)
+
+def _cycle_bounds(anchors, steps, start_date, end_date):
+    """First and last cycle numbers (relative to each anchor) that bill inside the window"""
+    start = np.datetime64(start_date, 'D')
+    end = np.datetime64(end_date, 'D')
+    anchor_months = anchors.astype('datetime64[M]')
+    anchor_days = (anchors - anchor_months.astype('datetime64[D]')).astype(np.int64) + 1
+    carried = _carried_days(anchor_months, anchor_days, steps)
+
+    # Cycle numbers of the first and last billing months inside the window
+    months_to_start = (start.astype('datetime64[M]') - anchor_months).astype(np.int64)
+    months_to_end = (end.astype('datetime64[M]') - anchor_months).astype(np.int64)
+    first = -(-months_to_start // steps)
+    last = months_to_end // steps
+
+    # Those months can still bill before the start day or after the end day
+    first = np.where(_occurrence_dates(anchor_months, anchor_days, carried, steps, first) < start,
+                     first + 1, first)
+    last = np.where(_occurrence_dates(anchor_months, anchor_days, carried, steps, last) > end,
+                    last - 1, last)
+    return anchor_months, anchor_days, carried, first, last
+
+def count_billing_occurrences(anchors, steps, start_date, end_date):
+    """Count billing dates of each subscription that fall within [start_date, end_date].
+
+    anchors is a datetime64[D] array of known billing dates (next_billing_date) and
+    steps the cycle length in months. Schedules extend in both directions from the
+    anchor by whole cycles. Later dates are the ones calculate_next_billing_date
+    reaches, with the clamped day carried forward; earlier ones keep the anchor
+    day, clamped to their month. Dates are compared by day.
+    """
+    _, _, _, first, last = _cycle_bounds(anchors, steps, start_date, end_date)
+    return np.maximum(last - first + 1, 0)
+
+def billing_dates(anchor, cycle, start_date, end_date):
+    """datetime64[D] array of one subscription's billing dates within [start_date, end_date]"""
+    steps = np.array([CYCLE_MONTHS.get(cycle, 1)], dtype=np.int64)
+    anchor_months, anchor_days, carried, first, last = _cycle_bounds(
+        np.array([anchor], dtype='datetime64[D]'), steps, start_date, end_date)
+    cycles = np.arange(first[0], last[0] + 1, dtype=np.int64)
+    return _occurrence_dates(anchor_months[0], anchor_days[0],
+                             np.broadcast_to(carried, (len(cycles), CLAMP_CYCLES)), steps[0], cycles)
+
+def subscription_cost(amounts, cycles, anchors, start_date, end_date):
+    """Total billed by the given subscriptions between start_date and end_date (inclusive)"""
+    if len(amounts) == 0 or start_date > end_date:
+        return 0.0
+    steps = np.array([CYCLE_MONTHS.get(cycle, 1) for cycle in cycles], dtype=np.int64)
+    counts = count_billing_occurrences(np.array(anchors, dtype='datetime64[D]'), steps,
+                                       start_date, end_date)
+    return float(np.dot(np.asarray(amounts, dtype=np.float64), counts))
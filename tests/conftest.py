@@ -0,0 +1,31 @@
+import os
+import pytest
+
+# Scratch Postgres database for the tests that need one; it is migrated and its
+# ledger tables are emptied before each of those tests
+DATABASE_URL = os.environ.get('FRITTER_TEST_DATABASE_URL')
+
+LEDGER_TABLES = 'expenses, income, subscriptions, receipts, clients, monthly_totals'
+
+
+@pytest.fixture(scope='session')
+def engine():
+    if not DATABASE_URL:
+        pytest.skip("FRITTER_TEST_DATABASE_URL is not set")
+    pytest.importorskip("sqlalchemy")
+    from src.database.db_manager import get_engine
+    from src.utils.db_migrate import run_migrations
+    engine = get_engine(DATABASE_URL)
+    run_migrations(engine)
+    return engine
+
+
+@pytest.fixture
+def session(engine):
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {LEDGER_TABLES} RESTART IDENTITY"))
+    session = Session(bind=engine)
+    yield session
+    session.close()
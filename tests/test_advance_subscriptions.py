@@ -0,0 +1,59 @@
+from datetime import date
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("numpy")
+
+from src.models.subscription import Subscription
+from src.utils.subscription_utils import CYCLE_MONTHS, advance_subscriptions, calculate_next_billing_date
+
+ANCHOR_DAYS = (28, 29, 30, 31)
+TARGETS = [date(2024, 2, 29), date(2024, 3, 28), date(2024, 12, 31), date(2026, 7, 15)]
+
+
+def paid_through(anchor, cycle, target):
+    """Billing date reached by marking as paid once, then until it is after target"""
+    subscription = SimpleNamespace(next_billing_date=anchor, billing_cycle=cycle)
+    subscription.next_billing_date = calculate_next_billing_date(subscription)
+    while subscription.next_billing_date <= target:
+        subscription.next_billing_date = calculate_next_billing_date(subscription)
+    return subscription.next_billing_date
+
+
+def month_end_anchors():
+    anchors = []
+    for month in range(1, 13):
+        for day in ANCHOR_DAYS:
+            try:
+                anchors.append(date(2024, month, day))
+            except ValueError:
+                pass
+    return anchors
+
+
+@pytest.mark.parametrize("target", TARGETS, ids=str)
+def test_advance_matches_marking_paid(session, target):
+    subscriptions = [Subscription(name=f"{cycle} {anchor}", amount=1.0, billing_cycle=cycle,
+                                  next_billing_date=anchor)
+                     for cycle in CYCLE_MONTHS for anchor in month_end_anchors()]
+    session.add_all(subscriptions)
+    session.commit()
+    expected = {subscription.id: paid_through(subscription.next_billing_date, subscription.billing_cycle, target)
+                for subscription in subscriptions}
+
+    rows = advance_subscriptions(session, target, [subscription.id for subscription in subscriptions])
+
+    assert {row[0]: row[4] for row in rows} == expected
+
+
+def test_advance_without_ids_only_moves_due_subscriptions(session):
+    due = Subscription(name="Due", amount=5.0, billing_cycle="Monthly", next_billing_date=date(2024, 1, 31))
+    later = Subscription(name="Later", amount=5.0, billing_cycle="Monthly", next_billing_date=date(2024, 6, 1))
+    session.add_all([due, later])
+    session.commit()
+
+    rows = advance_subscriptions(session, date(2024, 3, 1))
+
+    # Leap year: Jan 31 -> Feb 29 -> Mar 29
+    assert [(row[0], row[4]) for row in rows] == [(due.id, date(2024, 3, 29))]
@@ -0,0 +1,54 @@
+from datetime import date
+from types import SimpleNamespace
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sqlalchemy")
+
+from src.utils.subscription_utils import (
+    CYCLE_MONTHS, billing_dates, calculate_next_billing_date, count_billing_occurrences,
+)
+
+# Month-end anchors, including a leap day and a year either side of 2100 (not a leap year)
+ANCHORS = [date(year, month, day)
+           for year in (2023, 2024, 2099) for month in range(1, 13) for day in (29, 30, 31)
+           if day <= (29 if month == 2 and year % 4 == 0 else 28 if month == 2 else
+                      30 if month in (4, 6, 9, 11) else 31)]
+
+
+def paid_dates(anchor, cycle, count):
+    """Billing dates reached by marking a subscription as paid count times"""
+    subscription = SimpleNamespace(next_billing_date=anchor, billing_cycle=cycle)
+    dates = [anchor]
+    for _ in range(count):
+        subscription.next_billing_date = calculate_next_billing_date(subscription)
+        dates.append(subscription.next_billing_date)
+    return dates
+
+
+@pytest.mark.parametrize("cycle", list(CYCLE_MONTHS))
+@pytest.mark.parametrize("anchor", ANCHORS, ids=str)
+def test_projection_matches_marking_paid(anchor, cycle):
+    expected = paid_dates(anchor, cycle, 60)
+    projected = [value.item() for value in billing_dates(anchor, cycle, anchor, expected[-1])]
+    assert projected == expected
+
+
+@pytest.mark.parametrize("cycle", list(CYCLE_MONTHS))
+def test_count_matches_marking_paid(cycle):
+    # Windows after the anchor, where every date comes from marking as paid
+    start, end = date(2030, 3, 1), date(2033, 2, 28)
+    earlier = [anchor for anchor in ANCHORS if anchor < start]
+    anchors = np.array(earlier, dtype='datetime64[D]')
+    steps = np.full(len(earlier), CYCLE_MONTHS[cycle], dtype=np.int64)
+    counts = count_billing_occurrences(anchors, steps, start, end)
+    for anchor, count in zip(earlier, counts):
+        dates = paid_dates(anchor, cycle, 150)
+        assert count == sum(start <= value <= end for value in dates), anchor
+
+
+def test_jan_31_monthly_keeps_the_clamped_day():
+    dates = billing_dates(date(2025, 1, 31), 'Monthly', date(2025, 1, 1), date(2025, 5, 31))
+    assert [value.item() for value in dates] == [
+        date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 28), date(2025, 4, 28), date(2025, 5, 28),
+    ]
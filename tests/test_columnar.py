@@ -0,0 +1,35 @@
+import time
+from datetime import datetime
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from src.models.expense import Expense
+from src.utils.export import _column_kind, _write_fcol, export_columns, read_columnar
+
+
+def test_fcol_round_trip(tmp_path):
+    columns = export_columns(Expense, None)
+    kinds = [_column_kind(column) for column in columns]
+    names = [column.name for column in columns]
+    rows = [
+        {'id': 1, 'amount': 12.5, 'description': 'Café ☕', 'category': 'Meals',
+         'date': datetime(2024, 1, 2, 8, 30, 15, 123456), 'receipt_reference': 'R-1'},
+        {'id': 2, 'amount': -3.0, 'description': '', 'category': 'Other',
+         'date': None, 'receipt_reference': None},
+        {'id': 3, 'amount': 0.0, 'description': 'Paper', 'category': 'Office',
+         'date': datetime(1969, 12, 31, 23, 59, 59), 'receipt_reference': None},
+    ]
+    batches = [[tuple(row[name] for name in names) for row in rows[:2]],
+               [tuple(row[name] for name in names) for row in rows[2:]]]
+    filename = str(tmp_path / 'expenses.fcol')
+
+    assert _write_fcol(batches, filename, 'expenses', columns, kinds, None, time.perf_counter()) == 3
+    assert read_columnar(filename) == {name: [row[name] for row in rows] for name in names}
+
+
+def test_read_columnar_rejects_other_files(tmp_path):
+    filename = tmp_path / 'expenses.fcol'
+    filename.write_bytes(b'not columnar')
+    with pytest.raises(ValueError):
+        read_columnar(str(filename))
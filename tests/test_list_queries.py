@@ -0,0 +1,37 @@
+import re
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from src.database.pagination import list_query
+from src.models.expense import Expense
+from src.models.receipt import Receipt
+from src.utils.receipt_utils import receipt_reference_query
+
+# The blob columns only the receipt viewer may load; image_sha256 etc. are fine
+RECEIPT_IMAGE = re.compile(r'\breceipts\.image\b')
+EXPENSE_RECEIPT_IMAGE = re.compile(r'\bexpenses\.receipt_image\b')
+
+
+def compiled(query):
+    return str(query.statement.compile(dialect=postgresql.dialect()))
+
+
+def test_receipt_list_skips_image():
+    sql = compiled(list_query(Session(), Receipt).order_by(Receipt.date.desc(), Receipt.id.desc()))
+    assert 'receipts.name' in sql
+    assert not RECEIPT_IMAGE.search(sql)
+
+
+def test_expense_list_skips_receipt_image():
+    sql = compiled(list_query(Session(), Expense).order_by(Expense.date.desc(), Expense.id.desc()))
+    assert 'expenses.description' in sql
+    assert not EXPENSE_RECEIPT_IMAGE.search(sql)
+
+
+def test_receipt_reference_dropdown_skips_image():
+    sql = compiled(receipt_reference_query(Session()))
+    assert 'receipts.reference_id' in sql
+    assert not RECEIPT_IMAGE.search(sql)
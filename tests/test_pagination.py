@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from src.database.pagination import fetch_page, list_query
+from src.models.expense import Expense
+
+ORDER = (Expense.date, Expense.id)
+
+
+@pytest.fixture
+def expenses(session):
+    # Repeated dates, and NULL dates spread through the id range
+    start = datetime(2024, 1, 1)
+    session.add_all([Expense(amount=1.0, description=f'Expense {i}', category='Other',
+                             date=start + timedelta(days=i % 7))
+                     for i in range(1, 48)])
+    session.flush()
+    # The model fills in a missing date, so clear some afterwards
+    session.query(Expense).filter(Expense.id % 5 == 0).update({Expense.date: None}, synchronize_session=False)
+    session.commit()
+    rows = session.query(Expense.id, Expense.date).all()
+    assert sum(row.date is None for row in rows) == 9
+    return rows
+
+
+def expected_order(rows, descending):
+    """NULL dates last in either direction, each part ordered by (date, id)"""
+    valued = sorted((row for row in rows if row.date is not None),
+                    key=lambda row: (row.date, row.id), reverse=descending)
+    nulls = sorted((row for row in rows if row.date is None), key=lambda row: row.id, reverse=descending)
+    return [row.id for row in valued + nulls]
+
+
+def all_pages(session, page_size, descending):
+    ids = []
+    cursor = None
+    while True:
+        page = fetch_page(list_query(session, Expense), ORDER, cursor, page_size, descending=descending)
+        ids.extend(expense.id for expense in page.rows)
+        assert len(page.rows) <= page_size
+        if not page.has_more:
+            return ids
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("page_size", [1, 3, 7, 50])
+def test_pages_cover_every_row_once_nulls_last(session, expenses, page_size, descending):
+    assert all_pages(session, page_size, descending) == expected_order(expenses, descending)
+
+
+def test_cursor_into_the_null_dates_starts_with_none(session, expenses):
+    page = fetch_page(list_query(session, Expense), ORDER, None, len(expenses) - 2)
+    assert page.next_cursor[0] is None
+    rest = fetch_page(list_query(session, Expense), ORDER, page.next_cursor, 10)
+    assert [expense.id for expense in rest.rows] == expected_order(expenses, True)[-2:]
+    assert not rest.has_more
+
+
+def test_row_factory_converts_rows(session, expenses):
+    page = fetch_page(list_query(session, Expense), ORDER, None, 3, row_factory=lambda expense: expense.id)
+    assert page.rows == expected_order(expenses, True)[:3]
@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from src.utils.search_index import RECORD_TYPES, SearchIndex
+
+Expense = RECORD_TYPES['expense']
+Client = RECORD_TYPES['client']
+
+
+def expense(record_id, description, category='Office'):
+    return Expense(id=record_id, description=description, receipt_reference=None,
+                   category=category, amount=10.0)
+
+
+def ids(results):
+    return [(source_type, record.id) for source_type, record in results]
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.apply_changes([
+        ('upsert', 'expense', expense(1, 'Coffee beans')),
+        ('upsert', 'expense', expense(2, 'Decaf coffee')),
+        ('upsert', 'expense', expense(3, 'Printer paper')),
+    ])
+    return index
+
+
+def test_every_word_must_match(index):
+    assert ids(index.search('coffee bea')) == [('expense', 1)]
+    assert ids(index.search('coffee printer')) == []
+
+
+def test_short_terms_match_word_starts_only(index):
+    assert ids(index.search('pa')) == [('expense', 3)]
+    assert ids(index.search('ee')) == []
+
+
+def test_word_start_matches_rank_first_then_newest(index):
+    index.apply_changes([('upsert', 'expense', expense(4, 'Xcoffee grinder'))])
+    assert ids(index.search('coffee')) == [('expense', 2), ('expense', 1), ('expense', 4)]
+
+
+def test_ranking_is_not_limited_to_the_newest_matches():
+    index = SearchIndex()
+    index.apply_changes([('upsert', 'expense', expense(0, 'Coffee'))])
+    index.apply_changes([('upsert', 'expense', expense(i, f'Xcoffee {i}')) for i in range(1, 500)])
+    assert ids(index.search('coffee', limit=1)) == [('expense', 0)]
+
+
+def test_upsert_replaces_the_old_text(index):
+    index.apply_changes([('upsert', 'expense', expense(1, 'Green tea'))])
+    assert ids(index.search('coffee')) == [('expense', 2)]
+    assert ids(index.search('tea')) == [('expense', 1)]
+    assert index.stats()['records'] == 3
+
+
+def test_delete_removes_the_record(index):
+    index.apply_changes([('delete', 'expense', 2)])
+    assert ids(index.search('coffee')) == [('expense', 1)]
+    assert index.stats()['records'] == 2
+
+
+def test_same_id_in_different_sources_is_kept_apart(index):
+    index.apply_changes([('upsert', 'client', Client(id=1, business_name='Coffee Co', poc=None,
+                                                     email='hi@coffee.example', phone=None,
+                                                     address=None))])
+    index.apply_changes([('delete', 'expense', 1)])
+    assert sorted(ids(index.search('coffee'))) == [('client', 1), ('expense', 2)]
+
+
+def test_compaction_keeps_live_records():
+    index = SearchIndex()
+    index.apply_changes([('upsert', 'expense', expense(i, f'Item {i} supplies')) for i in range(3000)])
+    # Enough deletes to trigger compaction
+    index.apply_changes([('delete', 'expense', i) for i in range(2500)])
+    assert index.stats()['records'] == 500
+    assert len(index._records) < 1000  # Tombstones were dropped along the way
+    assert ids(index.search('item 2999')) == [('expense', 2999)]
+    assert len(index.search('supplies', limit=1000)) == 500
@@ -0,0 +1,70 @@
+import csv
+import io
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from src.utils.statement_import import _resolve_mapping, _staged_chunks, detect_mapping, import_statement
+
+
+def test_detect_mapping_matches_common_headers():
+    header = ['Posting Date', 'Payee', 'Withdrawals', 'Deposits', 'Balance']
+    assert detect_mapping(header) == {'date': 0, 'description': 1, 'debit': 2, 'credit': 3}
+
+
+def test_detect_mapping_ignores_case_and_spacing():
+    assert detect_mapping([' DATE ', 'Memo', 'Amount']) == {'date': 0, 'description': 1, 'amount': 2}
+
+
+@pytest.mark.parametrize("header", [['Memo', 'Amount'], ['Date', 'Memo', 'Balance']])
+def test_detect_mapping_needs_a_date_and_an_amount(header):
+    with pytest.raises(ValueError):
+        detect_mapping(header)
+
+
+def test_explicit_mapping_by_name_or_index():
+    header = ['When', 'What', 'How Much']
+    assert _resolve_mapping(header, {'date': 'when', 'description': 1, 'amount': 'How Much'}) == \
+        {'date': 0, 'description': 1, 'amount': 2}
+    with pytest.raises(ValueError):
+        _resolve_mapping(header, {'date': 'Posted'})
+
+
+def staged_rows(chunks):
+    return [row for chunk, _ in chunks for row in csv.reader(io.StringIO(chunk))]
+
+
+def test_staged_chunks_pick_mapped_columns_and_keep_line_numbers():
+    reader = [['2024-01-02', 'x', '-3.50', 'Coffee'], [], ['2024-01-03', 'y', '10', 'Refund']]
+    rows = staged_rows(_staged_chunks(reader, [0, 2, None, None, 3], 100))
+    assert rows == [['2', '2024-01-02', '-3.50', '', '', 'Coffee'],
+                    ['4', '2024-01-03', '10', '', '', 'Refund']]
+
+
+def test_staged_chunks_split_by_row_count():
+    reader = [[f'2024-01-{day:02d}', '1'] for day in range(1, 8)]
+    chunks = list(_staged_chunks(reader, [0, 1, None, None, None], 3))
+    assert [count for _, count in chunks] == [3, 3, 1]
+    assert len(staged_rows(chunks)) == 7
+
+
+def test_short_rows_stage_blank_columns():
+    rows = staged_rows(_staged_chunks([['2024-01-02']], [0, 1, None, None, 5], 10))
+    assert rows == [['2', '2024-01-02', '', '', '', '']]
+
+
+def test_import_reports_duplicates_and_dropped_rows_apart(session, tmp_path):
+    statement = tmp_path / 'statement.csv'
+    statement.write_text('Date,Description,Amount\n'
+                         '2024-01-02,Coffee,-3.50\n'
+                         '2024-01-02,Coffee,-3.50\n'
+                         '2024-01-03,Client payment,100\n'
+                         ',No date,-5\n'
+                         '2024-01-04,Zero,0\n'
+                         '2024-01-05,No amount,n/a\n')
+
+    first = import_statement(session, str(statement))
+    assert (first.rows, first.expenses, first.income, first.duplicates, first.dropped) == (6, 2, 1, 0, 3)
+
+    again = import_statement(session, str(statement))
+    assert (again.rows, again.expenses, again.income, again.duplicates, again.dropped) == (6, 0, 0, 3, 3)